@@ -2,6 +2,7 @@
 import google.generativeai as genai
 import requests
 import streamlit as st # To access st.secrets
+from fund_index import get_fund_index
 
 def generate_recommendation(age, income, profession, region, goal):
     """Generates investment recommendation using Gemini AI."""
@@ -47,7 +48,14 @@ def generate_recommendation(age, income, profession, region, goal):
         return {"advice_text": f"Error generating recommendation: {e}. Please check your API key or try again.", "allocation": {"Equity": "₹0", "Debt": "₹0", "Gold": "₹0"}}
 
 def search_funds(query):
-    """Searches for mutual funds using mfapi.in API."""
+    """Searches mutual funds in the local scheme index, falling back to the mfapi.in API."""
+    try:
+        fund_index = get_fund_index()
+        if len(fund_index):
+            return fund_index.search(query)
+    except Exception:
+        pass # Index unavailable, search remotely instead
+
     url = f"https://api.mfapi.in/mf/search?q={query}"
     try:
         response = requests.get(url)
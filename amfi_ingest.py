@@ -0,0 +1,101 @@
+# amfi_ingest.py
+from array import array
+from datetime import datetime
+
+import numpy as np
+import requests
+
+from fund_index import SCHEME_LIST_PATH, load_schemes, save_schemes
+from nav_store import get_nav_store
+
+# --- AMFI daily NAV file ingestion ---
+# AMFI publishes the NAV of every scheme for the latest day in one
+# semicolon-delimited text file (~15k rows). Data rows look like
+#   Scheme Code;ISIN Div Payout/ISIN Growth;ISIN Div Reinvestment;Scheme Name;Net Asset Value;Date
+# and are interleaved with blank lines and section headings (scheme category
+# and fund house) that contain no semicolons. The file is streamed line by
+# line into compact arrays and written to the NAV store in one append.
+AMFI_NAV_URL = "https://portal.amfiindia.com/spages/NAVAll.txt"
+FIELD_COUNT = 6
+
+_day_cache = {}
+
+
+def iter_nav_lines(source=AMFI_NAV_URL):
+    """Yields the lines of a NAVAll file from a URL or a local path without reading it whole."""
+    if source.startswith(("http://", "https://")):
+        with requests.get(source, stream=True, timeout=60) as response:
+            response.raise_for_status()
+            response.encoding = response.encoding or "utf-8"
+            yield from response.iter_lines(decode_unicode=True)
+    else:
+        with open(source, "r", encoding="utf-8", errors="replace") as f:
+            yield from f
+
+
+def _parse_day(text):
+    """AMFI dates look like '16-Oct-2026'; a file holds only a few distinct dates."""
+    day = _day_cache.get(text)
+    if day is None:
+        day = int(np.datetime64(datetime.strptime(text, "%d-%b-%Y").date(), "D").astype(np.int64))
+        _day_cache[text] = day
+    return day
+
+
+def parse_nav_lines(lines):
+    """Yields (scheme_code, scheme_name, day, nav) for every data row with a usable NAV."""
+    for line in lines:
+        fields = line.strip().split(";")
+        if len(fields) != FIELD_COUNT or not fields[0].isdigit():
+            continue  # Blank line, section heading or the column header
+        try:
+            nav = float(fields[4].replace(",", ""))
+            day = _parse_day(fields[5].strip())
+        except ValueError:
+            continue  # NAV published as 'N.A.' or a malformed date
+        yield int(fields[0]), fields[3].strip(), day, nav
+
+
+def update_scheme_list(names, path=SCHEME_LIST_PATH):
+    """
+    Merges scheme names from the NAV file into the local scheme list. Running
+    apps pick up the rewritten file through get_fund_index's mtime check.
+    """
+    schemes = load_schemes(path, max_age=float("inf"))
+    merged = {int(s["schemeCode"]): s for s in schemes}
+    added = 0
+    for code, name in names.items():
+        if code not in merged:
+            added += 1
+        merged[code] = {"schemeCode": code, "schemeName": name}
+    save_schemes(list(merged.values()), path)
+    return added
+
+
+def ingest_nav_file(source=AMFI_NAV_URL, store=None, schemes_path=SCHEME_LIST_PATH):
+    """
+    Streams a NAVAll file into the NAV store and the scheme index.
+    Returns a summary dict with the number of rows stored and schemes added.
+    """
+    store = store or get_nav_store()
+    codes, days, navs = array("i"), array("i"), array("f")
+    names = {}
+    for code, name, day, nav in parse_nav_lines(iter_nav_lines(source)):
+        codes.append(code)
+        days.append(day)
+        navs.append(nav)
+        names[code] = name
+
+    # One append per column; a later row for the same (scheme, day) replaces the stored NAV
+    stored = store.append(np.frombuffer(codes, dtype=np.int32), np.frombuffer(days, dtype=np.int32),
+                          np.frombuffer(navs, dtype=np.float32))
+    added = update_scheme_list(names, schemes_path) if names else 0
+    return {"rows": stored, "schemes": len(names), "new_schemes": added}
+
+
+if __name__ == "__main__":
+    import sys
+
+    summary = ingest_nav_file(sys.argv[1] if len(sys.argv) > 1 else AMFI_NAV_URL)
+    get_nav_store().compact()  # Batch job: fold the delta into the base segment here, not in page requests
+    print(f"Stored {summary['rows']} NAVs for {summary['schemes']} schemes ({summary['new_schemes']} new)")
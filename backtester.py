@@ -0,0 +1,210 @@
+# backtester.py
+from itertools import product
+
+import numpy as np
+import pandas as pd
+
+from nav_store import get_nav_store
+
+# --- Mutual fund strategy backtester ---
+# A strategy is a plain dict:
+#   kind            "sip", "lumpsum" or "stp"
+#   amount          monthly SIP installment, lump sum, or STP corpus (₹)
+#   weights         {scheme_code: weight} of the funds invested into
+#   step_up         yearly fractional increase of the SIP installment
+#   source, months  STP only: fund the corpus is parked in, and number of
+#                   monthly transfers out of it into `weights`
+#   rebalance       months between rebalances back to `weights` (0 = never)
+#   exit_load, exit_load_days
+#                   load charged on the final redemption of units bought
+#                   within exit_load_days of the end date
+# Every strategy in a grid is laid out on the same monthly event calendar as
+# a (strategy x month x fund) array of rupees invested. Units held are the
+# running sum of rupees / NAV, so a whole grid is valued in a few array ops;
+# XIRR is solved for all strategies at once with Newton's method.
+DEFAULT_STRATEGY = {
+    "name": "",
+    "kind": "sip",
+    "amount": 10_000.0,
+    "weights": {},
+    "step_up": 0.0,
+    "source": None,
+    "months": 12,
+    "rebalance": 0,
+    "exit_load": 0.0,
+    "exit_load_days": 365,
+}
+XIRR_GUESS = 0.1
+XIRR_ITERATIONS = 50
+XIRR_TOLERANCE = 1e-7
+
+
+def load_nav_panel(codes, start=None, end=None, store=None):
+    """
+    Daily NAVs (date x scheme code) for the given schemes, forward-filled and
+    starting on the first day every scheme has a NAV. Missing schemes are
+    loaded into the NAV store first.
+    """
+    store = store or get_nav_store()
+    codes = [int(c) for c in dict.fromkeys(codes)]
+    missing = [c for c in codes if store.load_series(c).empty]
+    if missing:
+        store.bulk_load(missing)
+    panel = pd.DataFrame({code: store.load_series(code) for code in codes}).sort_index().ffill()
+    if start is not None:
+        panel = panel[panel.index >= pd.Timestamp(start)]
+    if end is not None:
+        panel = panel[panel.index < pd.Timestamp(end)]
+    return panel.dropna()
+
+
+def strategy_grid(base=None, **options):
+    """
+    Expands lists of alternative values into one strategy per combination, e.g.
+    strategy_grid({"kind": "sip"}, amount=[5000, 10000], step_up=[0, 0.1]).
+    """
+    base = {**DEFAULT_STRATEGY, **(base or {})}
+    keys = list(options)
+    grid = []
+    for values in product(*(options[k] for k in keys)):
+        label = ", ".join(f"{k}={_label(v)}" for k, v in zip(keys, values))
+        name = " | ".join(part for part in (base["name"], label) if part) or base["kind"]
+        grid.append({**base, **dict(zip(keys, values)), "name": name})
+    return grid
+
+
+def _label(value):
+    if isinstance(value, dict):
+        return "/".join(f"{k}:{w:g}" for k, w in value.items())
+    return f"{value:g}" if isinstance(value, float) else str(value)
+
+
+def event_rows(dates, start=None):
+    """Row of the first trading day on or after each monthly anniversary of start."""
+    start = pd.Timestamp(start) if start is not None else dates[0]
+    anniversaries = pd.date_range(start, dates[-1], freq=pd.DateOffset(months=1))
+    return np.unique(dates.searchsorted(anniversaries))
+
+
+def _cash_flow_arrays(strategy, n_months, funds):
+    """
+    Rupees moved into (positive) or out of (negative) each fund every month,
+    and the external cash invested each month.
+    """
+    s = {**DEFAULT_STRATEGY, **strategy}
+    weights = np.zeros(len(funds))
+    for code, w in s["weights"].items():
+        weights[funds.get_loc(int(code))] = w
+    weights = weights / weights.sum() if weights.sum() else weights
+
+    month = np.arange(n_months)
+    invested = np.zeros(n_months)
+    fund_flows = np.zeros((n_months, len(funds)))
+    if s["kind"] == "sip":
+        invested = s["amount"] * (1 + s["step_up"]) ** (month // 12)
+        fund_flows = invested[:, None] * weights
+    elif s["kind"] == "lumpsum":
+        invested[0] = s["amount"]
+        fund_flows[0] = s["amount"] * weights
+    elif s["kind"] == "stp":
+        source = funds.get_loc(int(s["source"]))
+        invested[0] = s["amount"]
+        installments = min(int(s["months"]), n_months)
+        transfer = np.where(month < installments, s["amount"] / max(installments, 1), 0.0)
+        fund_flows = transfer[:, None] * weights
+        fund_flows[:, source] -= transfer
+        fund_flows[0, source] += s["amount"]
+    else:
+        raise ValueError(f"Unknown strategy kind: {s['kind']}")
+    return invested, fund_flows, weights
+
+
+def xirr(cash_flows, years, guess=XIRR_GUESS, iterations=XIRR_ITERATIONS, tol=XIRR_TOLERANCE):
+    """
+    Annualized internal rate of return of every row of cash_flows at once.
+    cash_flows is (n, t) with investments negative; years is (t,) time from
+    the first flow. Rows that do not converge are NaN.
+    """
+    flows = np.atleast_2d(np.asarray(cash_flows, dtype=float))
+    years = np.asarray(years, dtype=float)
+    rate = np.full(len(flows), guess)
+    converged = np.zeros(len(flows), dtype=bool)
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        for _ in range(iterations):
+            discount = (1 + rate[:, None]) ** -years
+            npv = (flows * discount).sum(axis=1)
+            slope = (-years * flows * discount / (1 + rate[:, None])).sum(axis=1)
+            step = np.where(converged, 0.0, npv / slope)
+            rate = np.maximum(rate - step, -0.9999)
+            converged |= np.abs(step) < tol
+            if converged.all():
+                break
+    return np.where(converged & np.isfinite(rate), rate, np.nan)
+
+
+def run_backtest(navs, strategies, start=None):
+    """
+    Simulates every strategy over the NAV panel (date x scheme code).
+    Returns (summary, values): one summary row per strategy, and the value of
+    every strategy at each monthly event date (date x strategy name).
+    """
+    strategies = [{**DEFAULT_STRATEGY, **s} for s in strategies]
+    dates, funds = navs.index, navs.columns
+    rows = event_rows(dates, start)
+    prices = navs.to_numpy(dtype=float)[rows]  # (month, fund)
+    final_prices = navs.to_numpy(dtype=float)[-1]
+    n_months = len(rows)
+
+    flows = [_cash_flow_arrays(s, n_months, funds) for s in strategies]
+    invested = np.stack([f[0] for f in flows])  # (strategy, month)
+    fund_flows = np.stack([f[1] for f in flows])  # (strategy, month, fund)
+    weights = np.stack([f[2] for f in flows])  # (strategy, fund)
+
+    unit_flows = fund_flows / prices
+    units = np.cumsum(unit_flows, axis=1)
+
+    # Rebalancing resets holdings to the target weights; the trade carries
+    # forward to every later month, so only rebalance months need a pass
+    period = np.array([int(s["rebalance"]) for s in strategies])
+    first = np.array([int(s["months"]) if s["kind"] == "stp" else 0 for s in strategies])
+    month = np.arange(n_months)
+    due = (period[:, None] > 0) & (month > first[:, None]) & ((month - first[:, None]) % np.maximum(period, 1)[:, None] == 0)
+    for m in np.flatnonzero(due.any(axis=0)):
+        picked = due[:, m]
+        held = units[picked, m]
+        value = held @ prices[m]
+        trade = value[:, None] * weights[picked] / prices[m] - held
+        unit_flows[picked, m] += trade
+        units[picked, m:] += trade[:, None, :]
+
+    # Exit load on units bought within the load period before the end date
+    load_start = dates[-1] - pd.to_timedelta([s["exit_load_days"] for s in strategies], unit="D")
+    recent = dates[rows].to_numpy()[None, :] > load_start.to_numpy()[:, None]
+    recent_units = np.where(recent[:, :, None], np.maximum(unit_flows, 0), 0).sum(axis=1)
+    final_units = units[:, -1]
+    gross = final_units @ final_prices
+    load_rate = np.array([s["exit_load"] for s in strategies])
+    load = load_rate * (np.minimum(recent_units, final_units) @ final_prices)
+    final_value = gross - load
+
+    # XIRR over the monthly contributions plus the final redemption
+    flow_dates = dates[rows].append(pd.DatetimeIndex([dates[-1]]))
+    years = (flow_dates - flow_dates[0]).days.to_numpy() / 365.0
+    cash = np.hstack([-invested, final_value[:, None]])
+    returns = xirr(cash, years)
+
+    total_invested = invested.sum(axis=1)
+    summary = pd.DataFrame({
+        "strategy": [s["name"] or s["kind"] for s in strategies],
+        "kind": [s["kind"] for s in strategies],
+        "invested": total_invested,
+        "final_value": final_value,
+        "exit_load_paid": load,
+        "gain": final_value - total_invested,
+        "absolute_return": np.divide(final_value, total_invested, out=np.full_like(final_value, np.nan),
+                                     where=total_invested > 0) - 1,
+        "xirr": returns,
+    })
+    values = pd.DataFrame((units * prices[None]).sum(axis=2).T, index=dates[rows], columns=summary["strategy"])
+    values.index.name = "Date"
+    return summary, values
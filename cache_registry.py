@@ -0,0 +1,109 @@
+# cache_registry.py
+import threading
+import time
+from collections import OrderedDict
+
+import streamlit as st
+
+# --- Namespaced cache registry ---
+# st.cache_data.clear() drops every cached function for every user. The
+# registry keeps entries in named namespaces so callers can evict a single
+# key (or one user's keys) and force a refresh of only that entry. Each
+# namespace is an LRU with its own TTL and hit/miss/eviction counters.
+DEFAULT_TTL = 5 * 60
+DEFAULT_MAX_ENTRIES = 1000
+
+
+class _Namespace:
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (expires_at, value)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+class CacheRegistry:
+    """Thread-safe, process-wide cache with per-namespace invalidation."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._namespaces = {}
+
+    def namespace(self, name, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        """Creates the namespace on first use; later calls keep its settings."""
+        with self._lock:
+            if name not in self._namespaces:
+                self._namespaces[name] = _Namespace(ttl, max_entries)
+            return self._namespaces[name]
+
+    def get(self, name, key, compute, refresh=False):
+        """
+        Returns the cached value for key, calling compute() on a miss, on expiry
+        or when refresh is True. Only this key is recomputed.
+        """
+        ns = self.namespace(name)
+        now = time.monotonic()
+        with self._lock:
+            entry = ns.entries.get(key)
+            if entry is not None and not refresh and entry[0] > now:
+                ns.entries.move_to_end(key)
+                ns.hits += 1
+                return entry[1]
+            ns.misses += 1
+            if entry is not None:
+                del ns.entries[key]
+                ns.evictions += 1
+
+        # Computed outside the lock so a slow fetch does not block other keys
+        value = compute()
+        with self._lock:
+            ns.entries[key] = (time.monotonic() + ns.ttl, value)
+            ns.entries.move_to_end(key)
+            while len(ns.entries) > ns.max_entries:
+                ns.entries.popitem(last=False)
+                ns.evictions += 1
+        return value
+
+    def invalidate(self, name, key):
+        """Evicts a single key. Returns True if it was cached."""
+        ns = self.namespace(name)
+        with self._lock:
+            if ns.entries.pop(key, None) is None:
+                return False
+            ns.evictions += 1
+            return True
+
+    def invalidate_where(self, name, predicate):
+        """Evicts every key in the namespace for which predicate(key) is true."""
+        ns = self.namespace(name)
+        with self._lock:
+            doomed = [key for key in ns.entries if predicate(key)]
+            for key in doomed:
+                del ns.entries[key]
+            ns.evictions += len(doomed)
+            return len(doomed)
+
+    def clear_namespace(self, name):
+        """Evicts every key in one namespace, leaving the others untouched."""
+        return self.invalidate_where(name, lambda key: True)
+
+    def stats(self):
+        """Per-namespace counters, e.g. for a diagnostics table."""
+        with self._lock:
+            return {
+                name: {
+                    "entries": len(ns.entries),
+                    "hits": ns.hits,
+                    "misses": ns.misses,
+                    "evictions": ns.evictions,
+                }
+                for name, ns in self._namespaces.items()
+            }
+
+
+@st.cache_resource
+def get_cache_registry():
+    """The single CacheRegistry shared by every session in this process."""
+    return CacheRegistry()
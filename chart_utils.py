@@ -0,0 +1,134 @@
+# chart_utils.py
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# --- Chart pipeline for long price series ---
+# A chart is only ~1-2k pixels wide, so drawing more points than that just
+# grows the payload sent to the browser. Long series are downsampled with
+# Largest-Triangle-Three-Buckets (LTTB), which keeps the visual shape, and
+# drawn with WebGL traces once they are large.
+DEFAULT_MAX_POINTS = 1500
+WEBGL_THRESHOLD = 1000
+DEFAULT_TOP_N_ANNOTATIONS = 20
+ANNOTATION_MIN_PCT = 1.0
+
+
+def lttb_indices(y, n_out):
+    """
+    Returns the positions of the points kept by LTTB downsampling of y
+    (x is taken as the position) down to n_out points.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.arange(n, dtype=float)
+    # Bucket edges for the n - 2 interior points; first and last are always kept
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    kept = np.empty(n_out, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        # Average of the next bucket is the third triangle vertex
+        nlo, nhi = hi, (edges[i + 2] if i + 2 < len(edges) else n)
+        avg_x = x[nlo:nhi].mean() if nhi > nlo else x[-1]
+        avg_y = y[nlo:nhi].mean() if nhi > nlo else y[-1]
+
+        area = np.abs(
+            (x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a])
+        )
+        a = lo + int(np.nanargmax(area)) if np.isfinite(area).any() else lo
+        kept[i + 1] = a
+    return kept
+
+
+def top_moves(pct_change, top_n, min_pct=ANNOTATION_MIN_PCT):
+    """Positions of the top_n largest absolute moves above min_pct, in date order."""
+    pct = np.asarray(pct_change, dtype=float)
+    candidates = np.flatnonzero(np.abs(np.nan_to_num(pct)) > min_pct)
+    if top_n <= 0 or candidates.size == 0:
+        return np.array([], dtype=int)
+    if candidates.size > top_n:
+        magnitudes = np.abs(pct[candidates])
+        candidates = candidates[np.argpartition(-magnitudes, top_n - 1)[:top_n]]
+    return np.sort(candidates)
+
+
+def build_price_chart(data, title, yaxis_title, line_name,
+                      top_n=DEFAULT_TOP_N_ANNOTATIONS, max_points=DEFAULT_MAX_POINTS,
+                      webgl_threshold=WEBGL_THRESHOLD, overlays=None):
+    """
+    Builds the closing-price figure with profit/loss markers and labels for the
+    largest daily moves. data needs 'Close', 'Daily_Change' and 'Pct_Change'.
+    overlays maps a trace name to a series aligned with data (e.g. an SMA).
+    """
+    close = data["Close"].to_numpy(dtype=float)
+    daily_change = data["Daily_Change"].to_numpy(dtype=float)
+    pct_change = data["Pct_Change"].to_numpy(dtype=float)
+    dates = data.index
+
+    labelled = top_moves(pct_change, top_n)
+    # Labelled moves are always drawn, whatever the downsampler keeps
+    kept = np.union1d(lttb_indices(close, max_points), labelled)
+
+    scatter = go.Scattergl if len(kept) > webgl_threshold else go.Scatter
+    fig = go.Figure(data=[scatter(
+        x=dates[kept], y=close[kept], mode='lines',
+        name=line_name, line=dict(color='cyan'), connectgaps=True
+    )])
+
+    kept_change = daily_change[kept]
+    up, down = kept[kept_change >= 0], kept[kept_change < 0]
+    fig.add_trace(scatter(
+        x=dates[up], y=close[up],
+        mode='markers', name='Profit', marker=dict(symbol='triangle-up', color='green', size=8)
+    ))
+    fig.add_trace(scatter(
+        x=dates[down], y=close[down],
+        mode='markers', name='Loss', marker=dict(symbol='triangle-down', color='red', size=8)
+    ))
+
+    for name, series in (overlays or {}).items():
+        fig.add_trace(scatter(
+            x=dates[kept], y=series.to_numpy(dtype=float)[kept], mode='lines',
+            name=name, line=dict(width=1)
+        ))
+
+    # All labels are passed to the layout in one call instead of one add_annotation per day
+    moves = pct_change[labelled]
+    positive = moves > 0
+    annotations = [
+        dict(
+            x=x, y=y, text=f"{m:+.2f}%", showarrow=False,
+            font=dict(color="green" if p else "red", size=10),
+            yanchor="bottom" if p else "top", yshift=15 if p else -15,
+        )
+        for x, y, m, p in zip(dates[labelled], close[labelled], moves, positive)
+    ]
+
+    fig.update_layout(
+        title=title, annotations=annotations,
+        xaxis_rangeslider_visible=True,
+        xaxis_title="Date", yaxis_title=yaxis_title,
+        height=600, template="plotly_dark", showlegend=True
+    )
+    return fig
+
+
+def build_indicator_chart(indicators, columns, title, max_points=DEFAULT_MAX_POINTS,
+                          webgl_threshold=WEBGL_THRESHOLD):
+    """Builds a separate panel for oscillator-style indicators (RSI, MACD, ...)."""
+    fig = go.Figure()
+    dates = indicators.index
+    for column in columns:
+        values = indicators[column].to_numpy(dtype=float)
+        kept = lttb_indices(np.nan_to_num(values), max_points)
+        scatter = go.Scattergl if len(kept) > webgl_threshold else go.Scatter
+        fig.add_trace(scatter(x=dates[kept], y=values[kept], mode='lines', name=column))
+    fig.update_layout(title=title, height=250, template="plotly_dark",
+                      margin=dict(t=40, b=20), showlegend=len(columns) > 1)
+    return fig
@@ -0,0 +1,148 @@
+# companyfacts_bulk.py
+import json
+import os
+import re
+import sys
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from companyfacts_parser import parse_companyfacts
+from edgar_client import edgar_client
+from facts_store import FACTS_DB_PATH, fact_rows, store_many
+
+# --- Bulk companyfacts ingest ---
+# SEC publishes the companyfacts document of every filer (~18k) as one zip
+# with a CIK##########.json member per company. Members are decompressed as
+# streams straight from the archive (nothing is extracted to disk) and parsed
+# on a process pool; the parent only writes finished rows to the facts
+# store, many companies per transaction.
+COMPANYFACTS_ZIP_URL = "https://www.sec.gov/Archives/edgar/daily-index/xbrl/companyfacts.zip"
+COMPANYFACTS_ZIP_PATH = os.path.join("data", "companyfacts.zip")
+BATCH_ROWS = 500_000  # facts written per transaction
+DOWNLOAD_CHUNK = 1 << 20
+IN_FLIGHT_PER_WORKER = 2  # parsed members waiting to be written are bounded by this
+
+_MEMBER_RE = re.compile(r"CIK(\d{10})\.json$")
+_ENTITY_NAME_RE = re.compile(r'"entityName"\s*:\s*("(?:[^"\\]|\\.)*")')
+
+_archive = None  # per-process open ZipFile, set by _init_worker
+
+
+def download_archive(url=COMPANYFACTS_ZIP_URL, path=COMPANYFACTS_ZIP_PATH):
+    """Streams the archive to disk (zip members need a seekable file to be read one by one)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with edgar_client().get(url, stream=True, timeout=60) as response:
+        with open(tmp_path, "wb") as f:
+            for chunk in response.iter_content(DOWNLOAD_CHUNK):
+                f.write(chunk)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _init_worker(archive_path):
+    global _archive
+    _archive = zipfile.ZipFile(archive_path)
+
+
+def _parse_member(member, concepts):
+    """Parses one member in a worker process; returns (cik, name, fact rows, bytes read)."""
+    cik = int(_MEMBER_RE.search(member).group(1))
+    with _archive.open(member) as stream:
+        head = stream.read(4096).decode("utf-8", errors="ignore")
+    match = _ENTITY_NAME_RE.search(head)
+    name = json.loads(match.group(1)) if match else None
+    with _archive.open(member) as stream:
+        facts = parse_companyfacts(stream, concepts)
+    # Rows are built here so the parent process only has to insert them
+    return cik, name, fact_rows(cik, facts), _archive.getinfo(member).file_size
+
+
+def report_progress(done, total, rows, size, elapsed):
+    rate = done / elapsed if elapsed else 0.0
+    print(f"{done}/{total} filers  {rows:,} facts  "
+          f"{rate:.1f} filers/s  {rows / elapsed if elapsed else 0:,.0f} facts/s  "
+          f"{size / elapsed / 1e6 if elapsed else 0:.1f} MB/s", file=sys.stderr, flush=True)
+
+
+def ingest_archive(path=COMPANYFACTS_ZIP_PATH, concepts=None, workers=None, batch_rows=BATCH_ROWS,
+                   db_path=FACTS_DB_PATH, progress=report_progress, limit=None):
+    """
+    Parses every companyfacts member of the archive on a process pool and writes
+    the facts to the store in batched transactions. concepts=None keeps every
+    us-gaap concept. At most IN_FLIGHT_PER_WORKER members per worker are
+    submitted ahead of the writer, so parsed rows cannot pile up in this
+    process when SQLite falls behind. A member that fails to parse is
+    reported and skipped. Returns a summary dict with counts and throughput.
+    """
+    with zipfile.ZipFile(path) as archive:
+        members = [m for m in archive.namelist() if _MEMBER_RE.search(m)]
+    if limit:
+        members = members[:limit]
+    workers = workers or os.cpu_count() or 1
+
+    started = time.monotonic()
+    done = rows = stored = size = 0
+    failed = []
+    batch, batch_size = [], 0
+
+    def flush():
+        nonlocal batch, batch_size, stored
+        if batch:
+            stored += store_many(batch, db_path)
+            batch, batch_size = [], 0
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(path,)) as pool:
+        pending = {}  # future -> member
+        queue = iter(members)
+        while True:
+            for member in queue:
+                pending[pool.submit(_parse_member, member, concepts)] = member
+                if len(pending) >= workers * IN_FLIGHT_PER_WORKER:
+                    break
+            if not pending:
+                break
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                member = pending.pop(future)
+                done += 1
+                try:
+                    cik, name, member_rows, member_size = future.result()
+                except Exception as e:
+                    failed.append(member)
+                    print(f"Skipping {member}: {e!r}", file=sys.stderr, flush=True)
+                    continue
+                batch.append((cik, name, member_rows))
+                batch_size += len(member_rows)
+                rows += len(member_rows)
+                size += member_size
+            if batch_size >= batch_rows:
+                flush()
+                if progress:
+                    progress(done, len(members), rows, size, time.monotonic() - started)
+        flush()
+
+    elapsed = time.monotonic() - started
+    if progress:
+        progress(done, len(members), rows, size, elapsed)
+    return {"filers": done - len(failed), "failed": failed, "facts": rows, "stored": stored, "seconds": elapsed,
+            "facts_per_second": rows / elapsed if elapsed else 0.0}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Load SEC's bulk companyfacts archive into the local facts store.")
+    parser.add_argument("archive", nargs="?", default=COMPANYFACTS_ZIP_PATH,
+                        help="path to companyfacts.zip (downloaded first if missing)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--concepts", nargs="*", default=None, help="only keep these concepts (default: all us-gaap)")
+    parser.add_argument("--limit", type=int, default=None, help="only ingest the first N filers")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.archive):
+        download_archive(path=args.archive)
+    summary = ingest_archive(args.archive, args.concepts, args.workers, limit=args.limit)
+    print(f"Ingested {summary['facts']:,} facts for {summary['filers']:,} filers in {summary['seconds']:.1f}s "
+          f"({summary['facts_per_second']:,.0f} facts/s, {summary['stored']:,} new, {len(summary['failed'])} failed)")
@@ -0,0 +1,174 @@
+# companyfacts_parser.py
+import codecs
+import json
+import re
+
+import pandas as pd
+
+from edgar_client import edgar_client
+from sec_resolver import format_cik
+
+# --- Streaming SEC companyfacts parser ---
+# A companyfacts document is shaped like
+#   {"cik": .., "entityName": .., "facts": {taxonomy: {concept: {"label": ..,
+#     "description": .., "units": {unit: [{fact}, {fact}, ...]}}}}}
+# and runs to tens of MB for large filers. The parser reads it in chunks and
+# only tracks nesting: one regex jumps from one structural character to the
+# next (stepping over strings whole), so unwanted concepts are skipped without
+# building any objects. Inside a wanted concept each flat fact object is
+# decoded on its own with raw_decode, and only the requested fields are kept.
+SEC_COMPANY_FACTS_BASE_URL = "https://data.sec.gov/api/xbrl/companyfacts"
+CHUNK_SIZE = 1 << 20
+FACT_FIELDS = ["start", "end", "val", "fy", "fp", "form", "frame", "filed"]
+COLUMNS = ["concept", "unit"] + FACT_FIELDS
+
+# Everything up to and including the next structural character outside a string
+_STRUCTURAL = re.compile(r'[^"{}\[\]]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"{}\[\]]*)*([{}\[\]])')
+_LAST_KEY = re.compile(r'"((?:[^"\\]|\\.)*)"\s*:\s*$')
+
+# Nesting levels of the document
+_ROOT, _FACTS, _TAXONOMY, _CONCEPT, _UNITS, _UNIT, _FACT = range(7)
+
+_decoder = json.JSONDecoder()
+
+
+def _wanted_concepts(concepts, taxonomy):
+    """{(taxonomy, concept)} from bare names (in `taxonomy`) or 'taxonomy:Concept' names."""
+    if concepts is None:
+        return None
+    wanted = set()
+    for name in concepts:
+        prefix, _, concept = name.rpartition(":")
+        wanted.add((prefix or taxonomy, concept))
+    return wanted
+
+
+def _chunks(source, chunk_size):
+    """Text chunks from a binary or text file-like object, or from a str/bytes document."""
+    if isinstance(source, (str, bytes)):
+        yield source.decode("utf-8") if isinstance(source, bytes) else source
+        return
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        yield decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def iter_facts(source, concepts, units=None, taxonomy="us-gaap", chunk_size=CHUNK_SIZE):
+    """
+    Yields (taxonomy, concept, unit, fact dict) for every fact of the requested
+    concepts in a single pass over a companyfacts document. concepts=None keeps
+    every concept of `taxonomy`; units optionally restricts the units kept
+    (e.g. {"USD"}).
+    """
+    wanted = _wanted_concepts(concepts, taxonomy)
+    taxonomies = {t for t, _ in wanted} if wanted is not None else {taxonomy}
+    units = set(units) if units else None
+    chunks = _chunks(source, chunk_size)
+    buf, pos, eof = "", 0, False
+    path = []  # key of each open container, outermost first
+    skip_depth = None  # depth at which an unwanted subtree was entered
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = next(chunks, None)
+        if chunk is None:
+            eof = True
+        else:
+            buf = buf[pos:] + chunk
+            pos = 0
+
+    while True:
+        match = _STRUCTURAL.match(buf, pos)
+        if match is None:
+            if eof:
+                return
+            fill()
+            continue
+        char = match.group(1)
+        depth = len(path)
+
+        if char in "]}":
+            path.pop()
+            pos = match.end()
+            if skip_depth is not None and len(path) < skip_depth:
+                skip_depth = None
+            continue
+
+        if skip_depth is not None:
+            path.append(None)
+            pos = match.end()
+            continue
+
+        if depth == _FACT and char == "{":
+            # A fact object: decode just this one object
+            start = match.end() - 1
+            try:
+                fact, end = _decoder.raw_decode(buf, start)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+            pos = end
+            yield path[_TAXONOMY], path[_CONCEPT], path[_UNIT], fact
+            continue
+
+        key_match = _LAST_KEY.search(match.group(0), 0, len(match.group(0)) - 1)
+        key = key_match.group(1) if key_match else None
+        path.append(key)
+        pos = match.end()
+
+        # Decide whether the container just opened (at level `depth`) can hold wanted facts
+        if depth == _FACTS and key != "facts":
+            skip_depth = depth + 1
+        elif depth == _TAXONOMY and key not in taxonomies:
+            skip_depth = depth + 1
+        elif depth == _CONCEPT and wanted is not None and (path[_TAXONOMY], key) not in wanted:
+            skip_depth = depth + 1
+        elif depth == _UNITS and key != "units":
+            skip_depth = depth + 1
+        elif depth == _UNIT and units is not None and key not in units:
+            skip_depth = depth + 1
+
+
+def parse_companyfacts(source, concepts, units=None, taxonomy="us-gaap", chunk_size=CHUNK_SIZE):
+    """
+    Long-format table (concept, unit, start, end, val, fy, fp, form, frame, filed)
+    of the requested concepts, built without materializing the whole document.
+    Concepts outside `taxonomy` are named 'taxonomy:Concept'.
+    """
+    columns = {name: [] for name in COLUMNS}
+    for fact_taxonomy, concept, unit, fact in iter_facts(source, concepts, units, taxonomy, chunk_size):
+        columns["concept"].append(concept if fact_taxonomy == taxonomy else f"{fact_taxonomy}:{concept}")
+        columns["unit"].append(unit)
+        for field in FACT_FIELDS:
+            columns[field].append(fact.get(field))
+    return _to_frame(columns)
+
+
+def _to_frame(columns):
+    table = pd.DataFrame(columns)
+    for name in ("concept", "unit", "fp", "form"):
+        table[name] = table[name].astype("category")
+    for name in ("start", "end", "filed"):
+        table[name] = pd.to_datetime(table[name], errors="coerce")
+    table["val"] = pd.to_numeric(table["val"], errors="coerce")
+    table["fy"] = pd.to_numeric(table["fy"], errors="coerce").astype("Int16")
+    return table
+
+
+def fetch_companyfacts(cik, concepts, units=None, taxonomy="us-gaap", timeout=60):
+    """
+    Parses a company's companyfacts document from EDGAR. The document is
+    streamed to the EDGAR disk cache (or revalidated there with a 304 when
+    unchanged) and parsed from the file in chunks.
+    """
+    url = f"{SEC_COMPANY_FACTS_BASE_URL}/CIK{format_cik(cik)}.json"
+    with open(edgar_client().cached_path(url, timeout=timeout), "rb") as f:
+        return parse_companyfacts(f, concepts, units, taxonomy)
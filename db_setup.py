@@ -1,5 +1,6 @@
 # db_setup.py
 import sqlite3
+from portfolio_db import init_portfolio_tables
 
 # Connect to the database file (it will be created if it doesn't exist)
 conn = sqlite3.connect('users.db')
@@ -15,7 +16,10 @@ CREATE TABLE IF NOT EXISTS users (
 )
 ''')
 
-print("Database 'users.db' and table 'users' are ready.")
+# Create the portfolio ledger tables (transactions and per-user holdings)
+init_portfolio_tables(conn)
+
+print("Database 'users.db' and tables 'users', 'portfolio_transactions' and 'portfolio_holdings' are ready.")
 
 # Save the changes and close the connection
 conn.commit()
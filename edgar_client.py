@@ -0,0 +1,165 @@
+# edgar_client.py
+import hashlib
+import json
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# --- Shared SEC EDGAR HTTP client ---
+# Every request to sec.gov goes through one process-wide client:
+#   - a pooled requests.Session, so connections (and TLS) are reused;
+#   - a token bucket shared by all threads, kept under SEC's fair-access
+#     limit of 10 requests per second;
+#   - retries with exponential backoff (or Retry-After) on 429 and 5xx;
+#   - an on-disk cache of revalidated documents (submissions, companyfacts,
+#     ...): the stored ETag / Last-Modified are sent back, so a document
+#     that has not changed costs a 304 instead of a full download.
+EDGAR_CACHE_DIR = os.path.join("data", "edgar_cache")
+MAX_REQUESTS_PER_SECOND = 10
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 4
+BACKOFF_SECONDS = 0.5
+POOL_SIZE = 16
+DOWNLOAD_CHUNK = 1 << 20
+
+# SEC requires a User-Agent identifying the application
+SEC_HEADERS = {
+    'User-Agent': 'YourAppName/1.0 YourContactEmail@example.com', # <--- IMPORTANT: Update this!
+    'Accept-Encoding': 'gzip, deflate',
+}
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, in bursts of at most `capacity`."""
+
+    def __init__(self, rate=MAX_REQUESTS_PER_SECOND, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Take the token now (possibly going negative) and sleep off the debt outside the lock
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+
+
+class EdgarClient:
+    """Rate-limited, retrying EDGAR session with a conditional-GET disk cache."""
+
+    def __init__(self, cache_dir=EDGAR_CACHE_DIR, rate=MAX_REQUESTS_PER_SECOND, headers=None):
+        self.cache_dir = cache_dir
+        self.bucket = TokenBucket(rate)
+        self.session = requests.Session()
+        self.session.headers.update(headers or SEC_HEADERS)
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, url, headers=None, stream=False, timeout=60):
+        """
+        GET with rate limiting and retries. Returns the response (also for 304);
+        raises requests.HTTPError for other error statuses once retries run out.
+        """
+        for attempt in range(MAX_RETRIES + 1):
+            self.bucket.acquire()
+            try:
+                response = self.session.get(url, headers=headers, stream=stream, timeout=timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt == MAX_RETRIES:
+                    raise
+                time.sleep(BACKOFF_SECONDS * 2 ** attempt)
+                continue
+            if response.status_code in RETRY_STATUSES and attempt < MAX_RETRIES:
+                retry_after = response.headers.get("Retry-After", "")
+                response.close()
+                time.sleep(float(retry_after) if retry_after.isdigit() else BACKOFF_SECONDS * 2 ** attempt)
+                continue
+            if response.status_code != 304:
+                response.raise_for_status()
+            return response
+
+    # --- Revalidated disk cache ---
+
+    def _cache_paths(self, url):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key + ".body"), os.path.join(self.cache_dir, key + ".json")
+
+    def cached_path(self, url, max_age=0, timeout=60):
+        """
+        Path of an up-to-date local copy of url. A copy younger than max_age
+        seconds is used as is; an older one is revalidated with If-None-Match /
+        If-Modified-Since, and the body is only downloaded (streamed to disk)
+        when it changed. A stale copy is served if EDGAR cannot be reached.
+        """
+        body_path, meta_path = self._cache_paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            meta = None
+        if meta is not None and not os.path.exists(body_path):
+            meta = None
+        if meta is not None and time.time() - meta["checked_at"] < max_age:
+            return body_path
+
+        headers = {}
+        if meta is not None and meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta is not None and meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        try:
+            with self.get(url, headers=headers, stream=True, timeout=timeout) as response:
+                if response.status_code != 304:
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    tmp_path = f"{body_path}.{threading.get_ident()}.tmp"
+                    try:
+                        with open(tmp_path, "wb") as f:
+                            for chunk in response.iter_content(DOWNLOAD_CHUNK):
+                                f.write(chunk)
+                        os.replace(tmp_path, body_path)
+                    finally:
+                        if os.path.exists(tmp_path):
+                            os.remove(tmp_path)
+                    meta = {"url": url, "etag": response.headers.get("ETag"),
+                            "last_modified": response.headers.get("Last-Modified")}
+        except requests.exceptions.RequestException:
+            if meta is None:
+                raise
+            return body_path  # EDGAR unreachable: serve the copy we have
+        meta["checked_at"] = time.time()
+        tmp_path = f"{meta_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+        return body_path
+
+    def get_bytes(self, url, max_age=0, timeout=60):
+        with open(self.cached_path(url, max_age, timeout), "rb") as f:
+            return f.read()
+
+    def get_json(self, url, max_age=0, timeout=60):
+        return json.loads(self.get_bytes(url, max_age, timeout))
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def edgar_client():
+    """The process-wide EDGAR client (one session and one rate limit for all pages and threads)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = EdgarClient()
+        return _client
@@ -0,0 +1,234 @@
+# facts_store.py
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from companyfacts_parser import fetch_companyfacts, parse_companyfacts
+from statement_builder import STATEMENT_LINES, line_by_company
+
+# --- Local XBRL facts warehouse ---
+# Every fact pulled from a companyfacts document is stored once as a row of
+# 'facts'. (cik, concept, fy, fp) serves one company's statements and
+# (concept, end) serves one concept across companies, so both views come
+# back from a single indexed query. 'companies' records when each CIK was
+# last loaded; 'concepts_loaded' records the latest filing date stored per
+# (cik, concept), so reloads insert only newer facts of concepts already
+# loaded and every fact of concepts loaded for the first time.
+FACTS_DB_PATH = os.path.join("data", "xbrl_facts.db")
+RELOAD_SECONDS = 24 * 60 * 60
+FACT_COLUMNS = ["cik", "concept", "unit", "start", "end", "val", "fy", "fp", "form", "frame", "filed"]
+CONCEPT = FACT_COLUMNS.index("concept")
+FILED = FACT_COLUMNS.index("filed")
+
+
+def _connect(db_path=FACTS_DB_PATH):
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript('''
+    CREATE TABLE IF NOT EXISTS facts (
+        cik INTEGER NOT NULL,
+        concept TEXT NOT NULL,
+        unit TEXT NOT NULL,
+        start TEXT NOT NULL DEFAULT '',
+        end TEXT NOT NULL,
+        val REAL,
+        fy INTEGER,
+        fp TEXT NOT NULL DEFAULT '',
+        form TEXT NOT NULL DEFAULT '',
+        frame TEXT,
+        filed TEXT NOT NULL DEFAULT '',
+        UNIQUE (cik, concept, unit, start, end, fy, fp, form, filed)
+    );
+    CREATE INDEX IF NOT EXISTS idx_facts_cik_concept_period
+        ON facts (cik, concept, fy, fp);
+    CREATE INDEX IF NOT EXISTS idx_facts_concept_end
+        ON facts (concept, end);
+
+    CREATE TABLE IF NOT EXISTS companies (
+        cik INTEGER PRIMARY KEY,
+        name TEXT,
+        loaded_at REAL NOT NULL,
+        last_filed TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS concepts_loaded (
+        cik INTEGER NOT NULL,
+        concept TEXT NOT NULL,
+        last_filed TEXT NOT NULL,
+        PRIMARY KEY (cik, concept)
+    ) WITHOUT ROWID;
+    ''')
+    return conn
+
+
+def _date_strings(dates):
+    text = np.datetime_as_string(dates.to_numpy(dtype="datetime64[D]"), unit="D")
+    return np.where(dates.isna().to_numpy(), "", text).tolist()
+
+
+def _nullable(values):
+    return values.astype(object).where(values.notna(), None).tolist()
+
+
+def fact_rows(cik, facts):
+    """
+    Rows for the facts table from a parse_companyfacts table, as a list of tuples.
+    Missing text fields become '' so the UNIQUE constraint can dedupe them.
+    """
+    table = facts.dropna(subset=["end"])
+    columns = [
+        [int(cik)] * len(table),
+        table["concept"].astype(object).fillna("").tolist(),
+        table["unit"].astype(object).fillna("").tolist(),
+        _date_strings(table["start"]),
+        _date_strings(table["end"]),
+        _nullable(table["val"]),
+        _nullable(table["fy"]),
+        table["fp"].astype(object).fillna("").tolist(),
+        table["form"].astype(object).fillna("").tolist(),
+        _nullable(table["frame"]),
+        _date_strings(table["filed"]),
+    ]
+    return list(zip(*columns))
+
+
+def _store_company(conn, cik, rows, name=None):
+    """Inserts one company's new fact rows on an open connection; returns the number of new rows."""
+    loaded = dict(conn.execute("SELECT concept, last_filed FROM concepts_loaded WHERE cik = ?", (int(cik),)))
+    # Facts of a concept filed before its last load are already stored; a
+    # concept missing from 'concepts_loaded' was never loaded and keeps all rows
+    rows = [r for r in rows if r[FILED] >= loaded.get(r[CONCEPT], "")]
+    before = conn.total_changes
+    conn.executemany(
+        f"INSERT OR IGNORE INTO facts ({', '.join(FACT_COLUMNS)}) VALUES ({', '.join('?' * len(FACT_COLUMNS))})",
+        rows,
+    )
+    inserted = conn.total_changes - before
+    for r in rows:
+        if r[FILED] > loaded.get(r[CONCEPT], ""):
+            loaded[r[CONCEPT]] = r[FILED]
+    conn.executemany(
+        "INSERT OR REPLACE INTO concepts_loaded (cik, concept, last_filed) VALUES (?, ?, ?)",
+        [(int(cik), concept, filed) for concept, filed in loaded.items()],
+    )
+    last_filed = max(loaded.values(), default="")
+    conn.execute(
+        '''INSERT INTO companies (cik, name, loaded_at, last_filed) VALUES (?, ?, ?, ?)
+           ON CONFLICT(cik) DO UPDATE SET name = COALESCE(excluded.name, name),
+           loaded_at = excluded.loaded_at, last_filed = excluded.last_filed''',
+        (int(cik), name, time.time(), last_filed or None),
+    )
+    return inserted
+
+
+def store_facts(cik, facts, name=None, db_path=FACTS_DB_PATH):
+    """
+    Inserts the facts of one company (a parse_companyfacts table) that are not
+    stored yet, in one transaction. Returns the number of new rows.
+    """
+    return store_many([(cik, name, fact_rows(cik, facts))], db_path)
+
+
+def store_many(companies, db_path=FACTS_DB_PATH):
+    """Stores several (cik, name, fact_rows) companies in a single transaction."""
+    conn = _connect(db_path)
+    try:
+        with conn:
+            return sum(_store_company(conn, cik, rows, name) for cik, name, rows in companies)
+    finally:
+        conn.close()
+
+
+def load_companyfacts(cik, source=None, name=None, concepts=None, db_path=FACTS_DB_PATH):
+    """
+    Parses a companyfacts document (a file-like object, or EDGAR when source is
+    None) and stores its facts. concepts=None keeps every us-gaap concept.
+    """
+    if source is None:
+        facts = fetch_companyfacts(cik, concepts)
+    else:
+        facts = parse_companyfacts(source, concepts)
+    return store_facts(cik, facts, name, db_path)
+
+
+def loaded_at(cik, db_path=FACTS_DB_PATH):
+    """Unix time the company was last loaded, or None."""
+    conn = _connect(db_path)
+    try:
+        row = conn.execute("SELECT loaded_at FROM companies WHERE cik = ?", (int(cik),)).fetchone()
+        return row[0] if row else None
+    finally:
+        conn.close()
+
+
+def ensure_company(cik, name=None, max_age=RELOAD_SECONDS, db_path=FACTS_DB_PATH):
+    """Loads the company from EDGAR unless it was loaded within max_age seconds."""
+    last = loaded_at(cik, db_path)
+    if last is not None and time.time() - last < max_age:
+        return 0
+    return load_companyfacts(cik, name=name, db_path=db_path)
+
+
+def _query(sql, params, db_path):
+    conn = _connect(db_path)
+    try:
+        facts = pd.read_sql_query(sql, conn, params=params)
+    finally:
+        conn.close()
+    for name in ("start", "end", "filed"):
+        if name in facts:
+            facts[name] = pd.to_datetime(facts[name].where(facts[name] != ""), errors="coerce")
+    return facts
+
+
+def company_facts(cik, concepts, units=("USD",), fy=None, fp=None, db_path=FACTS_DB_PATH):
+    """Long table of one company's facts for the given concepts (served by the (cik, concept, fy, fp) index)."""
+    concepts, units = list(concepts), list(units)
+    sql = (f"SELECT {', '.join(FACT_COLUMNS)} FROM facts WHERE cik = ? "
+           f"AND concept IN ({', '.join('?' * len(concepts))}) AND unit IN ({', '.join('?' * len(units))})")
+    params = [int(cik)] + concepts + units
+    if fy is not None:
+        sql += " AND fy = ?"
+        params.append(int(fy))
+    if fp is not None:
+        sql += " AND fp = ?"
+        params.append(fp)
+    return _query(sql, params, db_path)
+
+
+def concept_across_companies(concept, start=None, end=None, unit="USD", db_path=FACTS_DB_PATH):
+    """
+    One concept (or a list of concepts) for every stored company with a period
+    ending in [start, end), with company names (served by the (concept, end) index).
+    """
+    concepts = [concept] if isinstance(concept, str) else list(concept)
+    sql = (f'''SELECT f.cik, c.name, f.concept, f.unit, f.start, f.end, f.val, f.fy, f.fp, f.form, f.frame, f.filed
+               FROM facts f LEFT JOIN companies c ON c.cik = f.cik
+               WHERE f.concept IN ({', '.join('?' * len(concepts))}) AND f.unit = ?''')
+    params = concepts + [unit]
+    if start is not None:
+        sql += " AND f.end >= ?"
+        params.append(pd.Timestamp(start).strftime("%Y-%m-%d"))
+    if end is not None:
+        sql += " AND f.end < ?"
+        params.append(pd.Timestamp(end).strftime("%Y-%m-%d"))
+    return _query(sql, params, db_path)
+
+
+def latest_by_company(line, basis="annual", within_days=400, db_path=FACTS_DB_PATH):
+    """
+    Latest annual (or TTM) value of a statement line for each company whose
+    period ended within the last within_days, with company names. Facts go
+    back one more year so TTM sums and derived quarters have their inputs.
+    """
+    since = datetime.today() - timedelta(days=within_days)
+    facts = concept_across_companies(STATEMENT_LINES[line], start=since - timedelta(days=366), db_path=db_path)
+    values = line_by_company(facts, line, basis)
+    values = values[values["end"] >= since]
+    names = facts.drop_duplicates("cik").set_index("cik")["name"]
+    return values.assign(name=values["cik"].map(names)).reset_index(drop=True)
@@ -0,0 +1,120 @@
+# filing_index.py
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from edgar_client import edgar_client
+from sec_resolver import format_cik
+
+# --- Per-CIK filing history ---
+# data.sec.gov/submissions/CIK##########.json lists only the latest ~1000
+# filings under filings.recent; older ones are in paginated files listed
+# under filings.files. All pages are fetched concurrently (history pages
+# never change, so they come from the EDGAR cache after the first load),
+# merged into typed numpy columns and saved as one .npz per CIK. Queries by
+# form type and date range are vectorized masks over those columns.
+SEC_SUBMISSIONS_API_BASE_URL = "https://data.sec.gov/submissions"
+FILING_INDEX_DIR = os.path.join("data", "filing_index")
+REFRESH_SECONDS = 60 * 60
+HISTORY_MAX_AGE = 30 * 24 * 60 * 60
+FETCH_WORKERS = 4
+
+# submissions field -> (column, dtype)
+FIELDS = {
+    "accessionNumber": ("accession_number", "U20"),
+    "form": ("form", "U"),
+    "filingDate": ("filing_date", "datetime64[D]"),
+    "reportDate": ("report_date", "datetime64[D]"),
+    "primaryDocument": ("primary_document", "U"),
+    "size": ("size", np.int64),
+}
+
+
+def _index_path(cik, root=FILING_INDEX_DIR):
+    return os.path.join(root, f"CIK{format_cik(cik)}.npz")
+
+
+def _columns(page):
+    """Typed arrays from one columnar submissions page (filings.recent or a history file)."""
+    columns = {}
+    for field, (name, dtype) in FIELDS.items():
+        values = page.get(field, [])
+        if dtype == "datetime64[D]":
+            # Missing dates come as '' and become NaT
+            columns[name] = np.array([v or "NaT" for v in values], dtype="datetime64[D]")
+        elif dtype is np.int64:
+            columns[name] = np.array([v or 0 for v in values], dtype=np.int64)
+        else:
+            columns[name] = np.array(values, dtype=dtype) if values else np.array([], dtype="U1")
+    return columns
+
+
+def build_filing_index(cik, workers=FETCH_WORKERS):
+    """Every filing of a CIK (recent page plus all history pages) as typed arrays, newest first."""
+    client = edgar_client()
+    submissions = client.get_json(f"{SEC_SUBMISSIONS_API_BASE_URL}/CIK{format_cik(cik)}.json")
+    filings = submissions.get("filings", {})
+    history_urls = [f"{SEC_SUBMISSIONS_API_BASE_URL}/{f['name']}" for f in filings.get("files", [])]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        history = list(pool.map(lambda url: client.get_json(url, max_age=HISTORY_MAX_AGE), history_urls))
+
+    pages = [_columns(filings.get("recent", {}))] + [_columns(page) for page in history]
+    index = {name: np.concatenate([page[name] for page in pages]) for name, _ in FIELDS.values()}
+    # Pages can overlap at their edges; keep one row per accession number
+    _, first = np.unique(index["accession_number"], return_index=True)
+    order = first[np.argsort(index["filing_date"][first], kind="stable")[::-1]]
+    return {name: column[order] for name, column in index.items()}
+
+
+def save_filing_index(cik, index, root=FILING_INDEX_DIR):
+    os.makedirs(root, exist_ok=True)
+    path = _index_path(cik, root)
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, **index)
+    os.replace(tmp_path, path)
+
+
+def load_filing_index(cik, max_age=REFRESH_SECONDS, root=FILING_INDEX_DIR):
+    """
+    The CIK's filing index from disk, rebuilt from EDGAR when it is missing or
+    older than max_age. A stale index is served if EDGAR cannot be reached.
+    """
+    path = _index_path(cik, root)
+    fresh = os.path.exists(path) and time.time() - os.path.getmtime(path) < max_age
+    if not fresh:
+        try:
+            save_filing_index(cik, build_filing_index(cik), root)
+        except Exception:
+            if not os.path.exists(path):
+                raise
+    with np.load(path) as data:
+        return {name: data[name] for name, _ in FIELDS.values()}
+
+
+def filter_filings(index, forms=None, start=None, end=None, limit=None):
+    """
+    Filings of the given form types filed in [start, end] (either bound
+    optional) as a DataFrame, newest first, at most `limit` rows.
+    """
+    mask = np.ones(len(index["accession_number"]), dtype=bool)
+    if forms is not None:
+        mask &= np.isin(index["form"], list(forms))
+    if start is not None:
+        mask &= index["filing_date"] >= np.datetime64(pd.Timestamp(start).date(), "D")
+    if end is not None:
+        mask &= index["filing_date"] <= np.datetime64(pd.Timestamp(end).date(), "D")
+    rows = np.flatnonzero(mask)[:limit]
+    return pd.DataFrame({name: column[rows] for name, column in index.items()})
+
+
+def find_filings(cik, forms=None, start=None, end=None, limit=None, max_age=REFRESH_SECONDS):
+    """Filings of a CIK by form type and filing-date range, e.g. find_filings(cik, ["4"], start="2010-01-01")."""
+    return filter_filings(load_filing_index(cik, max_age), forms, start, end, limit)
+
+
+def filing_url(cik, accession_number, primary_document):
+    return (f"https://www.sec.gov/Archives/edgar/data/{format_cik(cik)}/"
+            f"{accession_number.replace('-', '')}/{primary_document}")
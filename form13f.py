@@ -0,0 +1,175 @@
+# form13f.py
+import re
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pandas as pd
+
+from edgar_client import edgar_client
+
+# --- Form 13F information tables ---
+# A 13F-HR filing carries its holdings in a separate information-table XML
+# document (one <infoTable> element per position), listed in the filing's
+# index.json. The XML is streamed into iterparse straight from the response
+# and every <infoTable> is cleared as soon as its fields are copied out, so
+# memory stays flat even for managers that file tens of thousands of rows.
+# Holdings are columns (cusip, issuer, class, value, shares, share_type,
+# put_call); quarter-over-quarter changes are one outer merge of two quarters.
+SEC_ARCHIVES_BASE_URL = "https://www.sec.gov/Archives/edgar/data"
+SEC_FULL_INDEX_URL = "https://www.sec.gov/Archives/edgar/full-index/{year}/QTR{quarter}/form.idx"
+HOLDING_COLUMNS = ["cusip", "issuer", "title_of_class", "value", "shares", "share_type", "put_call"]
+# Values were reported in thousands of dollars until the January 2023 form change
+DOLLAR_VALUES_SINCE = pd.Timestamp("2023-01-03")
+CHANGE_KINDS = ["New", "Exited", "Increased", "Decreased", "Unchanged"]
+
+_FIELDS = {
+    "nameOfIssuer": "issuer",
+    "titleOfClass": "title_of_class",
+    "cusip": "cusip",
+    "value": "value",
+    "sshPrnamt": "shares",
+    "sshPrnamtType": "share_type",
+    "putCall": "put_call",
+}
+
+
+_INDEX_LINE = re.compile(r"^(\S+)\s+(.+?)\s+(\d+)\s+(\d{4}-\d{2}-\d{2})\s+(\S+)$")
+
+
+def _local(tag):
+    """Tag name without its XML namespace."""
+    return tag.rsplit("}", 1)[-1]
+
+
+def information_table_url(cik, accession_number, timeout=30):
+    """URL of a filing's information-table XML, found through the filing's index.json (None if absent)."""
+    folder = f"{SEC_ARCHIVES_BASE_URL}/{int(cik)}/{accession_number.replace('-', '')}"
+    index = edgar_client().get(f"{folder}/index.json", timeout=timeout).json()
+    names = [item["name"] for item in index.get("directory", {}).get("item", [])]
+    xml_names = [n for n in names if n.lower().endswith(".xml") and n.lower() != "primary_doc.xml"]
+    if not xml_names:
+        return None
+    # Filers name the document freely ("infotable.xml", "form13fInfoTable.xml", "50240.xml", ...)
+    preferred = [n for n in xml_names if "info" in n.lower() or "table" in n.lower()]
+    return f"{folder}/{(preferred or xml_names)[0]}"
+
+
+def parse_information_table(source):
+    """
+    Holdings table (one row per <infoTable>) from an information-table XML
+    file-like object or path, parsed incrementally at constant memory.
+    """
+    columns = {name: [] for name in HOLDING_COLUMNS}
+    row = {}
+    context = ET.iterparse(source, events=("start", "end"))
+    _, root = next(context)
+    for event, elem in context:
+        if event != "end":
+            continue
+        tag = _local(elem.tag)
+        if tag in _FIELDS:
+            row[_FIELDS[tag]] = (elem.text or "").strip()
+        elif tag == "infoTable":
+            for name in HOLDING_COLUMNS:
+                columns[name].append(row.get(name))
+            row = {}
+            root.clear()  # Drop the finished position (and any earlier ones) from the tree
+    return _to_frame(columns)
+
+
+def _to_frame(columns):
+    table = pd.DataFrame(columns, columns=HOLDING_COLUMNS)
+    table["cusip"] = table["cusip"].str.upper()
+    table["value"] = pd.to_numeric(table["value"], errors="coerce").astype("float64")
+    table["shares"] = pd.to_numeric(table["shares"], errors="coerce").astype("float64")
+    table["put_call"] = table["put_call"].fillna("").str.title()
+    for name in ("title_of_class", "share_type", "put_call"):
+        table[name] = table[name].astype("category")
+    return table
+
+
+def aggregate_holdings(holdings):
+    """One row per (cusip, put_call): positions split across sub-managers are summed."""
+    if holdings.empty:
+        return holdings
+    grouped = holdings.groupby(["cusip", "put_call"], observed=True, sort=False)
+    table = grouped.agg(issuer=("issuer", "first"), title_of_class=("title_of_class", "first"),
+                        value=("value", "sum"), shares=("shares", "sum"), share_type=("share_type", "first"))
+    table = table.reset_index()[HOLDING_COLUMNS]
+    total = table["value"].sum()
+    table["weight"] = table["value"] / total if total else np.nan
+    return table.sort_values("value", ascending=False, ignore_index=True)
+
+
+def fetch_holdings(cik, accession_number, filing_date=None, timeout=60):
+    """
+    Aggregated holdings of one 13F-HR filing, with values in dollars.
+    Returns an empty table if the filing has no information table.
+    """
+    url = information_table_url(cik, accession_number)
+    if url is None:
+        return aggregate_holdings(_to_frame({name: [] for name in HOLDING_COLUMNS}))
+    with edgar_client().get(url, stream=True, timeout=timeout) as response:
+        response.raw.decode_content = True
+        holdings = parse_information_table(response.raw)
+    if filing_date is not None and pd.Timestamp(filing_date) < DOLLAR_VALUES_SINCE:
+        holdings["value"] *= 1000
+    return aggregate_holdings(holdings)
+
+
+def quarter_changes(current, previous):
+    """
+    Position changes between two aggregated holdings tables, joined on
+    (cusip, put_call): change is New, Exited, Increased, Decreased or Unchanged.
+    """
+    keys = ["cusip", "put_call"]
+    merged = pd.merge(
+        current[keys + ["issuer", "value", "shares"]],
+        previous[keys + ["issuer", "value", "shares"]],
+        on=keys, how="outer", suffixes=("", "_prev"),
+    )
+    merged["issuer"] = merged["issuer"].fillna(merged.pop("issuer_prev"))
+    shares = merged["shares"].fillna(0).to_numpy()
+    shares_prev = merged["shares_prev"].fillna(0).to_numpy()
+    merged["change"] = np.select(
+        [shares_prev == 0, shares == 0, shares > shares_prev, shares < shares_prev],
+        CHANGE_KINDS[:4], default=CHANGE_KINDS[4],
+    )
+    merged["change"] = pd.Categorical(merged["change"], categories=CHANGE_KINDS)
+    merged["share_change"] = shares - shares_prev
+    with np.errstate(divide="ignore", invalid="ignore"):
+        merged["pct_change"] = np.where(shares_prev > 0, merged["share_change"] / shares_prev, np.nan)
+    merged["value_change"] = merged["value"].fillna(0) - merged["value_prev"].fillna(0)
+    # Within each kind of change, largest moves in dollars first
+    order = np.lexsort((-merged["value_change"].abs().to_numpy(), merged["change"].cat.codes.to_numpy()))
+    return merged.iloc[order].reset_index(drop=True)
+
+
+def report_quarter_ends(filing_dates):
+    """Quarter end each 13F-HR reports on: the last quarter end before its filing date."""
+    return (pd.to_datetime(filing_dates).dt.to_period("Q") - 1).dt.end_time.dt.normalize()
+
+
+def quarter_filings(year, quarter, forms=("13F-HR",), timeout=60):
+    """
+    Every filing of the given forms in one EDGAR full-index quarter, as a table
+    (cik, name, form, filing_date, accession_number, report_date). The index
+    has no period of report, so report_date is the quarter end before filing.
+    """
+    # Past quarters never change and the current one only grows, so the cached copy is revalidated
+    text = edgar_client().get_bytes(SEC_FULL_INDEX_URL.format(year=int(year), quarter=int(quarter)),
+                                    timeout=timeout).decode("latin-1")
+    rows = []
+    for line in text.splitlines():
+        form = line.split(" ", 1)[0]
+        if form not in forms:
+            continue
+        match = _INDEX_LINE.match(line)
+        if match:
+            form, name, cik, filed, file_name = match.groups()
+            accession = file_name.rsplit("/", 1)[-1].removesuffix(".txt")
+            rows.append((int(cik), name, form, filed, accession))
+    table = pd.DataFrame(rows, columns=["cik", "name", "form", "filing_date", "accession_number"])
+    table["filing_date"] = pd.to_datetime(table["filing_date"])
+    table["report_date"] = report_quarter_ends(table["filing_date"])
+    return table
@@ -0,0 +1,291 @@
+# form4.py
+import os
+import sqlite3
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from edgar_client import edgar_client
+
+# --- Form 3/4/5 insider transactions ---
+# Each ownership filing has a small XML document listing the reporting owner
+# and a non-derivative and a derivative transaction table. Documents are
+# fetched on a thread pool through the shared EDGAR client, whose rate
+# limiter keeps the pool under SEC's 10 requests per second, and the parsed
+# transactions are cached in SQLite by accession number for good: filings
+# never change once accepted.
+# Aggregates only count open-market purchases (P) and sales (S); grants,
+# exercises and gifts move shares without being a trading decision.
+SEC_ARCHIVES_BASE_URL = "https://www.sec.gov/Archives/edgar/data"
+FORM4_DB_PATH = os.path.join("data", "form4.db")
+FETCH_WORKERS = 8
+OPEN_MARKET_CODES = ("P", "S")
+TRANSACTION_COLUMNS = [
+    "accession_number", "seq", "form", "filing_date", "issuer_cik", "issuer_name", "owner_cik", "owner_name",
+    "relationship", "table_type", "security", "date", "code", "shares", "price", "acquired_disposed",
+    "shares_after", "ownership", "underlying_security", "underlying_shares", "exercise_price",
+]
+TRANSACTION_CODES = {
+    "P": "Open-market purchase", "S": "Open-market sale", "A": "Grant or award", "M": "Option exercise",
+    "F": "Tax withholding", "G": "Gift", "D": "Disposition to issuer", "C": "Conversion",
+    "X": "Exercise of in-the-money derivative", "J": "Other",
+}
+
+
+def _connect(db_path=FORM4_DB_PATH):
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(f'''
+    CREATE TABLE IF NOT EXISTS filings (
+        accession_number TEXT PRIMARY KEY,
+        issuer_cik INTEGER,
+        form TEXT,
+        filing_date TEXT,
+        loaded_at REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS transactions (
+        {', '.join(c + ' INTEGER NOT NULL' if c == 'seq' else c for c in TRANSACTION_COLUMNS)},
+        PRIMARY KEY (accession_number, seq)
+    );
+    CREATE INDEX IF NOT EXISTS idx_transactions_issuer_date
+        ON transactions (issuer_cik, date);
+    ''')
+    return conn
+
+
+def raw_document_name(primary_document):
+    """
+    The filed XML behind a primaryDocument: EDGAR lists the rendered view
+    ('xslF345X05/form4.xml'), the raw document is the same name at the top level.
+    """
+    return primary_document.rsplit("/", 1)[-1]
+
+
+def _text(elem, path):
+    """Text of path/value (or of path itself) under elem, or None."""
+    if elem is None:
+        return None
+    node = elem.find(f"{path}/value")
+    if node is None:
+        node = elem.find(path)
+    text = node.text.strip() if node is not None and node.text else None
+    return text or None
+
+
+def _number(elem, path):
+    text = _text(elem, path)
+    try:
+        return float(text) if text is not None else None
+    except ValueError:
+        return None
+
+
+def _relationship(owner):
+    relationship = owner.find("reportingOwnerRelationship")
+    roles = []
+    if _text(relationship, "isDirector") in ("1", "true"):
+        roles.append("Director")
+    if _text(relationship, "isOfficer") in ("1", "true"):
+        roles.append(_text(relationship, "officerTitle") or "Officer")
+    if _text(relationship, "isTenPercentOwner") in ("1", "true"):
+        roles.append("10% Owner")
+    if _text(relationship, "isOther") in ("1", "true"):
+        roles.append(_text(relationship, "otherText") or "Other")
+    return ", ".join(roles)
+
+
+def parse_ownership_document(xml, accession_number=None, filing_date=None):
+    """Transaction rows (dicts with TRANSACTION_COLUMNS) from a Form 3/4/5 XML document."""
+    root = ET.fromstring(xml)
+    owners = root.findall("reportingOwner")
+    owner = owners[0] if owners else None
+    common = {
+        "accession_number": accession_number,
+        "form": _text(root, "documentType"),
+        "filing_date": filing_date,
+        "issuer_cik": int(_text(root, "issuer/issuerCik") or 0) or None,
+        "issuer_name": _text(root, "issuer/issuerName"),
+        "owner_cik": int(_text(owner, "reportingOwnerId/rptOwnerCik") or 0) or None,
+        # Joint filings list every owner; the first one is shown with the others appended
+        "owner_name": "; ".join(filter(None, (_text(o, "reportingOwnerId/rptOwnerName") for o in owners))),
+        "relationship": _relationship(owner) if owner is not None else "",
+    }
+    rows = []
+    for table, path in (("Non-derivative", "nonDerivativeTable/nonDerivativeTransaction"),
+                        ("Derivative", "derivativeTable/derivativeTransaction")):
+        for transaction in root.findall(path):
+            rows.append({
+                **common,
+                "seq": len(rows),
+                "table_type": table,
+                "security": _text(transaction, "securityTitle"),
+                "date": _text(transaction, "transactionDate"),
+                "code": _text(transaction, "transactionCoding/transactionCode"),
+                "shares": _number(transaction, "transactionAmounts/transactionShares"),
+                "price": _number(transaction, "transactionAmounts/transactionPricePerShare"),
+                "acquired_disposed": _text(transaction, "transactionAmounts/transactionAcquiredDisposedCode"),
+                "shares_after": _number(transaction, "postTransactionAmounts/sharesOwnedFollowingTransaction"),
+                "ownership": _text(transaction, "ownershipNature/directOrIndirectOwnership"),
+                "underlying_security": _text(transaction, "underlyingSecurity/underlyingSecurityTitle"),
+                "underlying_shares": _number(transaction, "underlyingSecurity/underlyingSecurityShares"),
+                "exercise_price": _number(transaction, "conversionOrExercisePrice"),
+            })
+    return rows
+
+
+def fetch_ownership_document(cik, accession_number, primary_document, timeout=30):
+    """Downloads the raw XML of one ownership filing."""
+    url = (f"{SEC_ARCHIVES_BASE_URL}/{int(cik)}/{accession_number.replace('-', '')}/"
+           f"{raw_document_name(primary_document)}")
+    return edgar_client().get(url, timeout=timeout).content
+
+
+def _store(conn, cik, filing, rows):
+    conn.execute(
+        "INSERT OR REPLACE INTO filings (accession_number, issuer_cik, form, filing_date, loaded_at) VALUES (?, ?, ?, ?, ?)",
+        (filing["accession_number"], int(cik), filing["form"], filing["filing_date"], time.time()),
+    )
+    conn.executemany(
+        f"INSERT OR REPLACE INTO transactions ({', '.join(TRANSACTION_COLUMNS)}) "
+        f"VALUES ({', '.join('?' * len(TRANSACTION_COLUMNS))})",
+        [tuple(row[c] for c in TRANSACTION_COLUMNS) for row in rows],
+    )
+
+
+def _cached_accessions(conn, accession_numbers):
+    cached = set()
+    for i in range(0, len(accession_numbers), 500):
+        chunk = accession_numbers[i:i + 500]
+        cached.update(row[0] for row in conn.execute(
+            f"SELECT accession_number FROM filings WHERE accession_number IN ({', '.join('?' * len(chunk))})", chunk))
+    return cached
+
+
+def load_transactions(cik, filings, workers=FETCH_WORKERS, db_path=FORM4_DB_PATH):
+    """
+    Transactions of the given filings (dicts with accession_number,
+    primary_document, form and filing_date) as one table. Filings not in the
+    cache are downloaded concurrently and cached; failed downloads are
+    skipped and retried on the next call, and documents that cannot be
+    parsed are cached with no transactions.
+    """
+    accession_numbers = [f["accession_number"] for f in filings]
+    conn = _connect(db_path)
+    try:
+        cached = _cached_accessions(conn, accession_numbers)
+    finally:
+        conn.close()
+    missing = [f for f in filings if f["accession_number"] not in cached]
+
+    def fetch(filing):
+        try:
+            xml = fetch_ownership_document(cik, filing["accession_number"], filing["primary_document"])
+        except Exception:
+            return filing, None  # Not cached; retried on the next call
+        try:
+            return filing, parse_ownership_document(xml, filing["accession_number"], filing["filing_date"])
+        except Exception:
+            return filing, []  # Unparseable: cached with no transactions so it is not fetched again
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(fetch, missing))
+        conn = _connect(db_path)
+        try:
+            with conn:
+                for filing, rows in results:
+                    if rows is not None:
+                        _store(conn, cik, filing, rows)
+        finally:
+            conn.close()
+
+    conn = _connect(db_path)
+    try:
+        transactions = []
+        for i in range(0, len(accession_numbers), 500):
+            chunk = accession_numbers[i:i + 500]
+            transactions.append(pd.read_sql_query(
+                f"SELECT {', '.join(TRANSACTION_COLUMNS)} FROM transactions "
+                f"WHERE accession_number IN ({', '.join('?' * len(chunk))})", conn, params=chunk))
+    finally:
+        conn.close()
+    if not transactions:
+        return _with_values(pd.DataFrame(columns=TRANSACTION_COLUMNS))
+    return _with_values(pd.concat(transactions, ignore_index=True))
+
+
+def _with_values(transactions):
+    """Adds date types and a signed value column (+ acquired, - disposed)."""
+    transactions = transactions.copy()
+    transactions["date"] = pd.to_datetime(transactions["date"], errors="coerce")
+    transactions["filing_date"] = pd.to_datetime(transactions["filing_date"], errors="coerce")
+    for name in ("shares", "price", "shares_after", "underlying_shares", "exercise_price"):
+        transactions[name] = pd.to_numeric(transactions[name], errors="coerce")
+    sign = np.where(transactions["acquired_disposed"].to_numpy() == "D", -1.0, 1.0)
+    transactions["value"] = sign * transactions["shares"].fillna(0) * transactions["price"].fillna(0) + 0.0
+    return transactions.sort_values(["date", "accession_number", "seq"], ascending=[False, True, True],
+                                    ignore_index=True)
+
+
+def net_activity(transactions, by="owner_name"):
+    """
+    Open-market buying and selling per group (by='owner_name' per insider,
+    by='issuer_name' per company): bought, sold and net value, share counts
+    and the latest trade date, largest net buyers first.
+    """
+    trades = transactions[transactions["code"].isin(OPEN_MARKET_CODES)]
+    if trades.empty:
+        return pd.DataFrame(columns=[by, "bought", "sold", "net", "shares_bought", "shares_sold", "trades", "last_trade"])
+    bought = trades["code"].to_numpy() == "P"
+    trades = trades.assign(
+        bought=np.where(bought, trades["value"], 0.0),
+        sold=np.where(bought, 0.0, -trades["value"]),
+        shares_bought=np.where(bought, trades["shares"], 0.0),
+        shares_sold=np.where(bought, 0.0, trades["shares"]),
+    )
+    summary = trades.groupby(by).agg(
+        bought=("bought", "sum"), sold=("sold", "sum"), shares_bought=("shares_bought", "sum"),
+        shares_sold=("shares_sold", "sum"), trades=("code", "size"), last_trade=("date", "max"),
+    )
+    summary.insert(2, "net", summary["bought"] - summary["sold"])
+    return summary.sort_values("net", ascending=False).reset_index()
+
+
+def cluster_buys(transactions, window_days=30, min_insiders=3):
+    """
+    Periods in which at least min_insiders different insiders bought on the
+    open market within window_days of each other. Returns one row per cluster
+    (start, end, insiders, names, value, shares).
+    """
+    columns = ["start", "end", "insiders", "names", "value", "shares"]
+    buys = transactions[(transactions["code"] == "P") & transactions["date"].notna()].sort_values("date")
+    if buys.empty:
+        return pd.DataFrame(columns=columns)
+    days = buys["date"].to_numpy().astype("datetime64[D]").astype(np.int64)
+    owners, owner_codes = np.unique(buys["owner_name"].to_numpy(dtype=str), return_inverse=True)
+    # in_window[i, j]: buy j falls in the window ending at buy i
+    in_window = (days[None, :] <= days[:, None]) & (days[None, :] > days[:, None] - window_days)
+    owner_matrix = np.zeros((len(days), len(owners)), dtype=bool)
+    owner_matrix[np.arange(len(days)), owner_codes] = True
+    insiders = (in_window.astype(np.int32) @ owner_matrix.astype(np.int32) > 0).sum(axis=1)
+
+    qualifying = np.flatnonzero(insiders >= min_insiders)
+    if not len(qualifying):
+        return pd.DataFrame(columns=columns)
+    # Overlapping windows belong to one cluster
+    episode = np.concatenate([[0], np.cumsum(np.diff(days[qualifying]) >= window_days)])
+    clusters = []
+    for e in np.unique(episode):
+        ends = qualifying[episode == e]
+        members = in_window[ends].any(axis=0)
+        cluster = buys[members]
+        clusters.append({
+            "start": cluster["date"].min(), "end": cluster["date"].max(),
+            "insiders": cluster["owner_name"].nunique(), "names": ", ".join(sorted(cluster["owner_name"].unique())),
+            "value": cluster["value"].sum(), "shares": cluster["shares"].sum(),
+        })
+    return pd.DataFrame(clusters, columns=columns).sort_values("end", ascending=False, ignore_index=True)
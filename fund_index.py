@@ -0,0 +1,91 @@
+# fund_index.py
+import json
+import os
+import time
+
+import requests
+import streamlit as st
+
+from search_index import TextIndex
+
+# --- Local mutual fund scheme index ---
+# The full scheme master list from mfapi.in (~40k schemes) is downloaded at
+# most once a day, kept on disk, and searched through an in-memory
+# TextIndex, so a search never needs a remote call.
+SCHEME_LIST_URL = "https://api.mfapi.in/mf"
+SCHEME_LIST_PATH = os.path.join("data", "mf_schemes.json")
+REFRESH_SECONDS = 24 * 60 * 60
+
+
+def _read_cached_schemes(path=SCHEME_LIST_PATH):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def save_schemes(schemes, path=SCHEME_LIST_PATH):
+    """Writes the scheme list atomically so readers never see a partial file."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"fetched_at": time.time(), "schemes": schemes}, f)
+    os.replace(tmp_path, path)
+
+
+def load_schemes(path=SCHEME_LIST_PATH, max_age=REFRESH_SECONDS):
+    """
+    Returns the scheme master list, downloading it only if the local copy is
+    missing or older than max_age. A stale copy is used if the download fails.
+    """
+    cached = _read_cached_schemes(path)
+    if cached and time.time() - cached.get("fetched_at", 0) < max_age:
+        return cached["schemes"]
+    try:
+        response = requests.get(SCHEME_LIST_URL, timeout=60)
+        response.raise_for_status()
+        schemes = [
+            {"schemeCode": s["schemeCode"], "schemeName": s["schemeName"]}
+            for s in response.json() if s.get("schemeName")
+        ]
+        save_schemes(schemes, path)
+        return schemes
+    except (requests.exceptions.RequestException, ValueError, KeyError):
+        return cached["schemes"] if cached else []
+
+
+class FundIndex:
+    """Ranked prefix and fuzzy search over scheme names."""
+
+    def __init__(self, schemes):
+        self.schemes = schemes
+        self.index = TextIndex([s["schemeName"] for s in schemes])
+        self.by_code = {int(s["schemeCode"]): s for s in schemes}
+
+    def __len__(self):
+        return len(self.schemes)
+
+    def search(self, query, limit=20):
+        """Returns matches in the same shape as the mfapi.in search endpoint."""
+        return [self.schemes[i] for i in self.index.search(query, limit)]
+
+
+def _scheme_list_version(path=SCHEME_LIST_PATH):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+@st.cache_resource(ttl=REFRESH_SECONDS, max_entries=1)
+def _build_fund_index(version):
+    return FundIndex(load_schemes())
+
+
+def get_fund_index():
+    """
+    The process-wide scheme index, rebuilt once a day and whenever the scheme
+    list file changes, including when another process (amfi_ingest) rewrote it.
+    """
+    return _build_fund_index(_scheme_list_version())
@@ -0,0 +1,225 @@
+# fund_screener.py
+import os
+import sqlite3
+import warnings
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from fund_index import load_schemes
+from nav_store import from_days, to_day
+from price_store import get_history
+
+# --- Whole-universe fund screener ---
+# NAVs of every scheme are laid out as one aligned (trading day x scheme)
+# float32 matrix, and each metric is a single 2-D NumPy expression over it.
+# The result is written once a day to a SQLite metrics table that the UI
+# filters and sorts with plain SQL queries.
+METRICS_DB_PATH = os.path.join("data", "fund_metrics.db")
+BENCHMARK_TICKER = "^NSEI"
+LOOKBACK_YEARS = 5
+RISK_WINDOW_YEARS = 3  # window for Sharpe, Sortino, drawdown and capture
+RISK_FREE_RATE = 0.065  # annual, roughly the Indian T-bill yield
+TRADING_DAYS = 252
+MIN_COVERAGE = 0.8  # share of days a scheme needs in a window to be scored
+TRADING_DAY_MIN_SHARE = 0.1  # a calendar day is a trading day if this share of schemes has a NAV
+MAX_STALE_DAYS = 5  # trading days since a scheme's last published NAV before it is dropped
+
+METRIC_COLUMNS = [
+    "cagr_1y", "cagr_3y", "cagr_5y", "rolling_1y_positive", "rolling_1y_beats_benchmark",
+    "sharpe", "sortino", "max_drawdown", "downside_capture",
+]
+
+
+def build_nav_matrix(store, years=LOOKBACK_YEARS, end=None):
+    """
+    Returns (dates, codes, matrix): NAVs of every scheme on every trading day of
+    the last `years` years, NaN on days a scheme published no NAV.
+    """
+    end_day = to_day(end or date.today())
+    start_day = end_day - int(years * 365.25) - 7
+    codes, days, navs = store.rows_since(start_day)
+    if not len(codes):
+        return pd.DatetimeIndex([]), np.empty(0, dtype=np.int32), np.empty((0, 0), dtype=np.float32)
+
+    scheme_codes, cols = np.unique(codes, return_inverse=True)
+    rows = days - start_day
+    matrix = np.full((end_day - start_day + 1, len(scheme_codes)), np.nan, dtype=np.float32)
+    keep = (rows >= 0) & (rows < matrix.shape[0])
+    # Delta rows come after base rows, so later values overwrite earlier ones
+    matrix[rows[keep], cols[keep]] = navs[keep]
+
+    # Keep calendar days on which a meaningful share of schemes published a NAV
+    published = np.isfinite(matrix).sum(axis=1)
+    trading = published >= max(1, TRADING_DAY_MIN_SHARE * published.max())
+    matrix = matrix[trading]
+    dates = from_days(np.flatnonzero(trading) + start_day)
+    return dates, scheme_codes, matrix
+
+
+def ffill_matrix(matrix):
+    """Forward-fills NaNs down each column without a Python loop."""
+    valid = np.isfinite(matrix)
+    last_valid_row = np.where(valid, np.arange(matrix.shape[0])[:, None], 0)
+    np.maximum.accumulate(last_valid_row, axis=0, out=last_valid_row)
+    filled = matrix[last_valid_row, np.arange(matrix.shape[1])]
+    # Leading NaNs stay NaN
+    filled[~np.maximum.accumulate(valid, axis=0)] = np.nan
+    return filled
+
+
+def _rows_back(dates, years):
+    """Row index of the last trading day at least `years` years before the final date."""
+    target = dates[-1] - pd.DateOffset(years=years)
+    i = dates.searchsorted(target, side="right") - 1
+    return i if i >= 0 else None
+
+
+def compute_metrics(dates, codes, matrix, benchmark):
+    """
+    Computes every screener metric for every scheme as 2-D array operations.
+    matrix is build_nav_matrix output (unfilled): coverage counts only days a
+    scheme actually published, and schemes whose last NAV is more than
+    MAX_STALE_DAYS trading days old are dropped. Gaps are forward-filled for
+    the return calculations. benchmark is a close-price Series aligned to
+    (or reindexable onto) dates.
+    """
+    if len(dates):
+        published = np.isfinite(matrix)
+        last_published = len(dates) - 1 - np.argmax(published[::-1], axis=0)
+        fresh = published.any(axis=0) & (last_published >= len(dates) - 1 - MAX_STALE_DAYS)
+        codes, published = codes[fresh], published[:, fresh]
+        matrix = ffill_matrix(matrix[:, fresh])
+    metrics = pd.DataFrame(index=pd.Index(codes, name="scheme_code"))
+    if not len(dates):
+        return metrics.assign(**{c: np.nan for c in METRIC_COLUMNS})
+    last = matrix[-1].astype(np.float64)
+
+    # Schemes with no data in a window legitimately produce NaN (and all-NaN) slices
+    with np.errstate(divide="ignore", invalid="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        for years in (1, 3, 5):
+            i = _rows_back(dates, years)
+            metrics[f"cagr_{years}y"] = (last / matrix[i]) ** (1 / years) - 1 if i is not None else np.nan
+
+        bench = benchmark.reindex(dates).ffill().to_numpy(dtype=np.float64)
+
+        # Rolling 1-year returns for every day and scheme at once
+        year_start = _rows_back(dates, 1)
+        lag = len(dates) - 1 - year_start if year_start is not None else 0
+        if lag > 0:
+            rolling = matrix[lag:] / matrix[:-lag] - 1
+            bench_rolling = bench[lag:] / bench[:-lag] - 1
+            window = len(rolling)
+            observed = np.isfinite(rolling)
+            counts = observed.sum(axis=0)
+            enough = published[lag:].sum(axis=0) >= MIN_COVERAGE * window
+            positive = np.where(observed, rolling > 0, False).sum(axis=0) / np.maximum(counts, 1)
+            beats = np.where(observed, rolling > bench_rolling[:, None], False).sum(axis=0) / np.maximum(counts, 1)
+            metrics["rolling_1y_positive"] = np.where(enough, positive, np.nan)
+            metrics["rolling_1y_beats_benchmark"] = np.where(enough, beats, np.nan)
+        else:
+            metrics["rolling_1y_positive"] = metrics["rolling_1y_beats_benchmark"] = np.nan
+
+        # Risk metrics over the last RISK_WINDOW_YEARS of daily returns
+        start = _rows_back(dates, RISK_WINDOW_YEARS) or 0
+        window_navs = matrix[start:].astype(np.float64)
+        returns = window_navs[1:] / window_navs[:-1] - 1
+        bench_returns = bench[start + 1:] / bench[start:-1] - 1
+        enough = published[start + 1:].sum(axis=0) >= MIN_COVERAGE * len(returns)
+
+        daily_rf = RISK_FREE_RATE / TRADING_DAYS
+        excess = returns - daily_rf
+        mean_excess = np.nanmean(excess, axis=0)
+        volatility = np.nanstd(returns, axis=0, ddof=1)
+        downside = np.sqrt(np.nanmean(np.minimum(excess, 0) ** 2, axis=0))
+        metrics["sharpe"] = np.where(enough, mean_excess / volatility * np.sqrt(TRADING_DAYS), np.nan)
+        metrics["sortino"] = np.where(enough, mean_excess / downside * np.sqrt(TRADING_DAYS), np.nan)
+
+        running_peak = np.fmax.accumulate(window_navs, axis=0)
+        metrics["max_drawdown"] = np.where(enough, np.nanmin(window_navs / running_peak - 1, axis=0), np.nan)
+
+        # Downside capture: average fund return on days the benchmark fell,
+        # relative to the benchmark's average return on those days
+        down_days = np.isfinite(bench_returns) & (bench_returns < 0)
+        if down_days.any():
+            fund_down = np.nanmean(returns[down_days], axis=0)
+            metrics["downside_capture"] = np.where(enough, fund_down / bench_returns[down_days].mean() * 100, np.nan)
+        else:
+            metrics["downside_capture"] = np.nan
+
+    return metrics.replace([np.inf, -np.inf], np.nan)
+
+
+def _connect(db_path=METRICS_DB_PATH):
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    return sqlite3.connect(db_path, timeout=30)
+
+
+def save_metrics(metrics, computed_on, db_path=METRICS_DB_PATH):
+    """Replaces the metrics table in one transaction."""
+    table = metrics.reset_index()
+    table["computed_on"] = computed_on.isoformat()
+    conn = _connect(db_path)
+    try:
+        with conn:
+            table.to_sql("fund_metrics", conn, if_exists="replace", index=False)
+            for column in ("cagr_3y", "sharpe", "max_drawdown"):
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_fund_metrics_{column} ON fund_metrics ({column})")
+    finally:
+        conn.close()
+
+
+def metrics_computed_on(db_path=METRICS_DB_PATH):
+    conn = _connect(db_path)
+    try:
+        row = conn.execute("SELECT MAX(computed_on) FROM fund_metrics").fetchone()
+        return date.fromisoformat(row[0]) if row and row[0] else None
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+
+
+def refresh_metrics(store, force=False, db_path=METRICS_DB_PATH):
+    """Recomputes the whole-universe metrics table at most once per day."""
+    today = date.today()
+    if not force and metrics_computed_on(db_path) == today:
+        return False
+    dates, codes, matrix = build_nav_matrix(store)
+    if not len(codes):
+        return False
+    # Up to yesterday: NAVs are published after the close, today's index bar is still moving
+    benchmark = get_history(BENCHMARK_TICKER, dates[0].date(), today)["Close"]
+    metrics = compute_metrics(dates, codes, matrix, benchmark)
+
+    names = {int(s["schemeCode"]): s["schemeName"] for s in load_schemes()}
+    metrics.insert(0, "scheme_name", [names.get(int(code), "") for code in metrics.index])
+    save_metrics(metrics, today, db_path)
+    return True
+
+
+def query_metrics(min_values=None, max_values=None, sort_by="cagr_3y", ascending=False, limit=100,
+                  db_path=METRICS_DB_PATH):
+    """Filters and sorts the precomputed metrics table with a single SQL query."""
+    if sort_by not in METRIC_COLUMNS:
+        raise ValueError(f"Unknown metric: {sort_by}")
+    clauses, params = [], []
+    for bounds, op in ((min_values or {}, ">="), (max_values or {}, "<=")):
+        for column, value in bounds.items():
+            if column not in METRIC_COLUMNS:
+                raise ValueError(f"Unknown metric: {column}")
+            clauses.append(f"{column} {op} ?")
+            params.append(value)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    order = "ASC" if ascending else "DESC"
+    sql = (f"SELECT * FROM fund_metrics {where} "
+           f"ORDER BY {sort_by} IS NULL, {sort_by} {order} LIMIT ?")
+    conn = _connect(db_path)
+    try:
+        return pd.read_sql_query(sql, conn, params=params + [int(limit)])
+    except (sqlite3.Error, pd.errors.DatabaseError):
+        return pd.DataFrame(columns=["scheme_code", "scheme_name"] + METRIC_COLUMNS)
+    finally:
+        conn.close()
@@ -0,0 +1,83 @@
+# fx_engine.py
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+# --- Define 16 Common Currencies and their USD-based tickers ---
+# 'is_base_vs_usd': True means ticker gives Currency/USD (e.g., EURUSD=X gives USD per EUR)
+# 'is_base_vs_usd': False means ticker gives USD/Currency (e.g., INR=X gives INR per USD)
+# USD does not have a ticker itself, as it's the implicit base for many.
+CURRENCY_TICKER_MAP = {
+    'USD': {'ticker': None, 'is_base_vs_usd': True}, # USD is the reference currency
+    'EUR': {'ticker': 'EURUSD=X', 'is_base_vs_usd': True}, # EUR per USD
+    'GBP': {'ticker': 'GBPUSD=X', 'is_base_vs_usd': True}, # GBP per USD
+    'JPY': {'ticker': 'JPY=X', 'is_base_vs_usd': False}, # JPY per USD (i.e., USD per JPY is 1/JPY=X)
+    'CAD': {'ticker': 'CAD=X', 'is_base_vs_usd': False}, # CAD per USD (i.e., USD per CAD is 1/CAD=X)
+    'AUD': {'ticker': 'AUDUSD=X', 'is_base_vs_usd': True}, # AUD per USD
+    'CHF': {'ticker': 'CHF=X', 'is_base_vs_usd': False}, # CHF per USD (i.e., USD per CHF is 1/CHF=X)
+    'INR': {'ticker': 'INR=X', 'is_base_vs_usd': False}, # INR per USD (i.e., USD per INR is 1/INR=X)
+    'CNY': {'ticker': 'CNY=X', 'is_base_vs_usd': False}, # CNY per USD
+    'BRL': {'ticker': 'BRL=X', 'is_base_vs_usd': False}, # BRL per USD
+    'ZAR': {'ticker': 'ZAR=X', 'is_base_vs_usd': False}, # ZAR per USD
+    'MXN': {'ticker': 'MXN=X', 'is_base_vs_usd': False}, # MXN per USD
+    'SGD': {'ticker': 'SGD=X', 'is_base_vs_usd': False}, # SGD per USD
+    'HKD': {'ticker': 'HKD=X', 'is_base_vs_usd': False}, # HKD per USD
+    'KRW': {'ticker': 'KRW=X', 'is_base_vs_usd': False}, # KRW per USD
+    'RUB': {'ticker': 'RUB=X', 'is_base_vs_usd': False}, # RUB per USD (Note: Data might be volatile/limited due to sanctions)
+}
+
+ALL_CURRENCIES = sorted(list(CURRENCY_TICKER_MAP.keys()))
+
+
+def fetch_usd_panel(start=None, end=None, period="max"):
+    """
+    Downloads every USD leg in CURRENCY_TICKER_MAP in a single request and
+    returns a date x currency DataFrame of USD per 1 unit of each currency.
+    """
+    tickers = [info['ticker'] for info in CURRENCY_TICKER_MAP.values() if info['ticker']]
+    if start is not None:
+        raw = yf.download(tickers, start=start, end=end, progress=False)
+    else:
+        raw = yf.download(tickers, period=period, progress=False)
+    if raw is None or raw.empty:
+        return pd.DataFrame(columns=ALL_CURRENCIES)
+
+    closes = raw['Close']
+    closes.index = pd.to_datetime(closes.index).tz_localize(None)
+    panel = pd.DataFrame(index=closes.index, columns=ALL_CURRENCIES, dtype=float)
+    panel.index.name = 'Date'
+    for currency, info in CURRENCY_TICKER_MAP.items():
+        ticker = info['ticker']
+        if ticker is None:
+            panel[currency] = 1.0
+        elif ticker in closes.columns:
+            # Store every leg as USD per unit so crosses are a single division
+            panel[currency] = closes[ticker] if info['is_base_vs_usd'] else 1 / closes[ticker]
+    return panel.sort_index()
+
+
+def build_cross_cube(usd_panel):
+    """
+    Computes the date x base x quote cube of cross rates from a USD panel:
+    cube[d, b, q] = units of quote currency per 1 unit of base currency.
+    """
+    usd_per_unit = usd_panel.to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cube = usd_per_unit[:, :, None] / usd_per_unit[:, None, :]
+    return {
+        "dates": usd_panel.index,
+        "currencies": list(usd_panel.columns),
+        "cube": cube,
+    }
+
+
+def get_cross_rate(fx_cube, base_curr, quote_curr, start=None, end=None):
+    """Slices one pair and the [start, end) window out of the cube as a 'Close' DataFrame."""
+    dates = fx_cube["dates"]
+    currencies = fx_cube["currencies"]
+    b, q = currencies.index(base_curr), currencies.index(quote_curr)
+
+    lo = dates.searchsorted(pd.Timestamp(start)) if start is not None else 0
+    hi = dates.searchsorted(pd.Timestamp(end)) if end is not None else len(dates)
+    rates = pd.Series(fx_cube["cube"][lo:hi, b, q], index=dates[lo:hi], name='Close')
+    return pd.DataFrame(rates.dropna())
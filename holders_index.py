@@ -0,0 +1,317 @@
+# holders_index.py
+import os
+import re
+import sqlite3
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from form13f import fetch_holdings, quarter_changes
+from sec_resolver import normalize_name
+
+# --- "Who holds this stock" index ---
+# Parsed 13F information tables are inverted into one SQLite table keyed by
+# (cusip, quarter, manager_cik, put_call) WITHOUT ROWID, so every holder of a
+# security in a quarter is one contiguous primary-key range. Each row
+# carries the change from the same manager's previous stored quarter, so
+# "who bought NVDA last quarter" is a range scan plus a sort. Rows for
+# positions that were exited are kept with zero shares. 'filings' records
+# which accession numbers are already in, so each new quarter of filings
+# is ingested incrementally; 'securities' maps CUSIPs to tickers.
+HOLDERS_DB_PATH = os.path.join("data", "holders_13f.db")
+INGEST_WORKERS = 4  # Requests are paced by the shared EDGAR client either way
+HOLDER_COLUMNS = ["cusip", "quarter", "manager_cik", "put_call", "issuer", "shares", "value",
+                  "shares_prev", "value_prev", "share_change", "value_change", "change"]
+
+_CUSIP = re.compile(r"^[0-9A-Z]{8}[0-9]$")
+_CLASS = re.compile(r"\bCL(?:ASS|\.)?\s*([A-Z])\b")
+
+
+def _connect(db_path=HOLDERS_DB_PATH):
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript('''
+    CREATE TABLE IF NOT EXISTS holdings (
+        cusip TEXT NOT NULL,
+        quarter TEXT NOT NULL,
+        manager_cik INTEGER NOT NULL,
+        put_call TEXT NOT NULL DEFAULT '',
+        issuer TEXT,
+        shares REAL NOT NULL,
+        value REAL NOT NULL,
+        shares_prev REAL,
+        value_prev REAL,
+        share_change REAL,
+        value_change REAL,
+        change TEXT,
+        PRIMARY KEY (cusip, quarter, manager_cik, put_call)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_holdings_manager_quarter
+        ON holdings (manager_cik, quarter);
+
+    CREATE TABLE IF NOT EXISTS managers (
+        cik INTEGER PRIMARY KEY,
+        name TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS filings (
+        accession_number TEXT PRIMARY KEY,
+        manager_cik INTEGER NOT NULL,
+        quarter TEXT NOT NULL,
+        filing_date TEXT,
+        loaded_at REAL NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS securities (
+        cusip TEXT PRIMARY KEY,
+        issuer TEXT,
+        ticker TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_securities_ticker
+        ON securities (ticker);
+    ''')
+    return conn
+
+
+def _quarter(value):
+    return pd.Timestamp(value).strftime("%Y-%m-%d")
+
+
+def _nullable(values):
+    return values.astype(object).where(values.notna(), None).tolist()
+
+
+def _manager_quarter(conn, cik, quarter):
+    """Positions a manager held at a quarter end, shaped like aggregate_holdings output."""
+    return pd.read_sql_query(
+        '''SELECT cusip, put_call, issuer, value, shares FROM holdings
+           WHERE manager_cik = ? AND quarter = ? AND shares > 0''',
+        conn, params=(int(cik), quarter),
+    )
+
+
+def _adjacent_quarter(conn, cik, quarter, before):
+    """The manager's nearest stored quarter before (or after) `quarter`, or None."""
+    if before:
+        sql = "SELECT MAX(quarter) FROM filings WHERE manager_cik = ? AND quarter < ?"
+    else:
+        sql = "SELECT MIN(quarter) FROM filings WHERE manager_cik = ? AND quarter > ?"
+    return conn.execute(sql, (int(cik), quarter)).fetchone()[0]
+
+
+def _write_quarter(conn, cik, quarter, holdings, previous):
+    """Replaces a manager's rows for one quarter; change columns are NULL without a previous quarter."""
+    conn.execute("DELETE FROM holdings WHERE manager_cik = ? AND quarter = ?", (int(cik), quarter))
+    if previous is not None:
+        rows = quarter_changes(holdings, previous)
+        rows["change"] = rows["change"].astype(object)
+    else:
+        rows = holdings[["cusip", "put_call", "issuer", "value", "shares"]].copy()
+        for name in ("shares_prev", "value_prev", "share_change", "value_change", "change"):
+            rows[name] = None
+    conn.executemany(
+        f"INSERT OR REPLACE INTO holdings ({', '.join(HOLDER_COLUMNS)}) "
+        f"VALUES ({', '.join('?' * len(HOLDER_COLUMNS))})",
+        zip(
+            rows["cusip"].tolist(),
+            [quarter] * len(rows),
+            [int(cik)] * len(rows),
+            rows["put_call"].astype(object).fillna("").tolist(),
+            rows["issuer"].tolist(),
+            rows["shares"].fillna(0).tolist(),
+            rows["value"].fillna(0).tolist(),
+            *(_nullable(rows[name]) for name in ("shares_prev", "value_prev", "share_change", "value_change", "change")),
+        ),
+    )
+
+
+def _class_ticker(tickers, title_of_class):
+    """
+    The ticker of a share class: the only ticker of a single-class issuer, or
+    the one whose suffix matches the class letter ('CL B' -> BRK-B). None when
+    the class cannot be told apart, so a CUSIP is never mapped to another class.
+    """
+    if len(tickers) == 1:
+        return tickers[0]
+    match = _CLASS.search(str(title_of_class or "").upper())
+    if match is None:
+        return None
+    suffixed = [t for t in tickers if re.search(rf"[-.]{match.group(1)}$", t)]
+    return suffixed[0] if len(suffixed) == 1 else None
+
+
+def _map_securities(conn, holdings, resolver=None):
+    """
+    Records each CUSIP with the ticker of its issuer's share class, when the
+    resolver knows the exact issuer name (see _class_ticker).
+    """
+    securities = holdings.drop_duplicates("cusip")
+    rows = []
+    for cusip, issuer, title_of_class in zip(securities["cusip"], securities["issuer"],
+                                             securities["title_of_class"]):
+        record = resolver.index.by_name.get(normalize_name(issuer or "")) if resolver is not None else None
+        ticker = _class_ticker(record["tickers"], title_of_class) if record and record["tickers"] else None
+        rows.append((cusip, issuer, ticker))
+    conn.executemany(
+        "INSERT INTO securities (cusip, issuer, ticker) VALUES (?, ?, ?) "
+        "ON CONFLICT(cusip) DO UPDATE SET ticker = COALESCE(ticker, excluded.ticker)",
+        rows,
+    )
+
+
+def store_filing(cik, accession_number, report_date, holdings, name=None, filing_date=None, resolver=None,
+                 db_path=HOLDERS_DB_PATH):
+    """
+    Adds one manager's aggregated holdings for a quarter (form13f.fetch_holdings
+    output) to the index, and refreshes the changes of the manager's next
+    stored quarter if it was ingested first. Returns False if already stored.
+    """
+    quarter = _quarter(report_date)
+    conn = _connect(db_path)
+    try:
+        with conn:
+            if conn.execute("SELECT 1 FROM filings WHERE accession_number = ?", (accession_number,)).fetchone():
+                return False
+            if not holdings.empty:
+                _map_securities(conn, holdings, resolver)
+            previous_quarter = _adjacent_quarter(conn, cik, quarter, before=True)
+            previous = _manager_quarter(conn, cik, previous_quarter) if previous_quarter else None
+            _write_quarter(conn, cik, quarter, holdings, previous)
+
+            next_quarter = _adjacent_quarter(conn, cik, quarter, before=False)
+            if next_quarter:
+                _write_quarter(conn, cik, next_quarter, _manager_quarter(conn, cik, next_quarter), holdings)
+
+            conn.execute(
+                "INSERT INTO filings (accession_number, manager_cik, quarter, filing_date, loaded_at) VALUES (?, ?, ?, ?, ?)",
+                (accession_number, int(cik), quarter,
+                 _quarter(filing_date) if filing_date is not None else None, time.time()),
+            )
+            conn.execute(
+                "INSERT INTO managers (cik, name) VALUES (?, ?) "
+                "ON CONFLICT(cik) DO UPDATE SET name = COALESCE(excluded.name, name)",
+                (int(cik), name),
+            )
+        return True
+    finally:
+        conn.close()
+
+
+def stored_accessions(db_path=HOLDERS_DB_PATH):
+    conn = _connect(db_path)
+    try:
+        return {row[0] for row in conn.execute("SELECT accession_number FROM filings")}
+    finally:
+        conn.close()
+
+
+def ingest_filings(filings, resolver=None, workers=INGEST_WORKERS, db_path=HOLDERS_DB_PATH, progress=None):
+    """
+    Fetches and indexes every filing of a table with columns cik, name,
+    accession_number, filing_date and report_date (e.g. form13f.quarter_filings)
+    that is not in the index yet. Filings are fetched on a thread pool and
+    written one at a time, oldest quarter first. Returns the number indexed.
+    """
+    filings = filings[~filings["accession_number"].isin(stored_accessions(db_path))]
+    filings = filings.sort_values(["report_date", "filing_date"])
+
+    def fetch(filing):
+        try:
+            return filing, fetch_holdings(filing.cik, filing.accession_number, filing.filing_date)
+        except Exception:
+            return filing, None  # Skipped; picked up again by the next ingest
+
+    stored = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for done, (filing, holdings) in enumerate(pool.map(fetch, filings.itertuples(index=False)), 1):
+            if holdings is not None:
+                stored += store_filing(filing.cik, filing.accession_number, filing.report_date, holdings,
+                                       name=filing.name, filing_date=filing.filing_date, resolver=resolver,
+                                       db_path=db_path)
+            if progress:
+                progress(done, len(filings), stored)
+    return stored
+
+
+def resolve_cusips(security, db_path=HOLDERS_DB_PATH):
+    """CUSIPs for a CUSIP or ticker."""
+    security = str(security).strip().upper()
+    if _CUSIP.match(security):
+        return [security]
+    conn = _connect(db_path)
+    try:
+        return [row[0] for row in conn.execute(
+            "SELECT cusip FROM securities WHERE ticker = ?", (security.replace(".", "-"),))]
+    finally:
+        conn.close()
+
+
+def holder_quarters(security, db_path=HOLDERS_DB_PATH):
+    """Quarters with holdings of a CUSIP or ticker, newest first."""
+    cusips = resolve_cusips(security, db_path)
+    if not cusips:
+        return []
+    conn = _connect(db_path)
+    try:
+        return [row[0] for row in conn.execute(
+            f"SELECT DISTINCT quarter FROM holdings WHERE cusip IN ({', '.join('?' * len(cusips))}) "
+            "ORDER BY quarter DESC", cusips)]
+    finally:
+        conn.close()
+
+
+def holders(security, quarter=None, db_path=HOLDERS_DB_PATH):
+    """
+    Every manager holding (or having just exited) a CUSIP or ticker at a
+    quarter end (default: the latest indexed quarter), ranked by the dollar
+    change of the position, with manager names.
+    """
+    cusips = resolve_cusips(security, db_path)
+    if not cusips:
+        return pd.DataFrame(columns=["manager_name"] + HOLDER_COLUMNS)
+    if quarter is None:
+        quarters = holder_quarters(security, db_path)
+        if not quarters:
+            return pd.DataFrame(columns=["manager_name"] + HOLDER_COLUMNS)
+        quarter = quarters[0]
+    conn = _connect(db_path)
+    try:
+        table = pd.read_sql_query(
+            f'''SELECT m.name AS manager_name, {', '.join('h.' + c for c in HOLDER_COLUMNS)}
+                FROM holdings h LEFT JOIN managers m ON m.cik = h.manager_cik
+                WHERE h.cusip IN ({', '.join('?' * len(cusips))}) AND h.quarter = ?''',
+            conn, params=cusips + [_quarter(quarter)],
+        )
+    finally:
+        conn.close()
+    order = np.argsort(-table["value_change"].fillna(0).to_numpy(), kind="stable")
+    return table.iloc[order].reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from form13f import quarter_filings
+    from sec_resolver import SecResolver
+
+    parser = argparse.ArgumentParser(description="Index every 13F-HR filed in one EDGAR quarter.")
+    parser.add_argument("year", type=int)
+    parser.add_argument("quarter", type=int, choices=[1, 2, 3, 4], help="EDGAR filing quarter (not the report quarter)")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS)
+    parser.add_argument("--limit", type=int, default=None, help="only ingest the first N filings")
+    args = parser.parse_args()
+
+    filings = quarter_filings(args.year, args.quarter)
+    if args.limit:
+        filings = filings.head(args.limit)
+    started = time.monotonic()
+    count = ingest_filings(
+        filings, resolver=SecResolver(), workers=args.workers,
+        progress=lambda done, total, stored: print(f"{done}/{total} filings  {stored} indexed",
+                                                   file=sys.stderr, flush=True),
+    )
+    print(f"Indexed {count:,} of {len(filings):,} filings in {time.monotonic() - started:.0f}s")
@@ -0,0 +1,262 @@
+# indicators.py
+import copy
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+# --- Technical indicators ---
+# compute() builds every indicator over a full OHLCV frame with pandas
+# rolling/ewm kernels and records the running state each one needs
+# (EMA levels, Wilder averages, rolling sums). update() then folds a single
+# new bar into that state in time independent of the history length, so an
+# intraday refresh does not recompute years of history. Rolling-window
+# indicators keep their window in a deque plus running sums; exponential
+# ones keep only their last level.
+TRADING_DAYS = 252
+
+INDICATOR_OPTIONS = [
+    "SMA 20", "SMA 50", "EMA 20", "Bollinger Bands",
+    "RSI", "MACD", "ATR", "Rolling Volatility",
+]
+# Indicators drawn on the price chart; the rest get their own panel
+OVERLAY_INDICATORS = {"SMA 20", "SMA 50", "EMA 20", "Bollinger Bands"}
+
+
+# --- Vectorized kernels over full series ---
+
+def sma(close, window):
+    return close.rolling(window).mean()
+
+
+def ema(close, span):
+    return close.ewm(span=span, adjust=False).mean()
+
+
+def wilder(series, period):
+    """Wilder smoothing, an EMA with alpha = 1 / period."""
+    return series.ewm(alpha=1 / period, adjust=False).mean()
+
+
+def rsi(close, period=14):
+    delta = close.diff()
+    avg_gain = wilder(delta.clip(lower=0), period)
+    avg_loss = wilder(-delta.clip(upper=0), period)
+    return 100 - 100 / (1 + avg_gain / avg_loss)
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = line.ewm(span=signal, adjust=False).mean()
+    return line, signal_line, line - signal_line
+
+
+def bollinger(close, window=20, num_std=2.0):
+    mid = close.rolling(window).mean()
+    std = close.rolling(window).std(ddof=0)
+    return mid + num_std * std, mid, mid - num_std * std
+
+
+def true_range(high, low, close):
+    prev_close = close.shift(1)
+    return pd.concat([high - low, (high - prev_close).abs(), (low - prev_close).abs()], axis=1).max(axis=1)
+
+
+def atr(high, low, close, period=14):
+    return wilder(true_range(high, low, close), period)
+
+
+def rolling_volatility(close, window=20):
+    log_returns = np.log(close / close.shift(1))
+    return log_returns.rolling(window).std() * np.sqrt(TRADING_DAYS)
+
+
+# --- Incremental helpers ---
+
+def _ewm_step(prev, value, alpha):
+    if prev is None or np.isnan(prev):
+        return value
+    if np.isnan(value):
+        return prev
+    return (1 - alpha) * prev + alpha * value
+
+
+class _RollingWindow:
+    """Fixed-size window with running sum and sum of squares."""
+
+    def __init__(self, size, values=()):
+        self.size = size
+        self.values = deque(maxlen=size)
+        self.total = 0.0
+        self.total_sq = 0.0
+        for value in values:
+            self.push(value)
+
+    def push(self, value):
+        if len(self.values) == self.size:
+            old = self.values[0]
+            self.total -= old
+            self.total_sq -= old * old
+        self.values.append(value)
+        self.total += value
+        self.total_sq += value * value
+
+    def full(self):
+        return len(self.values) == self.size
+
+    def mean(self):
+        return self.total / self.size if self.full() else np.nan
+
+    def std(self, ddof=0):
+        if not self.full():
+            return np.nan
+        variance = (self.total_sq - self.total * self.total / self.size) / (self.size - ddof)
+        return float(np.sqrt(max(variance, 0.0)))
+
+
+class IndicatorEngine:
+    """Computes all indicators over a frame and keeps them current bar by bar."""
+
+    def __init__(self, sma_windows=(20, 50), ema_spans=(20,), rsi_period=14,
+                 macd_params=(12, 26, 9), bollinger_params=(20, 2.0),
+                 atr_period=14, vol_window=20):
+        self.sma_windows = sma_windows
+        self.ema_spans = ema_spans
+        self.rsi_period = rsi_period
+        self.macd_params = macd_params
+        self.bollinger_params = bollinger_params
+        self.atr_period = atr_period
+        self.vol_window = vol_window
+
+        self.frame = None
+        self.state = None
+        self._state_before_last = None
+
+    def compute(self, data):
+        """Full recompute over an OHLCV frame; returns the indicator frame."""
+        close, high, low = data["Close"], data["High"], data["Low"]
+        out = pd.DataFrame(index=data.index)
+        for window in self.sma_windows:
+            out[f"SMA {window}"] = sma(close, window)
+        for span in self.ema_spans:
+            out[f"EMA {span}"] = ema(close, span)
+        out["RSI"] = rsi(close, self.rsi_period)
+        out["MACD"], out["MACD Signal"], out["MACD Histogram"] = macd(close, *self.macd_params)
+        out["BB Upper"], out["BB Mid"], out["BB Lower"] = bollinger(close, *self.bollinger_params)
+        out["ATR"] = atr(high, low, close, self.atr_period)
+        out["Rolling Volatility"] = rolling_volatility(close, self.vol_window)
+
+        self.frame = out
+        self._state_before_last = self._build_state(data.iloc[:-1]) if len(data) > 1 else None
+        self.state = self._build_state(data)
+        return out
+
+    def _build_state(self, data):
+        """Captures the running state after the last bar of data."""
+        close, high, low = data["Close"], data["High"], data["Low"]
+        fast, slow, signal = self.macd_params
+        delta = close.diff()
+        log_returns = np.log(close / close.shift(1)).dropna()
+        bb_window = self.bollinger_params[0]
+        macd_line = ema(close, fast) - ema(close, slow)
+
+        def last(series):
+            return float(series.iloc[-1]) if len(series) else None
+
+        return {
+            "last_close": last(close),
+            "sma": {w: _RollingWindow(w, close.iloc[-w:].to_numpy()) for w in self.sma_windows},
+            "ema": {s: last(ema(close, s)) for s in self.ema_spans},
+            "avg_gain": last(wilder(delta.clip(lower=0), self.rsi_period)),
+            "avg_loss": last(wilder(-delta.clip(upper=0), self.rsi_period)),
+            "ema_fast": last(ema(close, fast)),
+            "ema_slow": last(ema(close, slow)),
+            "macd_signal": last(macd_line.ewm(span=signal, adjust=False).mean()),
+            "bollinger": _RollingWindow(bb_window, close.iloc[-bb_window:].to_numpy()),
+            "atr": last(wilder(true_range(high, low, close), self.atr_period)),
+            "returns": _RollingWindow(self.vol_window, log_returns.iloc[-self.vol_window:].to_numpy()),
+        }
+
+    def _step(self, state, bar):
+        """Folds one bar into state; returns the indicator row."""
+        close, high, low = float(bar["Close"]), float(bar["High"]), float(bar["Low"])
+        prev_close = state["last_close"]
+        fast, slow, signal = self.macd_params
+        row = {}
+
+        for window, rolling in state["sma"].items():
+            rolling.push(close)
+            row[f"SMA {window}"] = rolling.mean()
+        for span in self.ema_spans:
+            state["ema"][span] = _ewm_step(state["ema"][span], close, 2 / (span + 1))
+            row[f"EMA {span}"] = state["ema"][span]
+
+        delta = close - prev_close if prev_close is not None else np.nan
+        alpha = 1 / self.rsi_period
+        state["avg_gain"] = _ewm_step(state["avg_gain"], max(delta, 0.0) if not np.isnan(delta) else np.nan, alpha)
+        state["avg_loss"] = _ewm_step(state["avg_loss"], max(-delta, 0.0) if not np.isnan(delta) else np.nan, alpha)
+        if state["avg_gain"] is None or state["avg_loss"] is None:
+            row["RSI"] = np.nan
+        elif state["avg_loss"] == 0:
+            row["RSI"] = 100.0
+        else:
+            row["RSI"] = 100 - 100 / (1 + state["avg_gain"] / state["avg_loss"])
+
+        state["ema_fast"] = _ewm_step(state["ema_fast"], close, 2 / (fast + 1))
+        state["ema_slow"] = _ewm_step(state["ema_slow"], close, 2 / (slow + 1))
+        macd_value = state["ema_fast"] - state["ema_slow"]
+        state["macd_signal"] = _ewm_step(state["macd_signal"], macd_value, 2 / (signal + 1))
+        row["MACD"], row["MACD Signal"] = macd_value, state["macd_signal"]
+        row["MACD Histogram"] = macd_value - state["macd_signal"]
+
+        num_std = self.bollinger_params[1]
+        state["bollinger"].push(close)
+        mid, std = state["bollinger"].mean(), state["bollinger"].std()
+        row["BB Upper"], row["BB Mid"], row["BB Lower"] = mid + num_std * std, mid, mid - num_std * std
+
+        tr = high - low if prev_close is None else max(high - low, abs(high - prev_close), abs(low - prev_close))
+        state["atr"] = _ewm_step(state["atr"], tr, 1 / self.atr_period)
+        row["ATR"] = state["atr"]
+
+        if prev_close is not None:
+            state["returns"].push(float(np.log(close / prev_close)))
+        row["Rolling Volatility"] = state["returns"].std(ddof=1) * np.sqrt(TRADING_DAYS)
+
+        state["last_close"] = close
+        return row
+
+    def update(self, timestamp, bar, replace_last=False):
+        """
+        Appends one bar (or revises the last one, e.g. today's still-moving
+        bar) without touching the rest of the history.
+        """
+        if replace_last:
+            base = self._state_before_last
+            frame = self.frame.iloc[:-1]
+        else:
+            base = self.state
+            frame = self.frame
+        self._state_before_last = copy.deepcopy(base)
+        self.state = copy.deepcopy(base)
+        row = self._step(self.state, bar)
+        self.frame = pd.concat([frame, pd.DataFrame([row], index=pd.DatetimeIndex([timestamp], name=frame.index.name))])
+        return self.frame.iloc[-1]
+
+    def sync(self, data):
+        """
+        Brings the indicators in line with data. If data only adds bars after
+        (or revises the last bar of) what was computed before, those bars are
+        applied incrementally; anything else triggers a full recompute.
+        """
+        if self.frame is None or len(self.frame) < 2 or len(data) < len(self.frame):
+            return self.compute(data)
+
+        known = self.frame.index
+        last = known[-1]
+        if not data.index[:len(known) - 1].equals(known[:-1]) or last not in data.index:
+            return self.compute(data)
+
+        self.update(last, data.loc[last], replace_last=True)
+        for timestamp, bar in data.loc[data.index > last].iterrows():
+            self.update(timestamp, bar)
+        return self.frame
@@ -0,0 +1,284 @@
+# nav_store.py
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import requests
+import streamlit as st
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
+
+# --- Columnar NAV warehouse ---
+# NAV history for every scheme lives in flat, memory-mapped column files:
+#   base segment  - rows sorted by (scheme code, day) with a per-scheme offset
+#                   table, so one scheme's history is a contiguous slice
+#   delta segment - append-only log of newer rows (daily updates, ingests)
+# NAVs are float32, days are int32 offsets from 1970-01-01 and codes int32,
+# i.e. 12 bytes per NAV. compact() folds the delta into the base segment.
+# The app and the amfi_ingest CLI share the files, so writers hold an
+# exclusive flock on the store's lock file and readers a shared one: no
+# append is lost to a concurrent compaction, and no reader sees the three
+# delta columns (or the base files) half written.
+NAV_STORE_DIR = os.path.join("data", "nav")
+MFAPI_SCHEME_URL = "https://api.mfapi.in/mf/{code}"
+MFAPI_LATEST_URL = "https://api.mfapi.in/mf/{code}/latest"
+COMPACT_THRESHOLD = 2_000_000  # delta rows before appends trigger a compaction
+FETCH_WORKERS = 8
+
+COLUMNS = {"codes": np.int32, "days": np.int32, "navs": np.float32}
+
+
+def to_day(value):
+    """Converts a date (or 'dd-mm-yyyy' string from mfapi/AMFI) to an int32 day offset."""
+    if isinstance(value, str):
+        value = datetime.strptime(value, "%d-%m-%Y") if value[2:3] == "-" else datetime.fromisoformat(value)
+    return int(np.datetime64(pd.Timestamp(value).date(), "D").astype(np.int64))
+
+
+def from_days(days):
+    return pd.to_datetime(np.asarray(days, dtype="int64"), unit="D")
+
+
+class NavStore:
+    """Memory-mapped NAV history for the whole mutual fund universe."""
+
+    def __init__(self, root=NAV_STORE_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.RLock()
+        self._lock_file = None  # open while this process holds the file lock
+        self._maps = {}  # file name -> (file stat key, memmap)
+
+    @contextmanager
+    def _locked(self, exclusive=False):
+        """
+        The thread lock plus the cross-process file lock (shared for readers,
+        exclusive for writers). Nested calls reuse the lock already held;
+        writes only nest inside writes (append -> compact).
+        """
+        with self._lock:
+            if self._lock_file is not None or fcntl is None:
+                yield
+                return
+            with open(self._path("store.lock"), "a") as f:
+                fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                self._lock_file = f
+                try:
+                    yield
+                finally:
+                    self._lock_file = None  # Closing the file releases the flock
+
+    # --- Column files ---
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def _column(self, segment, column):
+        """
+        Memory map of one column, reopened whenever the file changed: appended
+        to, or replaced by a compaction (possibly in another process, e.g. the
+        amfi_ingest CLI), which gives it a new inode.
+        """
+        name = f"{segment}_{column}.bin"
+        path = self._path(name)
+        try:
+            stat = os.stat(path)
+            key = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        except FileNotFoundError:
+            key = None
+        cached = self._maps.get(name)
+        if cached is None or cached[0] != key:
+            dtype = COLUMNS[column]
+            data = np.memmap(path, dtype=dtype, mode="r") if key and key[1] else np.empty(0, dtype=dtype)
+            cached = (key, data)
+            self._maps[name] = cached
+        return cached[1]
+
+    def _base_index(self):
+        path = self._path("base_index.npz")
+        if not os.path.exists(path):
+            return np.empty(0, dtype=np.int32), np.zeros(1, dtype=np.int64)
+        with np.load(path) as index:
+            return index["codes"], index["offsets"]
+
+    # --- Reads ---
+
+    def load_series(self, code):
+        """Full NAV history of one scheme as a date-indexed Series (no network)."""
+        code = int(code)
+        with self._locked():
+            codes, offsets = self._base_index()
+            i = np.searchsorted(codes, code)
+            if i < len(codes) and codes[i] == code:
+                lo, hi = offsets[i], offsets[i + 1]
+                days = np.asarray(self._column("base", "days")[lo:hi])
+                navs = np.asarray(self._column("base", "navs")[lo:hi])
+            else:
+                days = np.empty(0, dtype=np.int32)
+                navs = np.empty(0, dtype=np.float32)
+
+            delta_mask = self._column("delta", "codes") == code
+            if delta_mask.any():
+                days = np.concatenate([days, self._column("delta", "days")[delta_mask]])
+                navs = np.concatenate([navs, self._column("delta", "navs")[delta_mask]])
+
+        series = pd.Series(navs, index=from_days(days), name=code)
+        # Later rows (delta) win over earlier ones for the same day
+        series = series[~series.index.duplicated(keep="last")].sort_index()
+        series.index.name = "Date"
+        return series
+
+    def last_days(self):
+        """Latest stored day per scheme code, as a Series indexed by code."""
+        with self._locked():
+            codes, offsets = self._base_index()
+            base_days = self._column("base", "days")
+            last = pd.Series(
+                np.asarray(base_days)[offsets[1:] - 1] if len(codes) else np.empty(0, dtype=np.int32),
+                index=codes, dtype="int64",
+            )
+            delta_codes = self._column("delta", "codes")
+            if len(delta_codes):
+                delta_last = pd.Series(np.asarray(self._column("delta", "days")), index=np.asarray(delta_codes)).groupby(level=0).max()
+                last = pd.concat([last, delta_last]).groupby(level=0).max()
+        return last
+
+    def rows_since(self, start_day):
+        """All (code, day, nav) rows on or after start_day, base rows before delta rows."""
+        with self._locked():
+            codes, offsets = self._base_index()
+            base_days = np.asarray(self._column("base", "days"))
+            base_mask = base_days >= start_day
+            base_codes = np.repeat(codes, np.diff(offsets))[base_mask]
+            delta_days = np.asarray(self._column("delta", "days"))
+            delta_mask = delta_days >= start_day
+            return (
+                np.concatenate([base_codes, np.asarray(self._column("delta", "codes"))[delta_mask]]),
+                np.concatenate([base_days[base_mask], delta_days[delta_mask]]),
+                np.concatenate([np.asarray(self._column("base", "navs"))[base_mask],
+                                np.asarray(self._column("delta", "navs"))[delta_mask]]),
+            )
+
+    def scheme_codes(self):
+        return self.last_days().index.to_numpy()
+
+    # --- Writes ---
+
+    def append(self, codes, days, navs):
+        """
+        Appends rows to the delta segment in one write per column.
+        Rows with a non-finite NAV are dropped.
+        """
+        codes = np.asarray(codes, dtype=np.int32)
+        days = np.asarray(days, dtype=np.int32)
+        navs = np.asarray(navs, dtype=np.float32)
+        keep = np.isfinite(navs)
+        codes, days, navs = codes[keep], days[keep], navs[keep]
+        if not len(codes):
+            return 0
+        with self._locked(exclusive=True):
+            for column, values in (("codes", codes), ("days", days), ("navs", navs)):
+                with open(self._path(f"delta_{column}.bin"), "ab") as f:
+                    values.tofile(f)
+            if len(self._column("delta", "codes")) >= COMPACT_THRESHOLD:
+                self.compact()
+        return len(codes)
+
+    def compact(self):
+        """Merges the delta segment into the sorted base segment."""
+        with self._locked(exclusive=True):
+            codes, offsets = self._base_index()
+            base_codes = np.repeat(codes, np.diff(offsets))
+            all_codes = np.concatenate([base_codes, self._column("delta", "codes")])
+            all_days = np.concatenate([self._column("base", "days"), self._column("delta", "days")])
+            all_navs = np.concatenate([self._column("base", "navs"), self._column("delta", "navs")])
+            if not len(all_codes):
+                return
+
+            # Stable sort keeps delta rows after base rows for the same (code, day),
+            # so keeping the last of each run lets newer values win
+            order = np.lexsort((all_days, all_codes))
+            all_codes, all_days, all_navs = all_codes[order], all_days[order], all_navs[order]
+            last_of_run = np.ones(len(all_codes), dtype=bool)
+            last_of_run[:-1] = (all_codes[1:] != all_codes[:-1]) | (all_days[1:] != all_days[:-1])
+            all_codes, all_days, all_navs = all_codes[last_of_run], all_days[last_of_run], all_navs[last_of_run]
+
+            new_codes, starts = np.unique(all_codes, return_index=True)
+            new_offsets = np.append(starts, len(all_codes)).astype(np.int64)
+
+            self._maps.clear()
+            for column, values in (("days", all_days), ("navs", all_navs)):
+                tmp = self._path(f"base_{column}.bin.tmp")
+                values.tofile(tmp)
+                os.replace(tmp, self._path(f"base_{column}.bin"))
+            tmp = self._path("base_index.tmp.npz")
+            np.savez(tmp, codes=new_codes.astype(np.int32), offsets=new_offsets)
+            os.replace(tmp, self._path("base_index.npz"))
+            for column in COLUMNS:
+                path = self._path(f"delta_{column}.bin")
+                if os.path.exists(path):
+                    os.remove(path)
+
+    # --- Loading from mfapi.in ---
+
+    def bulk_load(self, codes, workers=FETCH_WORKERS):
+        """
+        Downloads the full history of each scheme into the delta segment.
+        Compaction is left to append's threshold (or a batch job), so this is
+        cheap enough to run inside a page request.
+        """
+        def fetch(code):
+            response = requests.get(MFAPI_SCHEME_URL.format(code=code), timeout=30)
+            response.raise_for_status()
+            rows = response.json().get("data", [])
+            days = np.fromiter((to_day(r["date"]) for r in rows), dtype=np.int32, count=len(rows))
+            navs = pd.to_numeric(pd.Series([r["nav"] for r in rows], dtype=object), errors="coerce").to_numpy(dtype=np.float32)
+            return int(code), days, navs
+
+        loaded = 0
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for future in [pool.submit(fetch, code) for code in codes]:
+                try:
+                    code, days, navs = future.result()
+                except (requests.exceptions.RequestException, ValueError, KeyError):
+                    continue
+                loaded += self.append(np.full(len(days), code), days, navs)
+        return loaded
+
+    def update_latest(self, codes=None, workers=FETCH_WORKERS):
+        """Appends only the newest NAV for each scheme that has moved past its stored last day."""
+        last = self.last_days()
+        codes = last.index.tolist() if codes is None else [int(c) for c in codes]
+
+        def fetch(code):
+            response = requests.get(MFAPI_LATEST_URL.format(code=code), timeout=30)
+            response.raise_for_status()
+            row = response.json()["data"][0]
+            return code, to_day(row["date"]), float(row["nav"])
+
+        rows = []
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for future in [pool.submit(fetch, code) for code in codes]:
+                try:
+                    code, day, nav = future.result()
+                except (requests.exceptions.RequestException, ValueError, KeyError, IndexError):
+                    continue
+                if day > last.get(code, -1):
+                    rows.append((code, day, nav))
+        if not rows:
+            return 0
+        new_codes, new_days, new_navs = zip(*rows)
+        return self.append(new_codes, new_days, new_navs)
+
+
+@st.cache_resource
+def get_nav_store():
+    """The process-wide NAV store."""
+    return NavStore()
@@ -1,5 +1,10 @@
 import streamlit as st
 import requests
+from sec_resolver import get_sec_resolver
+from facts_store import company_facts, ensure_company, latest_by_company
+from statement_builder import (BALANCE_SHEET, CASH_FLOW, INCOME_STATEMENT, STATEMENT_CONCEPTS, STATEMENT_LINES,
+                               build_statements, compute_ratios, trailing_twelve_months)
+import yfinance as yf
 import pandas as pd
 from datetime import datetime
 
@@ -51,134 +56,96 @@ st.markdown("""
     </p>
     """, unsafe_allow_html=True)
 
-# --- SEC EDGAR API Base URL for Company Facts ---
-SEC_COMPANY_FACTS_BASE_URL = "https://data.sec.gov/api/xbrl/companyfacts"
-
-# --- REQUIRED: Set a proper User-Agent header ---
-# Remember to replace "YourAppName" and "YourContactEmail" with your actual details.
-HEADERS = {
-    'User-Agent': 'YourAppName/1.0 YourContactEmail@example.com' # <--- IMPORTANT: Update this!
-}
-
-# --- CIK Lookup (Simplified - Same as Financial News page) ---
-# In a full application, you would use a more robust CIK lookup service or a downloaded mapping.
-@st.cache_data(ttl=86400) # Cache for 24 hours
-def get_cik_from_company_name_rough(company_name):
-    company_cik_map = {
-        "APPLE INC": "0000320193",
-        "MICROSOFT CORP": "0000789019",
-        "AMAZON COM INC": "0001018724",
-        "TESLA INC": "0001318605",
-        "NVIDIA CORP": "0001045810",
-        "GOOGLE": "0001652044", # Alphabet Inc.
-        "ALPHABET INC": "0001652044",
-        "BERKSHIRE HATHAWAY INC": "0000010679",
-        "SALESFORCE INC": "0001108524" # Added for testing
-    }
-    normalized_name = company_name.upper().strip()
-    return company_cik_map.get(normalized_name, None)
-
 # --- Function to fetch company facts ---
-@st.cache_data(ttl=3600) # Cache data for 1 hour
-def fetch_company_facts(cik):
-    """Fetches company facts data (XBRL) for a given CIK."""
-    # Ensure CIK is 10 digits padded with leading zeros
-    cik_padded = str(cik).zfill(10)
-    url = f"{SEC_COMPANY_FACTS_BASE_URL}/CIK{cik_padded}.json"
-    
+def fetch_company_facts(cik, company_name=None):
+    """
+    Returns the statement concepts for a given CIK as one long table
+    (concept, end, val, fy, fp, form, ...) from the local facts store,
+    loading the company's companyfacts (XBRL) from EDGAR at most once a day.
+    """
     try:
-        response = requests.get(url, headers=HEADERS)
-        response.raise_for_status() # Raise an HTTPError for bad responses (4xx or 5xx)
-        return response.json()
+        ensure_company(cik, name=company_name)
     except requests.exceptions.RequestException as e:
         st.error(f"Error fetching company facts for CIK {cik}: {e}. Please ensure the CIK is correct and your User-Agent is set.")
-        return None
     except Exception as e:
         st.error(f"An unexpected error occurred: {e}")
-        return None
+    # Whatever was stored by earlier loads is still served if the refresh failed
+    return company_facts(cik, STATEMENT_CONCEPTS)
 
-# --- Helper to extract and process financial data for a concept ---
-def extract_financial_data(facts_data, concept_type, concept_name, unit='USD', label=None):
-    """
-    Extracts financial data for a given concept from the company facts data.
-    Organizes it by end date and value.
-    """
-    if facts_data and concept_type in facts_data.get('facts', {}) and concept_name in facts_data['facts'][concept_type]:
-        concept_data = facts_data['facts'][concept_type][concept_name]['units'].get(unit)
-        if concept_data:
-            df = pd.DataFrame(concept_data)
-            df['end'] = pd.to_datetime(df['end'])
-            df['val'] = pd.to_numeric(df['val'], errors='coerce')
-            df = df.dropna(subset=['val'])
-            df = df[['end', 'val']].sort_values(by='end', ascending=False).drop_duplicates(subset='end')
-            df.columns = ['Date', label if label else concept_name]
-            return df
-    return pd.DataFrame(columns=['Date', label if label else concept_name])
+# --- Market cap for the FCF yield (optional) ---
+@st.cache_data(ttl=3600) # Cache data for 1 hour
+def fetch_market_cap(ticker):
+    try:
+        return float(yf.Ticker(ticker).fast_info["marketCap"])
+    except Exception:
+        return None
 
 # --- Main Page Content ---
 st.header("Search for a Company's Financial Statements")
 
-company_input = st.text_input("Enter Company Name (e.g., Apple Inc, Microsoft Corp):", key="fs_company_search_input")
+company_input = st.text_input("Enter Company Name, Ticker or CIK (e.g., Apple Inc, MSFT, 320193):", key="fs_company_search_input")
 
 if company_input:
-    cik = get_cik_from_company_name_rough(company_input)
+    company = get_sec_resolver().resolve(company_input)
+    cik = company["cik"] if company else None
     
     if cik:
-        st.success(f"Found CIK for {company_input}: **{cik}**")
+        st.success(f"Found CIK for {company['name']}: **{cik}**")
         with st.spinner(f"Fetching financial statements for {company_input} (CIK: {cik})..."):
-            facts = fetch_company_facts(cik)
+            facts = fetch_company_facts(cik, company['name'])
         
-        if facts:
+        if facts is not None and not facts.empty:
             st.subheader(f"Financial Statements for {company_input}")
 
-            # --- Income Statement ---
-            st.markdown("### Income Statement (Consolidated)")
-            revenue_df = extract_financial_data(facts, 'us-gaap', 'Revenues', label='Revenues')
-            net_income_df = extract_financial_data(facts, 'us-gaap', 'NetIncomeLoss', label='Net Income Loss')
-            
-            if not revenue_df.empty and not net_income_df.empty:
-                income_statement_df = pd.merge(revenue_df, net_income_df, on='Date', how='outer')
-                income_statement_df = income_statement_df.sort_values(by='Date', ascending=False)
-                st.dataframe(income_statement_df.set_index('Date').head(10)) # Show latest 10
-            elif not revenue_df.empty:
-                st.dataframe(revenue_df.set_index('Date').head(10))
-            elif not net_income_df.empty:
-                st.dataframe(net_income_df.set_index('Date').head(10))
+            statements = build_statements(facts)
+            period_view = st.radio("Periods", ["Annual", "Quarterly", "Trailing Twelve Months"], horizontal=True,
+                                   key="fs_period_view_radio")
+            if period_view == "Annual":
+                statement_df = statements["annual"]
+            elif period_view == "Quarterly":
+                statement_df = statements["quarterly"]
             else:
-                st.info("No readily available Income Statement data found for these key concepts.")
-
-            st.markdown("---")
-
-            # --- Balance Sheet ---
-            st.markdown("### Balance Sheet (Consolidated)")
-            assets_df = extract_financial_data(facts, 'us-gaap', 'Assets', label='Total Assets')
-            liabilities_df = extract_financial_data(facts, 'us-gaap', 'Liabilities', label='Total Liabilities')
-            equity_df = extract_financial_data(facts, 'us-gaap', 'StockholdersEquity', label='Total Equity')
-
-            if not assets_df.empty or not liabilities_df.empty or not equity_df.empty:
-                balance_sheet_df = pd.merge(assets_df, liabilities_df, on='Date', how='outer')
-                balance_sheet_df = pd.merge(balance_sheet_df, equity_df, on='Date', how='outer')
-                balance_sheet_df = balance_sheet_df.sort_values(by='Date', ascending=False)
-                st.dataframe(balance_sheet_df.set_index('Date').head(10)) # Show latest 10
+                statement_df = trailing_twelve_months(statements["quarterly"])
+
+            for section_title, lines, empty_message in (
+                ("Income Statement (Consolidated)", INCOME_STATEMENT, "No readily available Income Statement data found for these key concepts."),
+                ("Balance Sheet (Consolidated)", BALANCE_SHEET, "No readily available Balance Sheet data found for these key concepts."),
+                ("Cash Flow Statement (Consolidated)", CASH_FLOW, "No readily available Cash Flow Statement data found for these key concepts."),
+            ):
+                st.markdown(f"### {section_title}")
+                section_df = statement_df.reindex(columns=[line for line in lines if line in statement_df.columns]).dropna(how='all')
+                if not section_df.empty:
+                    st.dataframe(section_df.head(10)) # Show latest 10
+                else:
+                    st.info(empty_message)
+                st.markdown("---")
+
+            # --- Derived Ratios ---
+            st.markdown("### Key Ratios")
+            market_cap = fetch_market_cap(company['ticker']) if company.get('ticker') else None
+            if period_view == "Annual":
+                ratios_df = compute_ratios(statements["annual"], market_cap=market_cap)
             else:
-                st.info("No readily available Balance Sheet data found for these key concepts.")
-            
-            st.markdown("---")
-
-            # --- Cash Flow Statement ---
-            st.markdown("### Cash Flow Statement (Consolidated)")
-            operating_cash_flow_df = extract_financial_data(facts, 'us-gaap', 'NetCashProvidedByUsedInOperatingActivities', label='Operating Cash Flow')
-            investing_cash_flow_df = extract_financial_data(facts, 'us-gaap', 'NetCashProvidedByUsedInInvestingActivities', label='Investing Cash Flow')
-            financing_cash_flow_df = extract_financial_data(facts, 'us-gaap', 'NetCashProvidedByUsedInFinancingActivities', label='Financing Cash Flow')
-            
-            if not operating_cash_flow_df.empty or not investing_cash_flow_df.empty or not financing_cash_flow_df.empty:
-                cash_flow_df = pd.merge(operating_cash_flow_df, investing_cash_flow_df, on='Date', how='outer')
-                cash_flow_df = pd.merge(cash_flow_df, financing_cash_flow_df, on='Date', how='outer')
-                cash_flow_df = cash_flow_df.sort_values(by='Date', ascending=False)
-                st.dataframe(cash_flow_df.set_index('Date').head(10)) # Show latest 10
+                ratios_df = compute_ratios(trailing_twelve_months(statements["quarterly"]), market_cap=market_cap,
+                                           periods_per_year=4)
+            ratios_df = ratios_df.dropna(how='all')
+            if not ratios_df.empty:
+                percent_columns = ["Gross Margin", "Operating Margin", "Net Margin", "ROE", "FCF Yield"]
+                ratios_df[percent_columns] = ratios_df[percent_columns] * 100
+                st.dataframe(
+                    ratios_df.head(10),
+                    column_config={
+                        **{c: st.column_config.NumberColumn(c, format="%.2f%%") for c in percent_columns},
+                        "Debt to Equity": st.column_config.NumberColumn("Debt to Equity", format="%.2f"),
+                        "Assets to Equity": st.column_config.NumberColumn("Assets to Equity", format="%.2f"),
+                        "Free Cash Flow": st.column_config.NumberColumn("Free Cash Flow", format="%.0f"),
+                    },
+                )
+                if period_view == "Quarterly":
+                    st.caption("Ratios use trailing-twelve-month flows.")
             else:
-                st.info("No readily available Cash Flow Statement data found for these key concepts.")
-            
+                st.info("Not enough data to compute ratios.")
+
             st.markdown("---")
 
             st.info("Note: Data is sourced from SEC EDGAR XBRL company facts. Not all concepts may be available for all companies or periods.")
@@ -206,4 +173,20 @@ if company_input:
 else:
     st.info("Enter a company name above to view its latest financial statements.")
 
+# --- Compare one line item across every company loaded so far ---
+st.header("Compare Across Companies")
+compare_line = st.selectbox("Line item", options=list(STATEMENT_LINES), key="fs_compare_concept_select")
+compare_basis = st.radio("Basis", ["Annual", "TTM"], horizontal=True, key="fs_compare_basis")
+comparison_df = latest_by_company(compare_line, basis=compare_basis.lower())
+if not comparison_df.empty:
+    comparison_df = comparison_df.sort_values('val', ascending=False)
+    st.dataframe(
+        comparison_df[['name', 'cik', 'end', 'val']].rename(columns={
+            'name': 'Company', 'cik': 'CIK', 'end': 'Period End', 'val': f"{compare_line} ({compare_basis})"}),
+        hide_index=True,
+        use_container_width=True,
+    )
+else:
+    st.info("Look up a few companies above to compare them here.")
+
 st.markdown("---")
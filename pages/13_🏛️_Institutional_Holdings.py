@@ -1,5 +1,9 @@
 import streamlit as st
 import requests
+from sec_resolver import get_sec_resolver
+from filing_index import filing_url, find_filings
+from form13f import fetch_holdings, quarter_changes, CHANGE_KINDS
+from holders_index import holders, holder_quarters, store_filing
 import pandas as pd
 from datetime import datetime
 import streamlit as st
@@ -45,91 +49,62 @@ st.markdown("""
     </p>
     """, unsafe_allow_html=True)
 
-# --- SEC EDGAR API Base URL for Submissions (used to find filings) ---
-SEC_SUBMISSIONS_API_BASE_URL = "https://data.sec.gov/submissions"
-
-# --- REQUIRED: Set a proper User-Agent header ---
-# Remember to replace "YourAppName" and "YourContactEmail" with your actual details.
-HEADERS = {
-    'User-Agent': 'YourAppName/1.0 YourContactEmail@example.com' # <--- IMPORTANT: Update this!
-}
-
-# --- CIK Lookup (Simplified - Same as other pages) ---
-@st.cache_data(ttl=86400) # Cache for 24 hours
-def get_cik_from_company_name_rough(company_name):
-    company_cik_map = {
-        "APPLE INC": "0000320193",
-        "MICROSOFT CORP": "0000789019",
-        "AMAZON COM INC": "0001018724",
-        "TESLA INC": "0001318605",
-        "NVIDIA CORP": "0001045810",
-        "GOOGLE": "0001652044", # Alphabet Inc.
-        "ALPHABET INC": "0001652044",
-        "BERKSHIRE HATHAWAY INC": "0000010679",
-        "SALESFORCE INC": "0001108524"
-    }
-    normalized_name = company_name.upper().strip()
-    return company_cik_map.get(normalized_name, None)
-
 # --- Function to fetch recent 13F filings for an institutional manager (CIK) ---
 @st.cache_data(ttl=3600) # Cache data for 1 hour
 def fetch_13f_filings(cik, num_filings_to_check=5):
     """
     Fetches recent Form 13F filings for a given institutional manager CIK.
-    Note: Extracting the actual holdings data from within the 13F form (often XML)
-    is complex and not directly supported by the /submissions API.
-    This function primarily finds the filings and their links.
+    The holdings themselves are read from each filing's information table
+    (see fetch_13f_holdings).
     """
-    cik_padded = str(cik).zfill(10)
-    url = f"{SEC_SUBMISSIONS_API_BASE_URL}/CIK{cik_padded}.json"
-    
     try:
-        response = requests.get(url, headers=HEADERS)
-        response.raise_for_status()
-        data = response.json()
-
-        form_13f_filings = []
-        if 'filings' in data and 'recent' in data['filings']:
-            forms = data['filings']['recent']['form']
-            filing_dates = data['filings']['recent']['filingDate']
-            report_dates = data['filings']['recent']['reportDate']
-            accession_numbers = data['filings']['recent']['accessionNumber']
-            primary_docs = data['filings']['recent']['primaryDocument']
-            
-            count = 0
-            for i in range(len(forms)):
-                if forms[i] in ['13F-HR', '13F-HT', '13F-CR', '13F-NT']: # Look for 13F variants
-                    if count >= num_filings_to_check:
-                        break
-                    
-                    accession_no_cleaned = accession_numbers[i].replace('-', '')
-                    filing_url = f"https://www.sec.gov/Archives/edgar/data/{cik_padded}/{accession_no_cleaned}/{primary_docs[i]}"
-
-                    form_13f_filings.append({
-                        "Form Type": forms[i],
-                        "Filing Date": filing_dates[i],
-                        "Report Date": report_dates[i],
-                        "Link": filing_url
-                    })
-                    count += 1
-        return form_13f_filings
+        # Local query over the CIK's complete filing history (recent + paginated pages)
+        filings = find_filings(cik, forms=['13F-HR', '13F-HT', '13F-CR', '13F-NT'], limit=num_filings_to_check)
+        return [{
+            "Form Type": row.form,
+            "Filing Date": str(row.filing_date.date()),
+            "Report Date": str(row.report_date.date()) if pd.notna(row.report_date) else "",
+            "Accession Number": row.accession_number,
+            "Primary Document": row.primary_document,
+            "Link": filing_url(cik, row.accession_number, row.primary_document),
+        } for row in filings.itertuples(index=False)]
     except requests.exceptions.RequestException as e:
-        st.error(f"Error fetching 13F filings for CIK {cik}: {e}. Ensure the CIK is correct and User-Agent set.")
+        st.error(f"Error fetching 13F filings for CIK {cik}: {e}. Ensure the CIK is correct and the User-Agent in edgar_client.py is set.")
         return []
     except Exception as e:
         st.error(f"An unexpected error occurred: {e}")
         return []
 
+# --- Function to fetch the holdings reported in one 13F-HR filing ---
+@st.cache_data(ttl=24 * 3600, show_spinner=False) # Filed holdings never change
+def fetch_13f_holdings(cik, accession_number, filing_date):
+    try:
+        return fetch_holdings(cik, accession_number, filing_date)
+    except requests.exceptions.RequestException as e:
+        st.error(f"Error fetching holdings for filing {accession_number}: {e}")
+    except Exception as e:
+        st.error(f"Could not parse the information table of filing {accession_number}: {e}")
+    return None
+
+def load_13f_holdings(cik, accession_number, filing_date, report_date, manager_name=None):
+    holdings = fetch_13f_holdings(cik, accession_number, filing_date)
+    if holdings is not None:
+        # Every filing read here also feeds the "who holds this stock" index. This runs
+        # outside the cache so a cache hit still writes to an index that lacks the filing;
+        # store_filing returns at once for accession numbers it already has.
+        store_filing(cik, accession_number, report_date, holdings, name=manager_name, filing_date=filing_date,
+                     resolver=get_sec_resolver())
+    return holdings
+
 # --- Main Page Content ---
 st.header("Search for an Institutional Investor's 13F Filings")
 st.info("Tip: Search for well-known institutional investors like 'Berkshire Hathaway Inc' or 'BlackRock Inc'. You'll need the CIK of the *institution*, not the company they invest in.")
 
-# Note: The CIK map primarily contains company CIKs. For 13F, you need manager CIKs.
-# We'll use a hardcoded example for Berkshire Hathaway as a large 13F filer.
-# For other managers, users would typically need to find the CIK manually or via a separate lookup.
-manager_input_name = st.text_input("Enter Institutional Investor Name (e.g., Berkshire Hathaway Inc, BlackRock Inc):", key="manager_search_input")
+# Managers are resolved by name, ticker or CIK through the shared SEC resolver.
+manager_input_name = st.text_input("Enter Institutional Investor Name or CIK (e.g., Berkshire Hathaway Inc, BlackRock Inc, 1029093):", key="manager_search_input")
 
-# Simplified CIK lookup for managers - extend as needed
+# Managers without a listed ticker are not in SEC's ticker files; these are
+# matched by exact name before falling back to fuzzy matching
 manager_cik_map = {
     "BERKSHIRE HATHAWAY INC": "0000010679",
     "BLACKROCK INC": "0001364742",
@@ -140,13 +115,13 @@ manager_cik_map = {
 
 manager_cik = None
 if manager_input_name:
-    normalized_manager_name = manager_input_name.upper().strip()
-    manager_cik = manager_cik_map.get(normalized_manager_name, None)
+    manager = get_sec_resolver().resolve(manager_input_name, fallback=manager_cik_map)
+    manager_cik = manager["cik"] if manager else None
 
 if manager_input_name and manager_cik:
-    st.success(f"Found CIK for {manager_input_name}: **{manager_cik}**")
+    st.success(f"Found CIK for {manager['name']}: **{manager_cik}**")
     with st.spinner(f"Fetching recent 13F filings for {manager_input_name} (CIK: {manager_cik})..."):
-        filings_data = fetch_13f_filings(manager_cik)
+        filings_data = fetch_13f_filings(manager_cik, num_filings_to_check=8)
     
     if filings_data:
         df_filings = pd.DataFrame(filings_data)
@@ -155,7 +130,7 @@ if manager_input_name and manager_cik:
         
         st.subheader(f"Recent 13F Filings for {manager_input_name}")
         
-        display_df = df_filings.copy()
+        display_df = df_filings.drop(columns=['Accession Number', 'Primary Document'])
         display_df['Link'] = display_df['Link'].apply(lambda x: f"[View Filing]({x})")
         
         st.markdown(display_df.to_html(escape=False, index=False), unsafe_allow_html=True)
@@ -166,10 +141,72 @@ if manager_input_name and manager_cik:
             * **Form 13F-HT**: Notice of a confidential portion of a 13F-HR.
             * **Form 13F-CR**: Confidential request for a 13F-HR.
             * **Form 13F-NT**: Notice of intention not to file a 13F.
-
-            **Note:** This table provides links to the 13F filings. **To view the actual stock holdings (which companies and how many shares), you must click on the "View Filing" link and navigate within the filing to the "informationTable" section (often an XML file).** Extracting these specific holdings details programmatically is complex and usually requires a dedicated XBRL/XML parsing library or a specialized API service.
         """)
 
+        # --- Holdings and quarter-over-quarter changes ---
+        holdings_filings = df_filings[df_filings['Form Type'] == '13F-HR'].drop_duplicates('Report Date')
+        holdings_df = None
+        if not holdings_filings.empty:
+            st.subheader("Reported Holdings")
+            report_date = st.selectbox("Quarter (report date)", holdings_filings['Report Date'].tolist(),
+                                       key="13f_report_date_select")
+            position = holdings_filings['Report Date'].tolist().index(report_date)
+            current_filing = holdings_filings.iloc[position]
+            with st.spinner(f"Reading the information table for {report_date}..."):
+                holdings_df = load_13f_holdings(manager_cik, current_filing['Accession Number'],
+                                                current_filing['Filing Date'], report_date, manager['name'])
+
+            if holdings_df is not None and not holdings_df.empty:
+                col1, col2 = st.columns(2)
+                col1.metric("Portfolio Value", f"${holdings_df['value'].sum() / 1e9:,.2f}B")
+                col2.metric("Positions", f"{len(holdings_df):,}")
+                st.dataframe(
+                    holdings_df.rename(columns={
+                        'cusip': 'CUSIP', 'issuer': 'Issuer', 'title_of_class': 'Class', 'value': 'Value ($)',
+                        'shares': 'Shares', 'share_type': 'Type', 'put_call': 'Put/Call', 'weight': 'Weight'}),
+                    column_config={
+                        'Value ($)': st.column_config.NumberColumn('Value ($)', format="%.0f"),
+                        'Shares': st.column_config.NumberColumn('Shares', format="%.0f"),
+                        'Weight': st.column_config.ProgressColumn('Weight', format="%.2f", min_value=0.0,
+                                                                  max_value=float(holdings_df['weight'].max())),
+                    },
+                    hide_index=True,
+                    use_container_width=True,
+                )
+
+                if position + 1 < len(holdings_filings):
+                    previous_filing = holdings_filings.iloc[position + 1]
+                    with st.spinner(f"Comparing with {previous_filing['Report Date']}..."):
+                        previous_df = load_13f_holdings(manager_cik, previous_filing['Accession Number'],
+                                                        previous_filing['Filing Date'],
+                                                        previous_filing['Report Date'], manager['name'])
+                    if previous_df is not None and not previous_df.empty:
+                        st.subheader(f"Changes since {previous_filing['Report Date']}")
+                        changes_df = quarter_changes(holdings_df, previous_df)
+                        counts = changes_df['change'].value_counts()
+                        for column, kind in zip(st.columns(4), CHANGE_KINDS[:4]):
+                            column.metric(kind, f"{counts.get(kind, 0):,}")
+                        shown_kinds = st.multiselect("Show", CHANGE_KINDS, default=CHANGE_KINDS[:4],
+                                                     key="13f_change_kinds_select")
+                        st.dataframe(
+                            changes_df[changes_df['change'].isin(shown_kinds)][
+                                ['change', 'issuer', 'cusip', 'put_call', 'shares_prev', 'shares', 'share_change',
+                                 'pct_change', 'value', 'value_change']
+                            ].rename(columns={
+                                'change': 'Change', 'issuer': 'Issuer', 'cusip': 'CUSIP', 'put_call': 'Put/Call',
+                                'shares_prev': 'Previous Shares', 'shares': 'Shares', 'share_change': 'Share Change',
+                                'pct_change': '% Change', 'value': 'Value ($)', 'value_change': 'Value Change ($)'}),
+                            column_config={
+                                '% Change': st.column_config.NumberColumn('% Change', format="%.2f"),
+                                'Value ($)': st.column_config.NumberColumn('Value ($)', format="%.0f"),
+                                'Value Change ($)': st.column_config.NumberColumn('Value Change ($)', format="%.0f"),
+                            },
+                            hide_index=True,
+                            use_container_width=True,
+                        )
+            elif holdings_df is not None:
+                st.info("This filing has no information table to read holdings from.")
+
         # Optional: Update session state for AI summary
         if 'ai_summary_data' not in st.session_state:
             st.session_state['ai_summary_data'] = {}
@@ -177,6 +214,8 @@ if manager_input_name and manager_cik:
             "manager_name": manager_input_name,
             "manager_cik": manager_cik,
             "num_filings": len(filings_data),
+            "num_positions": len(holdings_df) if holdings_df is not None else 0,
+            "top_holdings": holdings_df.head(10)[['issuer', 'value']].to_dict('records') if holdings_df is not None else [],
             "status": "13F filings displayed successfully."
         }
     else:
@@ -195,3 +234,34 @@ else:
     st.info("Enter an institutional investor's name above to search for their latest 13F filings.")
 
 st.markdown("---")
+
+# --- Who holds this stock? ---
+st.header("Who Holds This Stock?")
+st.caption("Answered from the local 13F index: every manager whose filings were loaded above (or by "
+           "`python holders_index.py <year> <quarter>`) is included.")
+security_input = st.text_input("Enter a Ticker, Company Name or CUSIP (e.g., NVDA, Apple Inc, 67066G104):",
+                               key="holders_security_input")
+if security_input:
+    security = security_input.strip().upper()
+    if not holder_quarters(security):
+        company = get_sec_resolver().resolve(security_input)
+        security = company['ticker'] if company and company['ticker'] else security
+    quarters = holder_quarters(security)
+    if quarters:
+        holders_quarter = st.selectbox("Quarter (report date)", quarters, key="holders_quarter_select")
+        holders_df = holders(security, holders_quarter)
+        st.dataframe(
+            holders_df[['manager_name', 'manager_cik', 'issuer', 'put_call', 'shares', 'value', 'shares_prev',
+                        'share_change', 'value_change', 'change']].rename(columns={
+                'manager_name': 'Manager', 'manager_cik': 'CIK', 'issuer': 'Issuer', 'put_call': 'Put/Call',
+                'shares': 'Shares', 'value': 'Value ($)', 'shares_prev': 'Previous Shares',
+                'share_change': 'Share Change', 'value_change': 'Value Change ($)', 'change': 'Change'}),
+            column_config={
+                'Value ($)': st.column_config.NumberColumn('Value ($)', format="%.0f"),
+                'Value Change ($)': st.column_config.NumberColumn('Value Change ($)', format="%.0f"),
+            },
+            hide_index=True,
+            use_container_width=True,
+        )
+    else:
+        st.info(f"No indexed 13F holdings found for '{security_input}'. Load a few managers' filings above first.")
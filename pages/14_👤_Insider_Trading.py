@@ -1,5 +1,9 @@
 import streamlit as st
 import requests
+from sec_resolver import get_sec_resolver
+from filing_index import filing_url, find_filings
+from form4 import TRANSACTION_CODES, cluster_buys, load_transactions, net_activity
+import plotly.express as px
 import pandas as pd
 from datetime import datetime
 import streamlit as st
@@ -50,93 +54,62 @@ st.markdown("""
     </p>
     """, unsafe_allow_html=True)
 
-# --- SEC EDGAR API Base URL for Submissions (used to find filings) ---
-SEC_SUBMISSIONS_API_BASE_URL = "https://data.sec.gov/submissions"
-
-# --- REQUIRED: Set a proper User-Agent header ---
-# Remember to replace "YourAppName" and "YourContactEmail" with your actual details.
-HEADERS = {
-    'User-Agent': 'YourAppName/1.0 YourContactEmail@example.com' # <--- IMPORTANT: Update this!
-}
-
-# --- CIK Lookup (Simplified - Same as other pages) ---
-@st.cache_data(ttl=86400) # Cache for 24 hours
-def get_cik_from_company_name_rough(company_name):
-    company_cik_map = {
-        "APPLE INC": "0000320193",
-        "MICROSOFT CORP": "0000789019",
-        "AMAZON COM INC": "0001018724",
-        "TESLA INC": "0001318605",
-        "NVIDIA CORP": "0001045810",
-        "GOOGLE": "0001652044", # Alphabet Inc.
-        "ALPHABET INC": "0001652044",
-        "BERKSHIRE HATHAWAY INC": "0000010679",
-        "SALESFORCE INC": "0001108524"
-    }
-    normalized_name = company_name.upper().strip()
-    return company_cik_map.get(normalized_name, None)
-
 # --- Function to fetch insider transaction filings (Form 3, 4, 5) ---
 @st.cache_data(ttl=3600) # Cache data for 1 hour
-def fetch_insider_filings(cik, num_filings_to_check=50):
+def fetch_insider_filings(cik, num_filings_to_check=50, since=None):
     """
-    Fetches recent Form 3, 4, and 5 filings for a given CIK.
-    Note: Parsing the actual transaction data from these forms requires
-    more complex XBRL parsing or a dedicated API/library.
-    This function primarily finds the filings and their links.
+    Fetches the latest Form 3, 4, and 5 filings for a given CIK, optionally
+    only those filed on or after `since`.
+    The transactions themselves are parsed from each filing's XML document
+    (see fetch_insider_transactions).
     """
-    cik_padded = str(cik).zfill(10)
-    url = f"{SEC_SUBMISSIONS_API_BASE_URL}/CIK{cik_padded}.json"
-    
     try:
-        response = requests.get(url, headers=HEADERS)
-        response.raise_for_status()
-        data = response.json()
-
-        insider_filings = []
-        if 'filings' in data and 'recent' in data['filings']:
-            forms = data['filings']['recent']['form']
-            filing_dates = data['filings']['recent']['filingDate']
-            report_dates = data['filings']['recent']['reportDate']
-            accession_numbers = data['filings']['recent']['accessionNumber']
-            primary_docs = data['filings']['recent']['primaryDocument']
-            
-            count = 0
-            for i in range(len(forms)):
-                if forms[i] in ['3', '4', '5']: # Look for insider trading forms
-                    if count >= num_filings_to_check: # Limit the number of filings to check
-                        break
-                    
-                    accession_no_cleaned = accession_numbers[i].replace('-', '')
-                    filing_url = f"https://www.sec.gov/Archives/edgar/data/{cik_padded}/{accession_no_cleaned}/{primary_docs[i]}"
-
-                    insider_filings.append({
-                        "Form Type": forms[i],
-                        "Filing Date": filing_dates[i],
-                        "Report Date": report_dates[i],
-                        "Link": filing_url
-                    })
-                    count += 1
-        return insider_filings
+        # Local query over the CIK's complete filing history (recent + paginated pages)
+        filings = find_filings(cik, forms=['3', '4', '5'], start=since, limit=num_filings_to_check)
+        return [{
+            "Form Type": row.form,
+            "Filing Date": str(row.filing_date.date()),
+            "Report Date": str(row.report_date.date()) if pd.notna(row.report_date) else "",
+            "Accession Number": row.accession_number,
+            "Primary Document": row.primary_document,
+            "Link": filing_url(cik, row.accession_number, row.primary_document),
+        } for row in filings.itertuples(index=False)]
     except requests.exceptions.RequestException as e:
-        st.error(f"Error fetching insider filings for CIK {cik}: {e}. Ensure the CIK is correct and User-Agent set.")
+        st.error(f"Error fetching insider filings for CIK {cik}: {e}. Ensure the CIK is correct and the User-Agent in edgar_client.py is set.")
         return []
     except Exception as e:
         st.error(f"An unexpected error occurred: {e}")
         return []
 
+# --- Function to parse the transactions of the listed filings ---
+@st.cache_data(ttl=3600, show_spinner=False)
+def fetch_insider_transactions(cik, filings_data):
+    """Transactions of the given filings; parsed filings are cached on disk by accession number."""
+    filings = [{"accession_number": f["Accession Number"], "primary_document": f["Primary Document"],
+                "form": f["Form Type"], "filing_date": f["Filing Date"]} for f in filings_data]
+    try:
+        return load_transactions(cik, filings)
+    except Exception as e:
+        st.error(f"Error reading insider transactions for CIK {cik}: {e}")
+        return pd.DataFrame()
+
 # --- Main Page Content ---
 st.header("Search for a Company's Insider Trading Activity")
 
-company_input = st.text_input("Enter Company Name (e.g., Tesla Inc, Apple Inc):", key="insider_company_search_input")
+company_input = st.text_input("Enter Company Name, Ticker or CIK (e.g., Tesla Inc, AAPL):", key="insider_company_search_input")
+col1, col2 = st.columns(2)
+insider_since = col1.date_input("Filed since", value=datetime(datetime.today().year - 2, 1, 1),
+                                min_value=datetime(2003, 1, 1), key="insider_since_date_input")
+insider_max_filings = col2.slider("Maximum filings", 10, 500, 50, step=10, key="insider_max_filings_slider")
 
 if company_input:
-    cik = get_cik_from_company_name_rough(company_input)
+    company = get_sec_resolver().resolve(company_input)
+    cik = company["cik"] if company else None
     
     if cik:
-        st.success(f"Found CIK for {company_input}: **{cik}**")
+        st.success(f"Found CIK for {company['name']}: **{cik}**")
         with st.spinner(f"Fetching recent insider filings for {company_input} (CIK: {cik})..."):
-            filings_data = fetch_insider_filings(cik)
+            filings_data = fetch_insider_filings(cik, insider_max_filings, insider_since)
         
         if filings_data:
             df_filings = pd.DataFrame(filings_data)
@@ -148,18 +121,90 @@ if company_input:
             st.subheader(f"Recent Insider Filings for {company_input}")
             
             # Display filings with clickable links
-            display_df = df_filings.copy()
+            display_df = df_filings.drop(columns=['Accession Number', 'Primary Document'])
             display_df['Link'] = display_df['Link'].apply(lambda x: f"[View Filing]({x})")
             
             st.markdown(display_df.to_html(escape=False, index=False), unsafe_allow_html=True)
             
-            st.info("""
-                Note: This table provides links to Form 3, 4, and 5 filings.
-                To view transaction details (e.g., shares bought/sold, price), you need to click
-                on the "View Filing" link and examine the filing's content. Extracting these
-                specific transaction details programmatically is more complex and typically
-                requires dedicated XBRL parsing libraries or services.
-            """)
+            with st.spinner(f"Reading transactions from {len(filings_data)} filings..."):
+                transactions_df = fetch_insider_transactions(cik, filings_data)
+
+            if not transactions_df.empty:
+                st.subheader("Insider Transactions")
+                transactions_df['Transaction'] = transactions_df['code'].map(TRANSACTION_CODES).fillna(transactions_df['code'])
+                st.dataframe(
+                    transactions_df[['date', 'owner_name', 'relationship', 'form', 'table_type', 'security',
+                                     'Transaction', 'acquired_disposed', 'shares', 'price', 'value', 'shares_after']
+                    ].rename(columns={
+                        'date': 'Date', 'owner_name': 'Insider', 'relationship': 'Relationship', 'form': 'Form',
+                        'table_type': 'Table', 'security': 'Security', 'acquired_disposed': 'A/D', 'shares': 'Shares',
+                        'price': 'Price', 'value': 'Value ($)', 'shares_after': 'Shares Owned After'}),
+                    column_config={
+                        'Date': st.column_config.DateColumn('Date'),
+                        'Price': st.column_config.NumberColumn('Price', format="%.2f"),
+                        'Value ($)': st.column_config.NumberColumn('Value ($)', format="%.0f"),
+                    },
+                    hide_index=True,
+                    use_container_width=True,
+                )
+
+                # --- Timeline of open-market trades ---
+                trades_df = transactions_df[transactions_df['code'].isin(['P', 'S'])].dropna(subset=['date'])
+                if not trades_df.empty:
+                    st.subheader("Open-Market Trades Timeline")
+                    fig = px.scatter(
+                        trades_df.assign(size=trades_df['value'].abs()), x='date', y='value', color='Transaction',
+                        size='size', hover_name='owner_name', hover_data={'shares': True, 'price': True, 'size': False},
+                        color_discrete_map={'Open-market purchase': '#2ecc71', 'Open-market sale': '#e74c3c'},
+                        labels={'date': 'Date', 'value': 'Value ($)'},
+                    )
+                    fig.add_hline(y=0, line_color='grey', line_width=1)
+                    fig.update_layout(template='plotly_dark', height=450)
+                    st.plotly_chart(fig, use_container_width=True)
+
+                # --- Net buying and selling ---
+                st.subheader("Net Open-Market Activity")
+                summary_column_config = {
+                    name: st.column_config.NumberColumn(name, format="%.0f")
+                    for name in ['Bought ($)', 'Sold ($)', 'Net ($)', 'Shares Bought', 'Shares Sold']
+                }
+                summary_names = {'bought': 'Bought ($)', 'sold': 'Sold ($)', 'net': 'Net ($)',
+                                 'shares_bought': 'Shares Bought', 'shares_sold': 'Shares Sold',
+                                 'trades': 'Trades', 'last_trade': 'Last Trade'}
+                by_insider_df = net_activity(transactions_df, by='owner_name')
+                by_company_df = net_activity(transactions_df, by='issuer_name')
+                if not by_insider_df.empty:
+                    col1, col2 = st.columns([2, 1])
+                    with col1:
+                        st.markdown("**By insider**")
+                        st.dataframe(by_insider_df.rename(columns={'owner_name': 'Insider', **summary_names}),
+                                     column_config=summary_column_config, hide_index=True, use_container_width=True)
+                    with col2:
+                        st.markdown("**By company**")
+                        st.dataframe(by_company_df[['issuer_name', 'bought', 'sold', 'net']].rename(
+                                         columns={'issuer_name': 'Company', **summary_names}),
+                                     column_config=summary_column_config, hide_index=True, use_container_width=True)
+                else:
+                    st.info("No open-market purchases or sales in these filings (only grants, exercises, gifts, etc.).")
+
+                # --- Cluster buys ---
+                st.subheader("Cluster Buys")
+                col1, col2 = st.columns(2)
+                cluster_window = col1.slider("Window (days)", 5, 90, 30, key="insider_cluster_window_slider")
+                cluster_min = col2.slider("Minimum insiders buying", 2, 10, 3, key="insider_cluster_min_slider")
+                clusters_df = cluster_buys(transactions_df, window_days=cluster_window, min_insiders=cluster_min)
+                if not clusters_df.empty:
+                    st.dataframe(
+                        clusters_df.rename(columns={'start': 'From', 'end': 'To', 'insiders': 'Insiders',
+                                                    'names': 'Buyers', 'value': 'Value ($)', 'shares': 'Shares'}),
+                        column_config={'Value ($)': st.column_config.NumberColumn('Value ($)', format="%.0f")},
+                        hide_index=True,
+                        use_container_width=True,
+                    )
+                else:
+                    st.info(f"No periods where {cluster_min} or more insiders bought within {cluster_window} days.")
+            else:
+                st.info("No transactions could be read from these filings (Form 3 filings only report holdings).")
 
             # Optional: Update session state for AI summary
             if 'ai_summary_data' not in st.session_state:
@@ -168,10 +213,14 @@ if company_input:
                 "company": company_input,
                 "cik": cik,
                 "num_filings": len(filings_data),
+                "net_open_market_value": float(transactions_df.loc[transactions_df['code'].isin(['P', 'S']), 'value'].sum())
+                                         if not transactions_df.empty else 0.0,
+                "top_insiders": by_insider_df.head(5)[['owner_name', 'net']].to_dict('records')
+                                if not transactions_df.empty else [],
                 "status": "Insider filings displayed successfully."
             }
         else:
-            st.warning(f"No recent Form 3, 4, or 5 filings found for {company_input} (CIK: {cik}) in the latest {num_filings_to_check} filings, or an error occurred during fetch.")
+            st.warning(f"No recent Form 3, 4, or 5 filings found for {company_input} (CIK: {cik}) in the latest filings, or an error occurred during fetch.")
             if 'ai_summary_data' not in st.session_state:
                 st.session_state['ai_summary_data'] = {}
             st.session_state['ai_summary_data']['Insider Trading'] = {
@@ -2,6 +2,12 @@ import streamlit as st
 import yfinance as yf
 import pandas as pd
 from datetime import datetime, timedelta
+import portfolio_db
+import portfolio_performance
+import risk_engine
+from quote_hub import watch
+from quote_service import fetch_batch_quotes
+from cache_registry import get_cache_registry
 
 import streamlit as st
 import base64
@@ -49,50 +55,34 @@ st.write("Track your investments, see real-time valuations, and analyze your por
 
 st.markdown("---")
 
-# --- Initialize portfolio in session state if it doesn't exist ---
-if 'portfolio' not in st.session_state:
-    st.session_state['portfolio'] = [] # List of dictionaries, each dict is a holding
+# --- Authentication check ---
+if not st.session_state.get("logged_in", False):
+    st.error("Please log in to track your portfolio.")
+    st.stop()
+
+# --- Holdings and transactions are stored per user in users.db ---
+user_id = st.session_state.get("user_id")
+conn = portfolio_db.connect()
 
 # --- Add New Holding Section ---
 st.subheader("Add New Holding")
 with st.form("new_holding_form", clear_on_submit=True):
-    col1, col2, col3 = st.columns(3)
+    col1, col2, col3, col4 = st.columns(4)
     with col1:
         ticker = st.text_input("Ticker Symbol (e.g., AAPL, RELIANCE.NS, ^NSEI)", key="new_ticker").strip().upper()
     with col2:
         shares = st.number_input("Number of Shares/Units", min_value=0.01, value=1.0, step=0.1, key="new_shares")
     with col3:
         purchase_price = st.number_input("Average Purchase Price (per share/unit)", min_value=0.01, value=100.0, step=0.01, key="new_price")
+    with col4:
+        trade_date = st.date_input("Purchase Date", value=datetime.now().date(), key="new_trade_date")
     
     add_button = st.form_submit_button("Add Holding to Portfolio")
 
     if add_button and ticker and shares > 0 and purchase_price > 0:
-        # Check for existing holding to update
-        found = False
-        for holding in st.session_state['portfolio']:
-            if holding['ticker'] == ticker:
-                # Simple average for now, could be more complex (e.g., weighted average)
-                total_cost_old = holding['shares'] * holding['purchase_price']
-                total_cost_new = shares * purchase_price
-                total_shares = holding['shares'] + shares
-                
-                holding['shares'] = total_shares
-                holding['purchase_price'] = (total_cost_old + total_cost_new) / total_shares
-                st.success(f"Updated {ticker} in portfolio.")
-                found = True
-                break
-        
-        if not found:
-            st.session_state['portfolio'].append({
-                "ticker": ticker,
-                "shares": shares,
-                "purchase_price": purchase_price,
-                "last_price": 0.0, # Will be fetched
-                "current_value": 0.0, # Will be calculated
-                "gain_loss": 0.0, # Will be calculated
-                "percent_gain_loss": 0.0 # Will be calculated
-            })
-            st.success(f"Added {ticker} to portfolio.")
+        # Existing holdings are updated to the weighted average cost
+        portfolio_db.add_transaction(conn, user_id, ticker, shares, purchase_price, trade_date)
+        st.success(f"Recorded {shares} of {ticker} in portfolio.")
     elif add_button:
         st.warning("Please fill in all fields to add a holding.")
 
@@ -101,98 +91,62 @@ st.markdown("---")
 # --- Portfolio Summary Section ---
 st.subheader("Your Current Portfolio Holdings")
 
-if not st.session_state['portfolio']:
+holdings = portfolio_db.load_holdings(conn, user_id)
+
+if holdings.empty:
     st.info("Your portfolio is empty. Add some holdings using the form above!")
 else:
     # --- Fetch current prices ---
-    tickers_to_fetch = [h['ticker'] for h in st.session_state['portfolio']]
+    tickers_to_fetch = holdings['ticker'].tolist()
     
-    @st.cache_data(ttl=60*5) # Cache market data for 5 minutes
-    def get_current_prices(ticker_list):
+    def fetch_current_prices(ticker_list, direct=False):
         if not ticker_list:
             return {}
-        
-        # Download data for all tickers, just for the latest day
-        # Use period='1d' or '5d' and interval='1d' to get last close
-        # yf.download returns a MultiIndex DataFrame for multiple tickers
-        data = yf.download(ticker_list, period="1d", interval="1d", progress=False)
-
-        prices = {}
-        if data.empty:
-            return prices
-
-        # Handle MultiIndex for price data from yfinance for multiple tickers
-        # It's usually (Close, Ticker), (Open, Ticker), etc.
-        # We want the latest 'Close' price for each ticker
-        for ticker in ticker_list:
-            try:
-                if isinstance(data.columns, pd.MultiIndex):
-                    # Try to get the latest 'Close' price for the specific ticker
-                    # This targets columns like ('Close', 'AAPL')
-                    close_col = ('Close', ticker)
-                    if close_col in data.columns:
-                        prices[ticker] = data[close_col].iloc[-1]
-                    else:
-                        # Fallback for indices like ^NSEI which might not have the ticker in MultiIndex
-                        # or if it's a single level index from a previous download
-                        prices[ticker] = data['Close'].iloc[-1] if 'Close' in data.columns else None
-                elif 'Close' in data.columns: # Single-level index, might be for a single ticker only
-                    prices[ticker] = data['Close'].iloc[-1]
-                else:
-                    prices[ticker] = None # Price not found
-            except IndexError:
-                prices[ticker] = None # No data for this ticker in the fetched period
-            except KeyError:
-                prices[ticker] = None # Column not found
-            except Exception as e:
-                st.warning(f"Could not fetch price for {ticker}: {e}")
-                prices[ticker] = None
-        return prices
 
+        # Latest quotes come from the shared quote hub, which refreshes every
+        # session's tickers in the background; only tickers it has not seen
+        # yet (or all of them, on an explicit refresh) are fetched directly.
+        quotes = watch("portfolio", ticker_list)
+        missing = ticker_list if direct else [t for t in ticker_list if t not in quotes]
+        if missing:
+            quotes.update(fetch_batch_quotes(missing))
+        return {ticker: quote["price"] for ticker, quote in quotes.items()}
+
+    # Prices are cached per user in their own namespace, so a refresh evicts
+    # only this user's quote keys instead of every cached function in the app.
+    cache_registry = get_cache_registry()
+    cache_registry.namespace("portfolio_quotes", ttl=60*5) # Cache market data for 5 minutes
+    quotes_key = (user_id, tuple(tickers_to_fetch))
 
     if st.button("Refresh Portfolio Prices", key="refresh_portfolio_btn"):
-        st.cache_data.clear() # Clear cache to ensure fresh prices
-        current_prices = get_current_prices(tickers_to_fetch)
+        cache_registry.invalidate_where("portfolio_quotes", lambda key: key[0] == user_id)
+        current_prices = cache_registry.get(
+            "portfolio_quotes", quotes_key, lambda: fetch_current_prices(tickers_to_fetch, direct=True)
+        )
     else:
-        current_prices = get_current_prices(tickers_to_fetch) # Use cached data initially
+        current_prices = cache_registry.get(
+            "portfolio_quotes", quotes_key, lambda: fetch_current_prices(tickers_to_fetch)
+        ) # Use cached data initially
 
 
-    total_portfolio_value = 0.0
-    total_purchase_cost = 0.0
-    
-    # Prepare data for display
-    portfolio_data = []
-    
-    for holding in st.session_state['portfolio']:
-        ticker = holding['ticker']
-        last_price = current_prices.get(ticker)
-        
-        if last_price is not None and not pd.isna(last_price): # Check for None and NaN
-            holding['last_price'] = last_price
-            holding['current_value'] = holding['shares'] * last_price
-            holding['gain_loss'] = holding['current_value'] - (holding['shares'] * holding['purchase_price'])
-            holding['percent_gain_loss'] = (holding['gain_loss'] / (holding['shares'] * holding['purchase_price'])) * 100 if (holding['shares'] * holding['purchase_price']) > 0 else 0
-        else:
-            holding['last_price'] = "N/A"
-            holding['current_value'] = "N/A"
-            holding['gain_loss'] = "N/A"
-            holding['percent_gain_loss'] = "N/A"
-
-        total_portfolio_value += holding['current_value'] if isinstance(holding['current_value'], (int, float)) else 0
-        total_purchase_cost += holding['shares'] * holding['purchase_price']
-
-        portfolio_data.append({
-            "Ticker": holding['ticker'],
-            "Shares": holding['shares'],
-            "Avg. Cost": f"${holding['purchase_price']:.2f}",
-            "Last Price": f"${holding['last_price']:.2f}" if isinstance(holding['last_price'], (int, float)) else holding['last_price'],
-            "Current Value": f"${holding['current_value']:.2f}" if isinstance(holding['current_value'], (int, float)) else holding['current_value'],
-            "Gain/Loss ($)": f"${holding['gain_loss']:.2f}" if isinstance(holding['gain_loss'], (int, float)) else holding['gain_loss'],
-            "Gain/Loss (%)": f"{holding['percent_gain_loss']:.2f}%" if isinstance(holding['percent_gain_loss'], (int, float)) else holding['percent_gain_loss']
-        })
-
-    if portfolio_data:
-        st.dataframe(pd.DataFrame(portfolio_data), use_container_width=True, hide_index=True)
+    # --- Value every holding in one vectorized pass ---
+    valued = portfolio_db.value_holdings(holdings, current_prices)
+    total_portfolio_value = valued['current_value'].sum()
+    total_purchase_cost = valued['cost_basis'].sum()
+
+    st.dataframe(
+        valued[['ticker', 'shares', 'avg_cost', 'last_price', 'current_value', 'gain_loss', 'percent_gain_loss']],
+        use_container_width=True, hide_index=True,
+        column_config={
+            "ticker": "Ticker",
+            "shares": "Shares",
+            "avg_cost": st.column_config.NumberColumn("Avg. Cost", format="$%.2f"),
+            "last_price": st.column_config.NumberColumn("Last Price", format="$%.2f"),
+            "current_value": st.column_config.NumberColumn("Current Value", format="$%.2f"),
+            "gain_loss": st.column_config.NumberColumn("Gain/Loss ($)", format="$%.2f"),
+            "percent_gain_loss": st.column_config.NumberColumn("Gain/Loss (%)", format="%.2f%%"),
+        },
+    )
     
     st.markdown(f"**Total Portfolio Value:** ${total_portfolio_value:,.2f}")
     
@@ -212,16 +166,8 @@ else:
 
     # Basic pie chart for current value allocation
     if total_portfolio_value > 0:
-        alloc_data = {
-            "Label": [],
-            "Value": []
-        }
-        for holding in st.session_state['portfolio']:
-            if isinstance(holding['current_value'], (int, float)):
-                alloc_data["Label"].append(holding['ticker'])
-                alloc_data["Value"].append(holding['current_value'])
-        
-        alloc_df = pd.DataFrame(alloc_data)
+        alloc_df = valued.loc[valued['current_value'].notna(), ['ticker', 'current_value']]
+        alloc_df.columns = ['Label', 'Value']
 
         if not alloc_df.empty:
             import plotly.express as px
@@ -236,17 +182,99 @@ else:
     else:
         st.info("Add holdings with valid prices to see diversification analysis.")
 
+    # --- Historical Performance ---
+    st.subheader("Performance History")
+
+    @st.cache_data(ttl=60*60) # Daily closes change at most once per trading day
+    def get_price_panel(ticker_list, start):
+        return portfolio_performance.load_price_panel(list(ticker_list), start)
+
+    ledger = portfolio_db.load_transactions(conn, user_id)
+    if not ledger.empty:
+        panel = get_price_panel(
+            tuple(tickers_to_fetch) + (portfolio_performance.BENCHMARK_TICKER,),
+            ledger['trade_date'].min().date(),
+        )
+        benchmark = panel.pop(portfolio_performance.BENCHMARK_TICKER) if portfolio_performance.BENCHMARK_TICKER in panel.columns else None
+        if not panel.empty:
+            # Reuses the previous run for this session: only the last day is recomputed and new days appended
+            st.session_state['portfolio_perf'] = portfolio_performance.update_performance(
+                st.session_state.get('portfolio_perf'), ledger, panel, benchmark
+            )
+            perf = st.session_state['portfolio_perf']['perf']
+
+            summary = portfolio_performance.summarize_performance(perf)
+            metric_cols = st.columns(len(summary))
+            for metric_col, (label, metric_value) in zip(metric_cols, summary.items()):
+                metric_col.metric(label, f"{metric_value:,.2f}" if pd.notna(metric_value) else "N/A")
+
+            import plotly.graph_objects as go
+            fig_perf = go.Figure()
+            fig_perf.add_trace(go.Scatter(x=perf.index, y=(perf['twr_index'] - 1) * 100, mode='lines', name='Portfolio (TWR %)'))
+            if 'benchmark_index' in perf.columns:
+                fig_perf.add_trace(go.Scatter(x=perf.index, y=(perf['benchmark_index'] - 1) * 100, mode='lines', name='Nifty 50 (%)'))
+            fig_perf.add_trace(go.Scatter(x=perf.index, y=perf['drawdown'] * 100, mode='lines', name='Drawdown (%)', line=dict(dash='dot')))
+            fig_perf.update_layout(title='Time-Weighted Return vs Benchmark', xaxis_title="Date", yaxis_title="%",
+                                   hovermode="x unified", template="plotly_dark")
+            st.plotly_chart(fig_perf, use_container_width=True)
+
+            # --- Risk (VaR / CVaR) ---
+            st.subheader("Risk Analysis")
+
+            @st.cache_data(ttl=60*60)
+            def get_risk_report(_prices, version, weights, horizon_days):
+                # _prices is not hashed; the panel version stands in for it
+                return risk_engine.risk_report(
+                    _prices, list(weights), horizon_days=horizon_days,
+                    processes=risk_engine.default_processes(_prices.shape[1], risk_engine.DEFAULT_PATHS),
+                )
+
+            priced = valued[valued['current_value'].notna() & valued['ticker'].isin(panel.columns)]
+            if len(priced) > 0:
+                horizon_days = st.selectbox("Risk horizon (trading days)", [1, 5, 10, 21], key="risk_horizon_select")
+                risk_prices = panel[priced['ticker'].tolist()]
+                report = get_risk_report(
+                    risk_prices, risk_engine.panel_version(risk_prices),
+                    tuple(priced['current_value'].round(2)), horizon_days,
+                )
+                if not report.empty:
+                    report['VaR ($)'] = report['VaR'] * total_portfolio_value
+                    report['CVaR ($)'] = report['CVaR'] * total_portfolio_value
+                    report[['Confidence', 'VaR', 'CVaR']] *= 100
+                    st.dataframe(
+                        report, use_container_width=True, hide_index=True,
+                        column_config={
+                            "Confidence": st.column_config.NumberColumn("Confidence (%)", format="%.0f"),
+                            "VaR": st.column_config.NumberColumn("VaR (%)", format="%.2f"),
+                            "CVaR": st.column_config.NumberColumn("CVaR (%)", format="%.2f"),
+                            "VaR ($)": st.column_config.NumberColumn(format="$%.2f"),
+                            "CVaR ($)": st.column_config.NumberColumn(format="$%.2f"),
+                        },
+                    )
+                    st.caption(f"Monte Carlo estimates use {risk_engine.DEFAULT_PATHS:,} correlated paths. VaR and CVaR are expected losses over the selected horizon.")
+                else:
+                    st.info("Not enough price history to estimate risk.")
+        else:
+            st.info("No price history available yet to compute performance.")
+
     # --- Remove Holding Section ---
     st.subheader("Remove Holding")
-    tickers_in_portfolio = [h['ticker'] for h in st.session_state['portfolio']]
+    tickers_in_portfolio = holdings['ticker'].tolist()
     if tickers_in_portfolio:
         ticker_to_remove = st.selectbox("Select Ticker to Remove", [""] + tickers_in_portfolio, key="remove_ticker_select")
         if st.button("Remove Selected Holding", key="remove_btn"):
             if ticker_to_remove:
-                st.session_state['portfolio'] = [h for h in st.session_state['portfolio'] if h['ticker'] != ticker_to_remove]
+                portfolio_db.remove_holding(conn, user_id, ticker_to_remove)
                 st.success(f"Removed {ticker_to_remove} from portfolio.")
                 st.rerun() # Rerun to update the display immediately
             else:
                 st.warning("Please select a ticker to remove.")
     else:
         st.info("No holdings to remove.")
+
+    # --- Cache diagnostics ---
+    with st.expander("Cache statistics"):
+        st.dataframe(pd.DataFrame.from_dict(cache_registry.stats(), orient="index"), use_container_width=True)
+
+# --- Close the database connection ---
+conn.close()
@@ -2,6 +2,10 @@ import streamlit as st
 import pandas as pd
 import re # Make sure re is imported if you use it in extract_amount
 from advisor import generate_recommendation # Ensure advisor.py is in the main directory
+from advisor import search_funds
+from backtester import load_nav_panel, run_backtest, strategy_grid
+import plotly.graph_objects as go
+from datetime import date
 
 
 import streamlit as st
@@ -91,11 +95,11 @@ if st.button("Get Advice", key="ip_get_advice_btn"): # Unique key
     alloc = result["allocation"]
     eq = extract_amount(alloc["Equity"])
     de = extract_amount(alloc["Debt"])
-    go = extract_amount(alloc["Gold"])
+    gold = extract_amount(alloc["Gold"])
 
     st.write(f"Equity: ₹{eq:,}")
     st.write(f"Debt: ₹{de:,}")
-    st.write(f"Gold: ₹{go:,}")
+    st.write(f"Gold: ₹{gold:,}")
 
     # --- Capture for AI Summary ---
     # Ensure st.session_state['ai_summary_data'] is initialized in Home.py
@@ -104,7 +108,74 @@ if st.button("Get Advice", key="ip_get_advice_btn"): # Unique key
     st.session_state['ai_summary_data']['Investment Plan'] = {
         "user_inputs": f"Age: {age}, Income: {income}, Profession: {profession}, Region: {region}, Goal: {goal}",
         "advice": result['advice_text'],
-        "allocation": f"Equity: {eq}, Debt: {de}, Gold: {go}"
+        "allocation": f"Equity: {eq}, Debt: {de}, Gold: {gold}"
     }
 
 st.markdown("---")
+
+# --- Strategy Backtest: SIP vs lump sum vs STP on real NAV history ---
+st.subheader("📆 Backtest an Investment Strategy")
+st.markdown("<p style='color: white;'>See what a monthly SIP, a lump sum or a systematic transfer (STP) into a fund would be worth today.</p>", unsafe_allow_html=True)
+
+bt_query = st.text_input("Equity fund to invest in", key="ip_bt_fund_query")
+stp_query = st.text_input("Liquid/debt fund to park the corpus in for STP (optional)", key="ip_bt_stp_query")
+
+def pick_scheme(query, label, key):
+    """Selectbox over the top search results; returns the chosen scheme code or None."""
+    if not query:
+        return None
+    results = search_funds(query)[:10]
+    if not results:
+        st.warning(f"No funds found for '{query}'.")
+        return None
+    options = {f"{f['schemeName']} ({f['schemeCode']})": int(f['schemeCode']) for f in results}
+    return options[st.selectbox(label, options=list(options.keys()), key=key)]
+
+target_code = pick_scheme(bt_query, "Select the equity fund", "ip_bt_fund_select")
+source_code = pick_scheme(stp_query, "Select the STP source fund", "ip_bt_stp_select")
+
+bt_col1, bt_col2, bt_col3 = st.columns(3)
+with bt_col1:
+    bt_sip = st.number_input("Monthly SIP (₹)", min_value=500, value=10000, step=500, key="ip_bt_sip")
+with bt_col2:
+    bt_start = st.date_input("Start date", value=date(2015, 1, 1), max_value=date.today(), key="ip_bt_start")
+with bt_col3:
+    bt_exit_load = st.number_input("Exit load (%) within 1 year", min_value=0.0, max_value=5.0, value=1.0, step=0.25, key="ip_bt_exit_load")
+
+if target_code is not None and st.button("Run Backtest", key="ip_bt_run_btn"):
+    with st.spinner("Loading NAV history and simulating strategies..."):
+        codes = [target_code] + ([source_code] if source_code is not None else [])
+        bt_navs = load_nav_panel(codes, start=bt_start)
+        if len(bt_navs) < 2:
+            st.error("Not enough NAV history for these funds after the start date.")
+        else:
+            n_months = (bt_navs.index[-1].year - bt_navs.index[0].year) * 12 + bt_navs.index[-1].month - bt_navs.index[0].month + 1
+            corpus = float(bt_sip) * n_months
+            base = {"weights": {target_code: 1}, "exit_load": bt_exit_load / 100}
+            grid = strategy_grid({**base, "name": "SIP", "kind": "sip", "amount": float(bt_sip)}, step_up=[0.0, 0.05, 0.10])
+            grid.append({**base, "name": "Lump sum", "kind": "lumpsum", "amount": corpus})
+            if source_code is not None:
+                grid += strategy_grid({**base, "name": "STP", "kind": "stp", "amount": corpus, "source": source_code},
+                                      months=[6, 12, 24])
+            bt_summary, bt_values = run_backtest(bt_navs, grid)
+
+            bt_summary[["absolute_return", "xirr"]] *= 100
+            st.dataframe(
+                bt_summary.drop(columns=["kind"]).sort_values("xirr", ascending=False),
+                hide_index=True,
+                use_container_width=True,
+                column_config={
+                    "strategy": "Strategy",
+                    "invested": st.column_config.NumberColumn("Invested", format="₹%.0f"),
+                    "final_value": st.column_config.NumberColumn("Value Now", format="₹%.0f"),
+                    "exit_load_paid": st.column_config.NumberColumn("Exit Load", format="₹%.0f"),
+                    "gain": st.column_config.NumberColumn("Gain", format="₹%.0f"),
+                    "absolute_return": st.column_config.NumberColumn("Absolute Return", format="%.2f%%"),
+                    "xirr": st.column_config.NumberColumn("XIRR", format="%.2f%%"),
+                },
+            )
+            fig_bt = go.Figure([go.Scatter(x=bt_values.index, y=bt_values[name], mode='lines', name=name)
+                                for name in bt_values.columns])
+            fig_bt.update_layout(title="Portfolio Value by Strategy", xaxis_title="Date", yaxis_title="Value (₹)",
+                                 height=450, template="plotly_dark")
+            st.plotly_chart(fig_bt, use_container_width=True)
@@ -2,6 +2,8 @@
 import streamlit as st
 import sqlite3
 import yfinance as yf # Import the yfinance library
+from quote_service import iter_quotes
+from quote_hub import watch
 
 import base64
 
@@ -82,37 +84,37 @@ if not watchlist_items:
 else:
     # Create columns for the dashboard layout
     cols = st.columns(3) 
-    col_index = 0
-
-    for item_id, ticker in watchlist_items:
-        try:
-            # Fetch data for the ticker
-            data = yf.Ticker(ticker)
-            info = data.info
-            
-            # Extract key metrics
-            price = info.get("currentPrice", 0)
-            prev_close = info.get("previousClose", 1)
-            change = price - prev_close
-            change_percent = (change / prev_close) * 100
-            
-            # Display data in the next available column
-            with cols[col_index]:
-                st.subheader(f"{info.get('longName', ticker)} ({ticker})")
-                st.metric(label="Current Price", value=f"${price:,.2f}", delta=f"{change:,.2f} ({change_percent:.2f}%)")
-                
+
+    # Lay out one placeholder per card so each can be filled as its quote arrives
+    cards = {}
+    for index, (item_id, ticker) in enumerate(watchlist_items):
+        with cols[index % len(cols)]:
+            cards.setdefault(ticker, []).append((item_id, st.empty()))
+            cards[ticker][-1][1].info(f"Loading {ticker}...")
+
+    def render_card(ticker, quote):
+        for item_id, placeholder in cards.get(ticker, []):
+            with placeholder.container():
+                if quote is None:
+                    st.error(f"Could not fetch data for {ticker}.")
+                else:
+                    st.subheader(ticker)
+                    st.metric(label="Current Price", value=f"${quote['price']:,.2f}", delta=f"{quote['change']:,.2f} ({quote['change_percent']:.2f}%)")
+
                 if st.button("Remove", key=f"remove_{item_id}", use_container_width=True):
                     cursor.execute("DELETE FROM watchlist WHERE id = ?", (item_id,))
                     conn.commit()
                     st.rerun()
 
-            # Move to the next column, wrap around if necessary
-            col_index = (col_index + 1) % len(cols)
-
-        except Exception as e:
-            with cols[col_index]:
-                st.error(f"Could not fetch data for {ticker}.")
-            col_index = (col_index + 1) % len(cols)
+    # Quotes already held by the shared quote hub render without network I/O;
+    # tickers it has not fetched yet are streamed in directly.
+    tickers = list(cards)
+    snapshot = watch("watchlist", tickers)
+    for ticker in tickers:
+        if ticker in snapshot:
+            render_card(ticker, snapshot[ticker])
+    for ticker, quote in iter_quotes([t for t in tickers if t not in snapshot]):
+        render_card(ticker, quote)
 
 # --- Close the database connection ---
 conn.close()
@@ -1,5 +1,11 @@
 import streamlit as st
 from advisor import search_funds # Ensure advisor.py is in the main directory
+from nav_store import get_nav_store
+from amfi_ingest import ingest_nav_file
+from backtester import run_backtest, strategy_grid
+from fund_screener import METRIC_COLUMNS, query_metrics, refresh_metrics
+import plotly.graph_objects as go
+from datetime import date
 
 
 import streamlit as st
@@ -66,6 +72,67 @@ if search_query:
             "query": search_query,
             "results": f"Found {len(funds)} funds. Top 5: {', '.join(found_funds_info)}"
         }
+
+        # --- NAV History (served from the local NAV store) ---
+        st.subheader("NAV History")
+        scheme_options = {f"{fund['schemeName']} ({fund.get('schemeCode')})": fund.get('schemeCode') for fund in funds[:5]}
+        selected_scheme = st.selectbox("Select a scheme to chart", options=list(scheme_options.keys()), key="mfr_nav_scheme_select")
+        scheme_code = scheme_options[selected_scheme]
+
+        nav_store = get_nav_store()
+        nav_history = nav_store.load_series(scheme_code)
+        if nav_history.empty:
+            # First request for this scheme: load its full history once
+            with st.spinner("Loading NAV history for the first time..."):
+                nav_store.bulk_load([scheme_code])
+            nav_history = nav_store.load_series(scheme_code)
+
+        if not nav_history.empty:
+            fig_nav = go.Figure(data=[go.Scatter(x=nav_history.index, y=nav_history.values, mode='lines', name='NAV')])
+            fig_nav.update_layout(title=f"{selected_scheme} NAV", xaxis_title="Date", yaxis_title="NAV (₹)",
+                                  height=450, template="plotly_dark")
+            st.plotly_chart(fig_nav, use_container_width=True)
+            st.caption(f"Latest NAV: ₹{nav_history.iloc[-1]:,.4f} on {nav_history.index[-1].date()}")
+
+            # --- SIP Backtest on this scheme ---
+            st.subheader("SIP Backtest")
+            first_day, last_day = nav_history.index[0].date(), nav_history.index[-1].date()
+            bt_col1, bt_col2 = st.columns(2)
+            with bt_col1:
+                sip_amount = st.number_input("Monthly SIP (₹)", min_value=500, value=10000, step=500, key="mfr_bt_amount")
+            with bt_col2:
+                bt_start = st.date_input("Start date", value=max(first_day, date(2015, 1, 1)), min_value=first_day,
+                                         max_value=last_day, key="mfr_bt_start")
+            code = int(scheme_code)
+            bt_navs = nav_history[nav_history.index >= str(bt_start)].to_frame(code)
+            if len(bt_navs) > 1:
+                grid = strategy_grid({"name": "SIP", "kind": "sip", "amount": float(sip_amount), "weights": {code: 1}},
+                                     step_up=[0.0, 0.05, 0.10])
+                n_months = (bt_navs.index[-1].year - bt_navs.index[0].year) * 12 + bt_navs.index[-1].month - bt_navs.index[0].month + 1
+                grid.append({"name": "Lump sum (same total as flat SIP)", "kind": "lumpsum",
+                             "amount": float(sip_amount) * n_months, "weights": {code: 1}})
+                bt_summary, bt_values = run_backtest(bt_navs, grid)
+                bt_summary[["absolute_return", "xirr"]] *= 100
+                st.dataframe(
+                    bt_summary.drop(columns=["kind", "exit_load_paid"]),
+                    hide_index=True,
+                    use_container_width=True,
+                    column_config={
+                        "strategy": "Strategy",
+                        "invested": st.column_config.NumberColumn("Invested", format="₹%.0f"),
+                        "final_value": st.column_config.NumberColumn("Value Now", format="₹%.0f"),
+                        "gain": st.column_config.NumberColumn("Gain", format="₹%.0f"),
+                        "absolute_return": st.column_config.NumberColumn("Absolute Return", format="%.2f%%"),
+                        "xirr": st.column_config.NumberColumn("XIRR", format="%.2f%%"),
+                    },
+                )
+                fig_bt = go.Figure([go.Scatter(x=bt_values.index, y=bt_values[name], mode='lines', name=name)
+                                    for name in bt_values.columns])
+                fig_bt.update_layout(title="Portfolio Value by Strategy", xaxis_title="Date", yaxis_title="Value (₹)",
+                                     height=450, template="plotly_dark")
+                st.plotly_chart(fig_bt, use_container_width=True)
+        else:
+            st.markdown("<p style='color: white;'>No NAV history available for this scheme.</p>", unsafe_allow_html=True)
     else:
         st.markdown("<p style='color: white;'>No funds found for your query.</p>", unsafe_allow_html=True)
         if 'ai_summary_data' not in st.session_state:
@@ -75,3 +142,62 @@ if search_query:
             "results": "No funds found."
         }
 st.markdown("---")
+
+# --- Fund Screener (whole-universe metrics, recomputed once a day) ---
+st.subheader("Fund Screener")
+st.write("Screen every scheme in the local NAV store by returns, consistency and risk.")
+
+if st.button("Update all NAVs from AMFI", key="mfr_amfi_ingest_button"):
+    with st.spinner("Downloading the AMFI daily NAV file..."):
+        try:
+            summary = ingest_nav_file()
+            st.success(f"Stored {summary['rows']:,} NAVs for {summary['schemes']:,} schemes ({summary['new_schemes']:,} new).")
+            refresh_metrics(get_nav_store(), force=True)
+        except Exception as e:
+            st.error(f"Could not ingest the AMFI NAV file: {e}")
+
+with st.spinner("Updating screener metrics..."):
+    refresh_metrics(get_nav_store())
+
+screen_col1, screen_col2, screen_col3 = st.columns(3)
+with screen_col1:
+    min_cagr_3y = st.slider("Min 3Y CAGR (%)", -20.0, 40.0, 10.0, step=0.5, key="mfr_screen_min_cagr")
+with screen_col2:
+    min_sharpe = st.slider("Min Sharpe ratio", -1.0, 3.0, 0.5, step=0.1, key="mfr_screen_min_sharpe")
+with screen_col3:
+    max_drawdown = st.slider("Max drawdown (%)", 0.0, 60.0, 30.0, step=1.0, key="mfr_screen_max_dd")
+
+sort_col1, sort_col2 = st.columns([3, 1])
+with sort_col1:
+    sort_by = st.selectbox("Sort by", options=METRIC_COLUMNS, index=METRIC_COLUMNS.index("cagr_3y"), key="mfr_screen_sort")
+with sort_col2:
+    ascending = st.checkbox("Ascending", value=False, key="mfr_screen_ascending")
+
+screened = query_metrics(
+    min_values={"cagr_3y": min_cagr_3y / 100, "sharpe": min_sharpe, "max_drawdown": -max_drawdown / 100},
+    sort_by=sort_by, ascending=ascending, limit=100,
+)
+if screened.empty:
+    st.markdown("<p style='color: white;'>No schemes match these filters yet. NAV history is added to the screener as schemes are loaded.</p>", unsafe_allow_html=True)
+else:
+    percent_columns = ["cagr_1y", "cagr_3y", "cagr_5y", "rolling_1y_positive", "rolling_1y_beats_benchmark", "max_drawdown"]
+    screened[percent_columns] = screened[percent_columns] * 100
+    st.dataframe(
+        screened.drop(columns=["computed_on"], errors="ignore"),
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "scheme_code": st.column_config.NumberColumn("Code", format="%d"),
+            "scheme_name": "Scheme",
+            "cagr_1y": st.column_config.NumberColumn("1Y CAGR", format="%.2f%%"),
+            "cagr_3y": st.column_config.NumberColumn("3Y CAGR", format="%.2f%%"),
+            "cagr_5y": st.column_config.NumberColumn("5Y CAGR", format="%.2f%%"),
+            "rolling_1y_positive": st.column_config.NumberColumn("1Y Rolling > 0", format="%.0f%%"),
+            "rolling_1y_beats_benchmark": st.column_config.NumberColumn("1Y Rolling > Nifty", format="%.0f%%"),
+            "sharpe": st.column_config.NumberColumn("Sharpe", format="%.2f"),
+            "sortino": st.column_config.NumberColumn("Sortino", format="%.2f"),
+            "max_drawdown": st.column_config.NumberColumn("Max Drawdown", format="%.2f%%"),
+            "downside_capture": st.column_config.NumberColumn("Downside Capture", format="%.0f"),
+        },
+    )
+    st.caption(f"Showing {len(screened)} schemes. Metrics computed on {screened['computed_on'].iloc[0]}.")
@@ -1,10 +1,13 @@
 import streamlit as st
 import pandas as pd
-import yfinance as yf
 from datetime import datetime, timedelta
 import plotly.graph_objects as go
 import base64
 import os
+from price_store import get_history
+from quote_hub import watch
+from chart_utils import build_price_chart, build_indicator_chart, DEFAULT_TOP_N_ANNOTATIONS
+from indicators import IndicatorEngine, INDICATOR_OPTIONS, OVERLAY_INDICATORS
 
 # --- Page Configuration ---
 st.set_page_config(page_title="Market Chart", page_icon="📈", layout="wide")
@@ -61,6 +64,15 @@ selected_ticker = selected_asset["symbol"]
 st.title(f"📈 {asset_name} Historical Chart")
 st.write(f"View the historical performance of {asset_name} with daily profit/loss indicators.")
 
+# --- Latest quote from the shared quote hub (no network I/O on rerun) ---
+latest_quote = watch("market_trends", [selected_ticker]).get(selected_ticker)
+if latest_quote:
+    st.metric(
+        label=f"Latest Price ({selected_asset['currency']})",
+        value=f"{latest_quote['price'] * selected_asset['multiplier']:,.2f}",
+        delta=f"{latest_quote['change_percent']:.2f}%",
+    )
+
 # --- Date Range Selection ---
 end_date = datetime.now().date()
 start_date = end_date - timedelta(days=365)
@@ -71,6 +83,9 @@ with col1:
 with col2:
     chart_end_date = st.date_input("End Date", value=end_date)
 
+top_n_labels = st.slider("Label the largest daily moves (top N)", min_value=0, max_value=100, value=DEFAULT_TOP_N_ANNOTATIONS)
+selected_indicators = st.multiselect("Technical Indicators", options=INDICATOR_OPTIONS, default=[])
+
 st.markdown("---")
 
 # --- Chart Generation Logic ---
@@ -79,11 +94,9 @@ if chart_start_date >= chart_end_date:
 else:
     with st.spinner(f"Fetching historical data for {asset_name}..."):
         try:
-            data = yf.download(selected_ticker, start=chart_start_date, end=chart_end_date)
-            
-            if isinstance(data.columns, pd.MultiIndex):
-                data.columns = data.columns.droplevel(1)
-            
+            # Served from the local price store; only missing dates are downloaded
+            data = get_history(selected_ticker, chart_start_date, chart_end_date)
+
             if data.empty:
                 st.warning(f"No data found for {asset_name} in the specified date range.")
             else:
@@ -101,43 +114,47 @@ else:
 
                 st.subheader(f"{asset_name} Closing Price Trend")
 
-                fig = go.Figure(data=[go.Scatter(
-                    x=data.index, y=data['Close'], mode='lines',
-                    name=f'{asset_name} Close', line=dict(color='cyan'), connectgaps=True
-                )])
-
-                fig.add_trace(go.Scatter(
-                    x=data[data['Daily_Change'] >= 0].index, y=data[data['Daily_Change'] >= 0]['Close'],
-                    mode='markers', name='Profit', marker=dict(symbol='triangle-up', color='green', size=8)
-                ))
-                fig.add_trace(go.Scatter(
-                    x=data[data['Daily_Change'] < 0].index, y=data[data['Daily_Change'] < 0]['Close'],
-                    mode='markers', name='Loss', marker=dict(symbol='triangle-down', color='red', size=8)
-                ))
-
-                for index, row in data.iterrows():
-                    pct_change = row['Pct_Change']
-                    if pd.notna(pct_change) and abs(pct_change) > 1.0:
-                        color = "green" if pct_change > 0 else "red"
-                        y_anchor = "bottom" if pct_change > 0 else "top"
-                        text = f"+{pct_change:.2f}%" if pct_change > 0 else f"{pct_change:.2f}%"
-                        y_shift = 15 if pct_change > 0 else -15
-                        
-                        fig.add_annotation(
-                            x=index, y=row['Close'], text=text, showarrow=False,
-                            font=dict(color=color, size=10), yanchor=y_anchor, yshift=y_shift
-                        )
-
                 # Update y-axis title dynamically
                 yaxis_title = f"Price ({selected_asset['unit']}) ({selected_asset['currency']})"
-                
-                fig.update_layout(
+
+                # Indicators are kept per asset/window for this session; when a rerun only
+                # adds (or revises) the latest bar they are updated instead of recomputed
+                engine_key = f"indicators_{selected_ticker}_{chart_start_date}"
+                if engine_key not in st.session_state:
+                    st.session_state[engine_key] = IndicatorEngine()
+                indicator_data = st.session_state[engine_key].sync(data)
+
+                overlays = {}
+                for name in selected_indicators:
+                    if name == "Bollinger Bands":
+                        overlays["BB Upper"] = indicator_data["BB Upper"]
+                        overlays["BB Lower"] = indicator_data["BB Lower"]
+                    elif name in OVERLAY_INDICATORS:
+                        overlays[name] = indicator_data[name]
+
+                fig = build_price_chart(
+                    data,
                     title=f'{asset_name} ({selected_ticker}) Closing Price Trend',
-                    xaxis_rangeslider_visible=True,
-                    xaxis_title="Date", yaxis_title=yaxis_title,
-                    height=600, template="plotly_dark", showlegend=True
+                    yaxis_title=yaxis_title,
+                    line_name=f'{asset_name} Close',
+                    top_n=top_n_labels,
+                    overlays=overlays,
                 )
                 st.plotly_chart(fig, use_container_width=True)
 
+                # --- Oscillator panels ---
+                panel_columns = {
+                    "RSI": ["RSI"],
+                    "MACD": ["MACD", "MACD Signal", "MACD Histogram"],
+                    "ATR": ["ATR"],
+                    "Rolling Volatility": ["Rolling Volatility"],
+                }
+                for name in selected_indicators:
+                    if name in panel_columns:
+                        st.plotly_chart(
+                            build_indicator_chart(indicator_data, panel_columns[name], title=name),
+                            use_container_width=True,
+                        )
+
         except Exception as e:
             st.error(f"An error occurred: {e}")
@@ -4,6 +4,7 @@ import yfinance as yf
 from datetime import datetime, timedelta
 import plotly.graph_objects as go
 import numpy as np # For numerical operations and NaN handling
+from fx_engine import ALL_CURRENCIES, fetch_usd_panel, build_cross_cube, get_cross_rate
 
 import streamlit as st
 import base64
@@ -52,31 +53,6 @@ st.markdown("""
     </p>
     """, unsafe_allow_html=True)
 
-# --- Define 16 Common Currencies and their USD-based tickers ---
-# 'is_base_vs_usd': True means ticker gives Currency/USD (e.g., EURUSD=X gives EUR per USD)
-# 'is_base_vs_usd': False means ticker gives USD/Currency (e.g., INR=X gives INR per USD)
-# USD does not have a ticker itself, as it's the implicit base for many.
-CURRENCY_TICKER_MAP = {
-    'USD': {'ticker': None, 'is_base_vs_usd': True}, # USD is the reference currency
-    'EUR': {'ticker': 'EURUSD=X', 'is_base_vs_usd': True}, # EUR per USD
-    'GBP': {'ticker': 'GBPUSD=X', 'is_base_vs_usd': True}, # GBP per USD
-    'JPY': {'ticker': 'JPY=X', 'is_base_vs_usd': False}, # JPY per USD (i.e., USD per JPY is 1/JPY=X)
-    'CAD': {'ticker': 'CAD=X', 'is_base_vs_usd': False}, # CAD per USD (i.e., USD per CAD is 1/CAD=X)
-    'AUD': {'ticker': 'AUDUSD=X', 'is_base_vs_usd': True}, # AUD per USD
-    'CHF': {'ticker': 'CHF=X', 'is_base_vs_usd': False}, # CHF per USD (i.e., USD per CHF is 1/CHF=X)
-    'INR': {'ticker': 'INR=X', 'is_base_vs_usd': False}, # INR per USD (i.e., USD per INR is 1/INR=X)
-    'CNY': {'ticker': 'CNY=X', 'is_base_vs_usd': False}, # CNY per USD
-    'BRL': {'ticker': 'BRL=X', 'is_base_vs_usd': False}, # BRL per USD
-    'ZAR': {'ticker': 'ZAR=X', 'is_base_vs_usd': False}, # ZAR per USD
-    'MXN': {'ticker': 'MXN=X', 'is_base_vs_usd': False}, # MXN per USD
-    'SGD': {'ticker': 'SGD=X', 'is_base_vs_usd': False}, # SGD per USD
-    'HKD': {'ticker': 'HKD=X', 'is_base_vs_usd': False}, # HKD per USD
-    'KRW': {'ticker': 'KRW=X', 'is_base_vs_usd': False}, # KRW per USD
-    'RUB': {'ticker': 'RUB=X', 'is_base_vs_usd': False}, # RUB per USD (Note: Data might be volatile/limited due to sanctions)
-}
-
-ALL_CURRENCIES = sorted(list(CURRENCY_TICKER_MAP.keys()))
-
 # --- User Selection for Base and Quote Currencies ---
 col1_curr, col2_curr = st.columns(2)
 with col1_curr:
@@ -108,108 +84,32 @@ with col1_date:
 with col2_date:
     chart_end_date = st.date_input("End Date", value=end_date, key="custom_exchange_end_date")
 
-# --- Fetch Data and Calculate Cross Rate Function ---
-@st.cache_data(ttl=3600) # Cache data for 1 hour
+# --- Load all USD legs once and build the full cross-rate cube ---
+# Held with cache_resource so every pair and date window is served from the
+# same in-memory cube instead of being pickled and copied per cache hit.
+@st.cache_resource(ttl=3600) # Refresh the panel every hour
+def load_fx_cube():
+    """Downloads the full history of all USD legs and computes every cross rate."""
+    usd_panel = fetch_usd_panel()
+    if usd_panel.empty:
+        return None
+    return build_cross_cube(usd_panel)
+
 def fetch_and_calculate_exchange_rate(base_curr, quote_curr, start, end):
     """
-    Fetches required currency data from yfinance and calculates the cross rate.
-    Returns a DataFrame with 'Close' prices for the desired pair.
+    Returns a DataFrame with 'Close' prices for the desired pair, sliced
+    from the cached cross-rate cube.
     """
-    data = pd.DataFrame(index=pd.bdate_range(start=start, end=end, freq='B')) # Business days index
-    data.index.name = 'Date'
-
-    tickers_to_fetch = []
-    base_info = CURRENCY_TICKER_MAP[base_curr]
-    quote_info = CURRENCY_TICKER_MAP[quote_curr]
-
-    # Determine which tickers are needed
-    if base_info['ticker']:
-        tickers_to_fetch.append(base_info['ticker'])
-    if quote_info['ticker'] and quote_info['ticker'] != base_info['ticker']: # Avoid fetching same ticker twice
-        tickers_to_fetch.append(quote_info['ticker'])
-
-    if not tickers_to_fetch and (base_curr != 'USD' and quote_curr != 'USD'):
-        st.error(f"Cannot determine tickers for {base_curr}/{quote_curr} pair. Ensure both have USD-based tickers defined.")
-        return None
-
-    fetched_raw_data = {}
-    for ticker in set(tickers_to_fetch): # Use set to avoid duplicate fetches
-        df_temp = yf.download(ticker, start=start, end=end)
-        if not df_temp.empty and 'Close' in df_temp.columns:
-            fetched_raw_data[ticker] = df_temp['Close']
-        else:
-            st.warning(f"Could not fetch data for ticker: {ticker}. This may affect the exchange rate calculation.")
-            return None # Stop if crucial data is missing for a non-USD currency
-
-    if not fetched_raw_data and (base_curr != 'USD' and quote_curr != 'USD'):
-        st.warning("No data fetched for the selected non-USD currencies.")
-        return None
-
-    # Merge all fetched data onto a common date index
-    for ticker, series in fetched_raw_data.items():
-        # *** THIS IS THE CRITICAL FIX ***
-        # Assign the name directly to the Series before joining
-        series.name = ticker
-        data = data.join(series)
-
-    # Drop dates where any required data is missing for calculation
-    data.dropna(inplace=True)
-
-    if data.empty:
-        st.warning(f"No common data points found for {base_curr}/{quote_curr} in the specified date range after merging and cleaning.")
-        return None
-
-    # --- Calculate the target exchange rate ---
-    final_rates = pd.Series(index=data.index, dtype=float)
-
-    base_rate_vs_usd = None
-    if base_curr == 'USD':
-        base_rate_vs_usd = pd.Series(1.0, index=data.index) # USD/USD is 1
-    else:
-        base_ticker = base_info['ticker']
-        if base_ticker in data.columns:
-            if base_info['is_base_vs_usd']: # e.g., EUR/USD
-                base_rate_vs_usd = data[base_ticker]
-            else: # e.g., USD/JPY -> JPY=X. We need JPY/USD = 1 / (JPY=X)
-                base_rate_vs_usd = 1 / data[base_ticker]
-        else:
-            st.warning(f"Missing data for base currency '{base_curr}' ticker '{base_ticker}'.")
-            return None
-
-
-    quote_rate_vs_usd = None
-    if quote_curr == 'USD':
-        quote_rate_vs_usd = pd.Series(1.0, index=data.index) # USD/USD is 1
-    else:
-        quote_ticker = quote_info['ticker']
-        if quote_ticker in data.columns:
-            if quote_info['is_base_vs_usd']: # e.g., GBP/USD
-                quote_rate_vs_usd = data[quote_ticker]
-            else: # e.g., USD/INR -> INR=X. We need INR/USD = 1 / (INR=X)
-                quote_rate_vs_usd = 1 / data[quote_ticker]
-        else:
-            st.warning(f"Missing data for quote currency '{quote_curr}' ticker '{quote_ticker}'.")
-            return None
-
-    # Calculate Base/Quote = (Base/USD) / (Quote/USD)
-    if base_rate_vs_usd is not None and quote_rate_vs_usd is not None:
-        # Ensure indices align before division
-        aligned_rates = pd.concat([base_rate_vs_usd.rename('base_vs_usd'),
-                                   quote_rate_vs_usd.rename('quote_vs_usd')], axis=1).dropna()
-        if not aligned_rates.empty:
-            final_rates = aligned_rates['base_vs_usd'] / aligned_rates['quote_vs_usd']
-        else:
-            st.warning("No aligned data points after fetching and preparing rates for calculation.")
-            return None
-    else:
-        st.warning("Could not obtain necessary rates for calculation.")
+    fx_cube = load_fx_cube()
+    if fx_cube is None:
+        st.warning("Could not fetch currency data. Please try again later.")
         return None
 
+    final_rates = get_cross_rate(fx_cube, base_curr, quote_curr, start, end)
     if final_rates.empty:
-        st.warning(f"No valid calculated exchange rates for {base_curr}/{quote_curr}.")
+        st.warning(f"No valid calculated exchange rates for {base_curr}/{quote_curr} in the specified date range.")
         return None
-
-    return pd.DataFrame(final_rates.rename('Close')) # Return as DataFrame with 'Close' column
+    return final_rates
 
 
 # --- Main Execution ---
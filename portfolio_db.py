@@ -0,0 +1,106 @@
+# portfolio_db.py
+import sqlite3
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+# --- Portfolio ledger in users.db ---
+# Every buy is recorded in 'portfolio_transactions'. 'portfolio_holdings'
+# keeps the running position per (user_id, ticker) so the tracker can read
+# a user's holdings with a single indexed query.
+DB_PATH = 'users.db'
+
+
+def init_portfolio_tables(conn):
+    """Creates the ledger tables and their indexes if they don't exist yet."""
+    conn.executescript('''
+    CREATE TABLE IF NOT EXISTS portfolio_transactions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        ticker TEXT NOT NULL,
+        shares REAL NOT NULL,
+        price REAL NOT NULL,
+        trade_date TEXT NOT NULL,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE INDEX IF NOT EXISTS idx_portfolio_txn_user_ticker
+        ON portfolio_transactions (user_id, ticker);
+    CREATE INDEX IF NOT EXISTS idx_portfolio_txn_user_date
+        ON portfolio_transactions (user_id, trade_date);
+
+    CREATE TABLE IF NOT EXISTS portfolio_holdings (
+        user_id INTEGER NOT NULL,
+        ticker TEXT NOT NULL,
+        shares REAL NOT NULL,
+        cost_basis REAL NOT NULL,
+        PRIMARY KEY (user_id, ticker)
+    );
+    ''')
+
+
+def connect(db_path=DB_PATH):
+    conn = sqlite3.connect(db_path, timeout=30)
+    init_portfolio_tables(conn)
+    return conn
+
+
+def add_transaction(conn, user_id, ticker, shares, price, trade_date=None):
+    """Records a purchase and folds it into the user's holding in one transaction."""
+    trade_date = (trade_date or date.today()).isoformat()
+    with conn:
+        conn.execute(
+            "INSERT INTO portfolio_transactions (user_id, ticker, shares, price, trade_date) VALUES (?, ?, ?, ?, ?)",
+            (user_id, ticker, shares, price, trade_date),
+        )
+        conn.execute('''
+        INSERT INTO portfolio_holdings (user_id, ticker, shares, cost_basis) VALUES (?, ?, ?, ?)
+        ON CONFLICT (user_id, ticker) DO UPDATE SET
+            shares = shares + excluded.shares,
+            cost_basis = cost_basis + excluded.cost_basis
+        ''', (user_id, ticker, shares, shares * price))
+
+
+def remove_holding(conn, user_id, ticker):
+    """Deletes a holding together with its transactions."""
+    with conn:
+        conn.execute("DELETE FROM portfolio_holdings WHERE user_id = ? AND ticker = ?", (user_id, ticker))
+        conn.execute("DELETE FROM portfolio_transactions WHERE user_id = ? AND ticker = ?", (user_id, ticker))
+
+
+def load_holdings(conn, user_id):
+    """Returns the user's holdings as a DataFrame (ticker, shares, cost_basis)."""
+    return pd.read_sql_query(
+        "SELECT ticker, shares, cost_basis FROM portfolio_holdings WHERE user_id = ? ORDER BY ticker",
+        conn, params=(user_id,),
+    )
+
+
+def load_transactions(conn, user_id):
+    """Returns the user's full ledger ordered by trade date."""
+    df = pd.read_sql_query(
+        "SELECT ticker, shares, price, trade_date FROM portfolio_transactions WHERE user_id = ? ORDER BY trade_date, id",
+        conn, params=(user_id,),
+    )
+    df['trade_date'] = pd.to_datetime(df['trade_date'])
+    return df
+
+
+def value_holdings(holdings, prices):
+    """
+    Values all holdings in one vectorized pass.
+    prices maps ticker -> last price; missing prices leave the row's value NaN.
+    """
+    valued = holdings.copy()
+    last_price = valued['ticker'].map(pd.Series(prices, dtype=float)).astype(float)
+    shares = valued['shares'].to_numpy(dtype=float)
+    cost_basis = valued['cost_basis'].to_numpy(dtype=float)
+
+    valued['avg_cost'] = np.divide(cost_basis, shares, out=np.full_like(cost_basis, np.nan), where=shares != 0)
+    valued['last_price'] = last_price
+    valued['current_value'] = shares * last_price.to_numpy()
+    valued['gain_loss'] = valued['current_value'] - cost_basis
+    gain_loss = valued['gain_loss'].to_numpy()
+    valued['percent_gain_loss'] = np.divide(gain_loss, cost_basis, out=np.zeros_like(gain_loss), where=cost_basis > 0) * 100
+    valued.loc[last_price.isna(), 'percent_gain_loss'] = np.nan
+    return valued
@@ -0,0 +1,179 @@
+# portfolio_performance.py
+import numpy as np
+import pandas as pd
+
+from price_store import get_history
+
+# --- Historical portfolio performance ---
+# The ledger is turned into a (date x ticker) matrix of share changes, whose
+# cumulative sum gives daily positions. Daily value, time-weighted return,
+# drawdown, rolling volatility and benchmark-relative return then follow
+# from whole-array operations on that matrix and the price panel.
+BENCHMARK_TICKER = "^NSEI"
+TRADING_DAYS = 252
+VOL_WINDOW = 21
+
+
+def load_price_panel(tickers, start, end=None):
+    """Daily closes (date x ticker) for all tickers, served from the local price store (through today by default)."""
+    closes = {ticker: get_history(ticker, start, end)["Close"] for ticker in tickers}
+    panel = pd.DataFrame(closes).sort_index()
+    panel.index.name = "Date"
+    return panel
+
+
+def ledger_signature(ledger):
+    """Fingerprint of the ledger, used to tell whether cached results still apply."""
+    return int(pd.util.hash_pandas_object(ledger, index=False).sum()) if not ledger.empty else 0
+
+
+def _trade_matrices(ledger, dates, tickers):
+    """Share changes and cash flows per (date, ticker); trades land on the next trading day."""
+    rows = dates.searchsorted(ledger["trade_date"].to_numpy())
+    cols = pd.Index(tickers).get_indexer(ledger["ticker"])
+    valid = (rows < len(dates)) & (cols >= 0)
+
+    share_changes = np.zeros((len(dates), len(tickers)))
+    np.add.at(share_changes, (rows[valid], cols[valid]), ledger["shares"].to_numpy()[valid])
+    cash_flows = np.zeros(len(dates))
+    np.add.at(cash_flows, rows[valid], (ledger["shares"] * ledger["price"]).to_numpy()[valid])
+    return share_changes, cash_flows
+
+
+def compute_performance(ledger, prices, benchmark=None, vol_window=VOL_WINDOW):
+    """
+    Computes the full performance history.
+    Returns (perf, state): perf is a DataFrame indexed by date and state holds
+    what append_day needs to extend it by one day without recomputing.
+    """
+    prices = prices.ffill()
+    dates, tickers = prices.index, list(prices.columns)
+    share_changes, cash_flows = _trade_matrices(ledger, dates, tickers)
+
+    positions = np.cumsum(share_changes, axis=0)
+    price_values = prices.to_numpy(dtype=float)
+    value = np.nansum(positions * price_values, axis=1)
+
+    # Daily return net of that day's external cash flow (flows at end of day)
+    prev_value = np.concatenate(([0.0], value[:-1]))
+    daily_return = np.divide(value - cash_flows, prev_value, out=np.ones_like(value), where=prev_value > 0) - 1
+
+    twr_index = np.cumprod(1 + daily_return)
+    peak = np.maximum.accumulate(twr_index)
+
+    perf = pd.DataFrame({
+        "value": value,
+        "cash_flow": cash_flows,
+        "daily_return": daily_return,
+        "twr_index": twr_index,
+        "drawdown": twr_index / peak - 1,
+    }, index=dates)
+    perf["rolling_vol"] = perf["daily_return"].rolling(vol_window).std() * np.sqrt(TRADING_DAYS)
+
+    benchmark_base = None
+    if benchmark is not None:
+        bench = benchmark.reindex(dates).ffill()
+        benchmark_base = bench.dropna().iloc[0] if bench.notna().any() else None
+        if benchmark_base is not None:
+            perf["benchmark_index"] = bench / benchmark_base
+            perf["relative_return"] = perf["twr_index"] / perf["benchmark_index"] - 1
+
+    state = {
+        "tickers": tickers,
+        "positions": positions[-1] if len(dates) else np.zeros(len(tickers)),
+        "last_prices": price_values[-1] if len(dates) else np.full(len(tickers), np.nan),
+        "peak": peak[-1] if len(dates) else 1.0,
+        "benchmark_base": benchmark_base,
+        "vol_window": vol_window,
+        # State before the last row, so that row can be recomputed when its price moves
+        "previous": {"positions": positions[-2], "last_prices": price_values[-2], "peak": peak[-2]}
+                    if len(dates) >= 2 else None,
+    }
+    return perf, state
+
+
+def append_day(perf, state, day, prices_row, trades=None, benchmark_close=None):
+    """
+    Extends perf by one trading day in O(1) (O(window) for the rolling volatility).
+    prices_row maps ticker -> close; trades is a ledger slice for that day.
+    """
+    tickers = state["tickers"]
+    last_prices = pd.Series(prices_row, dtype=float).reindex(tickers).to_numpy()
+    last_prices = np.where(np.isnan(last_prices), state["last_prices"], last_prices)
+
+    positions = state["positions"].copy()
+    cash_flow = 0.0
+    if trades is not None and not trades.empty:
+        cols = pd.Index(tickers).get_indexer(trades["ticker"])
+        valid = cols >= 0
+        np.add.at(positions, cols[valid], trades["shares"].to_numpy()[valid])
+        cash_flow = float((trades["shares"] * trades["price"]).to_numpy()[valid].sum())
+
+    value = float(np.nansum(positions * last_prices))
+    prev_value = perf["value"].iloc[-1] if len(perf) else 0.0
+    daily_return = (value - cash_flow) / prev_value - 1 if prev_value > 0 else 0.0
+    twr_index = (perf["twr_index"].iloc[-1] if len(perf) else 1.0) * (1 + daily_return)
+    peak = max(state["peak"], twr_index)
+
+    window = state["vol_window"]
+    recent = np.append(perf["daily_return"].to_numpy()[-(window - 1):], daily_return)
+    row = {
+        "value": value,
+        "cash_flow": cash_flow,
+        "daily_return": daily_return,
+        "twr_index": twr_index,
+        "drawdown": twr_index / peak - 1,
+        "rolling_vol": recent.std(ddof=1) * np.sqrt(TRADING_DAYS) if len(recent) == window else np.nan,
+    }
+    if state["benchmark_base"] is not None and "benchmark_index" in perf.columns:
+        bench_index = benchmark_close / state["benchmark_base"] if benchmark_close is not None else perf["benchmark_index"].iloc[-1]
+        row["benchmark_index"] = bench_index
+        row["relative_return"] = twr_index / bench_index - 1
+
+    perf = pd.concat([perf, pd.DataFrame([row], index=pd.DatetimeIndex([pd.Timestamp(day)], name=perf.index.name))])
+    previous = {"positions": state["positions"], "last_prices": state["last_prices"], "peak": state["peak"]}
+    state = dict(state, positions=positions, last_prices=last_prices, peak=peak, previous=previous)
+    return perf, state
+
+
+def update_performance(cached, ledger, prices, benchmark=None):
+    """
+    Returns an up-to-date {"signature", "perf", "state"} entry. The last
+    cached day (possibly computed from an intraday price) is recomputed and
+    any new trading days are appended one by one; any ledger or ticker
+    change triggers a full recompute.
+    """
+    signature = ledger_signature(ledger)
+    if (cached is None or cached["signature"] != signature
+            or cached["state"]["tickers"] != list(prices.columns) or len(cached["perf"]) < 2
+            or cached["state"].get("previous") is None or cached["perf"].index[-1] not in prices.index):
+        perf, state = compute_performance(ledger, prices, benchmark)
+        return {"signature": signature, "perf": perf, "state": state}
+
+    # Rewind the last row; the loop below recomputes it from the current price
+    perf = cached["perf"].iloc[:-1]
+    state = dict(cached["state"], **cached["state"]["previous"], previous=None)
+    prices = prices.ffill()
+    # Aligned like compute_performance, so holidays and missing bars carry the last close
+    bench = benchmark.reindex(prices.index).ffill() if benchmark is not None else None
+    last_day = perf.index[-1]
+    for day in prices.index[prices.index > last_day]:
+        trades = ledger[(ledger["trade_date"] > last_day) & (ledger["trade_date"] <= day)]
+        benchmark_close = bench.loc[day] if bench is not None else None
+        perf, state = append_day(perf, state, day, prices.loc[day], trades, benchmark_close)
+        last_day = day
+    return {"signature": signature, "perf": perf, "state": state}
+
+
+def summarize_performance(perf):
+    """Headline numbers for the performance table."""
+    if perf.empty:
+        return {}
+    summary = {
+        "Time-Weighted Return (%)": (perf["twr_index"].iloc[-1] - 1) * 100,
+        "Max Drawdown (%)": perf["drawdown"].min() * 100,
+        "Volatility, 21d annualised (%)": perf["rolling_vol"].iloc[-1] * 100,
+    }
+    if "relative_return" in perf.columns:
+        summary["Return vs Nifty 50 (%)"] = perf["relative_return"].iloc[-1] * 100
+    return summary
@@ -0,0 +1,173 @@
+# price_store.py
+import os
+import sqlite3
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+import yfinance as yf
+
+# --- Local OHLCV store ---
+# Daily bars are kept in a SQLite file with one table per symbol. A small
+# 'coverage' table records the [start, end) window that has already been
+# downloaded for each symbol, so a request only goes to yfinance for the
+# dates missing at either edge of that window.
+PRICE_DB_PATH = os.path.join("data", "prices.db")
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+# Days re-downloaded before the end of the stored window when extending it.
+# If the overlap no longer matches (dividend/split adjustment), the symbol
+# is downloaded again in full so the stored series stays consistent.
+OVERLAP_DAYS = 7
+ADJUSTMENT_TOLERANCE = 1e-4
+
+
+def _connect(db_path=PRICE_DB_PATH):
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS coverage (
+        symbol TEXT PRIMARY KEY,
+        start TEXT NOT NULL,
+        end TEXT NOT NULL
+    )
+    ''')
+    return conn
+
+
+def _table_name(symbol):
+    """Quoted table name for a symbol (symbols contain '^', '.', '=')."""
+    return '"ohlcv_' + symbol.upper().replace('"', '""') + '"'
+
+
+def _ensure_table(conn, symbol):
+    conn.execute(f'''
+    CREATE TABLE IF NOT EXISTS {_table_name(symbol)} (
+        date TEXT PRIMARY KEY,
+        open REAL, high REAL, low REAL, close REAL, volume REAL
+    )
+    ''')
+
+
+def _to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return pd.Timestamp(value).date()
+
+
+def _download(symbol, start, end):
+    """Downloads daily bars for [start, end) and normalises the columns."""
+    data = yf.download(symbol, start=start, end=end, progress=False)
+    if data is None or data.empty:
+        return pd.DataFrame(columns=OHLCV_COLUMNS, index=pd.DatetimeIndex([]))
+    if isinstance(data.columns, pd.MultiIndex):
+        data.columns = data.columns.droplevel(1)
+    data = data[[c for c in OHLCV_COLUMNS if c in data.columns]].dropna(subset=["Close"])
+    data.index = pd.to_datetime(data.index).tz_localize(None).normalize()
+    return data
+
+
+def _write_bars(conn, symbol, bars):
+    if bars.empty:
+        return
+    values = bars.reindex(columns=OHLCV_COLUMNS).astype(float)
+    values = values.astype(object).where(values.notna(), None)
+    rows = zip(bars.index.strftime("%Y-%m-%d"), *(values[c] for c in OHLCV_COLUMNS))
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {_table_name(symbol)} VALUES (?, ?, ?, ?, ?, ?)", rows
+    )
+
+
+def _read_bars(conn, symbol, start, end):
+    df = pd.read_sql_query(
+        f"SELECT date, open, high, low, close, volume FROM {_table_name(symbol)} "
+        "WHERE date >= ? AND date < ? ORDER BY date",
+        conn, params=(start.isoformat(), end.isoformat()),
+    )
+    df.columns = ["Date"] + OHLCV_COLUMNS
+    df["Date"] = pd.to_datetime(df["Date"])
+    return df.set_index("Date")
+
+
+def _overlap_changed(conn, symbol, fresh, cov_start, cov_end):
+    """
+    True if freshly downloaded closes disagree with the stored ones on the
+    dates already covered, [cov_start, cov_end). Bars from cov_end on (e.g.
+    today's, which is still moving) are not part of the comparison.
+    """
+    fresh = fresh[(fresh.index >= pd.Timestamp(cov_start)) & (fresh.index < pd.Timestamp(cov_end))]
+    if fresh.empty:
+        return False
+    stored = _read_bars(conn, symbol, fresh.index[0].date(), fresh.index[-1].date() + timedelta(days=1))
+    common = stored.index.intersection(fresh.index)
+    if common.empty:
+        return False
+    old = stored.loc[common, "Close"].to_numpy(dtype=float)
+    new = fresh.loc[common, "Close"].to_numpy(dtype=float)
+    return bool((abs(new - old) > ADJUSTMENT_TOLERANCE * abs(old)).any())
+
+
+def get_history(symbol, start, end=None, db_path=PRICE_DB_PATH):
+    """
+    Returns daily OHLCV bars for symbol in [start, end), indexed by Date;
+    end=None runs through the latest (possibly still moving) bar.
+    Only the dates outside the already stored window are downloaded.
+    """
+    start = _to_date(start)
+    end = _to_date(end) if end is not None else date.today() + timedelta(days=1)
+    symbol = symbol.upper()
+    # Today's bar is still moving, so it is never counted as covered.
+    covered_until = min(end, date.today())
+
+    conn = _connect(db_path)
+    try:
+        _ensure_table(conn, symbol)
+        row = conn.execute("SELECT start, end FROM coverage WHERE symbol = ?", (symbol,)).fetchone()
+
+        # yfinance returns an empty frame instead of raising on network errors,
+        # so a window only counts as covered once its download returned bars
+        if row is None:
+            bars = _download(symbol, start, end)
+            _write_bars(conn, symbol, bars)
+            new_start, new_end = (start, covered_until) if not bars.empty else (None, None)
+        else:
+            cov_start, cov_end = date.fromisoformat(row[0]), date.fromisoformat(row[1])
+            new_start, new_end = cov_start, cov_end
+
+            # Each missing edge is downloaded with a few already stored days,
+            # which must still match for the stored window to be kept.
+            tail = _download(symbol, cov_end - timedelta(days=OVERLAP_DAYS), end) if end > cov_end else None
+            head = _download(symbol, start, cov_start + timedelta(days=OVERLAP_DAYS)) if start < cov_start else None
+            adjusted = any(
+                edge is not None and _overlap_changed(conn, symbol, edge, cov_start, cov_end)
+                for edge in (tail, head)
+            )
+            if adjusted:
+                # History was re-adjusted upstream: replace the whole window,
+                # unless the download failed, in which case the old one is kept.
+                bars = _download(symbol, min(start, cov_start), max(end, cov_end))
+                if not bars.empty:
+                    conn.execute(f"DELETE FROM {_table_name(symbol)}")
+                    _write_bars(conn, symbol, bars)
+                    new_start, new_end = min(start, cov_start), max(covered_until, cov_end)
+            else:
+                # Bars on or after cov_end (today's included) are simply overwritten
+                for edge in (tail, head):
+                    if edge is not None:
+                        _write_bars(conn, symbol, edge)
+                if tail is not None and not tail.empty:
+                    new_end = max(covered_until, cov_end)
+                if head is not None and not head.empty:
+                    new_start = start
+
+        if new_start is not None and new_start < new_end:
+            conn.execute(
+                "INSERT OR REPLACE INTO coverage (symbol, start, end) VALUES (?, ?, ?)",
+                (symbol, new_start.isoformat(), new_end.isoformat()),
+            )
+        conn.commit()
+        return _read_bars(conn, symbol, start, end)
+    finally:
+        conn.close()
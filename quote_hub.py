@@ -0,0 +1,141 @@
+# quote_hub.py
+import threading
+import time
+import uuid
+from datetime import datetime, time as dt_time
+from zoneinfo import ZoneInfo
+
+import streamlit as st
+
+from quote_service import fetch_batch_quotes
+
+# --- Process-wide quote hub ---
+# One hub per server process keeps the union of the tickers every active
+# session has asked for and refreshes them in batches on a background
+# thread. Pages read the latest snapshot, which never touches the network.
+BATCH_SIZE = 50
+OPEN_MARKET_INTERVAL = 60  # seconds between refreshes while a market is open
+CLOSED_MARKET_INTERVAL = 30 * 60  # seconds between refreshes otherwise
+SESSION_TTL = 10 * 60  # sessions that stop polling are dropped after this
+
+# Regular trading sessions, Monday to Friday
+MARKET_HOURS = {
+    "NSE": (ZoneInfo("Asia/Kolkata"), dt_time(9, 15), dt_time(15, 30)),
+    "NYSE": (ZoneInfo("America/New_York"), dt_time(9, 30), dt_time(16, 0)),
+}
+INDIAN_INDICES = {"^NSEI", "^BSESN", "^NSEBANK"}
+
+
+def exchange_for(ticker):
+    if ticker.endswith((".NS", ".BO")) or ticker in INDIAN_INDICES:
+        return "NSE"
+    return "NYSE"
+
+
+def is_market_open(exchange, now=None):
+    tz, open_time, close_time = MARKET_HOURS[exchange]
+    local = (now or datetime.now(tz=ZoneInfo("UTC"))).astimezone(tz)
+    return local.weekday() < 5 and open_time <= local.time() <= close_time
+
+
+class QuoteHub:
+    """Shared, background-refreshed quote snapshot for all sessions."""
+
+    def __init__(self, batch_size=BATCH_SIZE, open_interval=OPEN_MARKET_INTERVAL,
+                 closed_interval=CLOSED_MARKET_INTERVAL, session_ttl=SESSION_TTL):
+        self.batch_size = batch_size
+        self.open_interval = open_interval
+        self.closed_interval = closed_interval
+        self.session_ttl = session_ttl
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._sessions = {}  # session_id -> (set of tickers, last seen)
+        self._quotes = {}  # ticker -> quote dict
+        self._fetched_at = {}  # ticker -> monotonic time of last refresh
+        self._thread = None
+
+    def subscribe(self, session_id, tickers):
+        """Registers (or replaces) the tickers a session is watching."""
+        tickers = {t.upper() for t in tickers}
+        with self._lock:
+            previous = self._sessions.get(session_id, (set(), 0))[0]
+            self._sessions[session_id] = (tickers, time.monotonic())
+            has_new = bool(tickers - previous - set(self._quotes))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="quote-hub", daemon=True)
+                self._thread.start()
+        if has_new:
+            self._wake.set()
+
+    def snapshot(self, tickers=None):
+        """Latest known quotes, without any network I/O."""
+        with self._lock:
+            if tickers is None:
+                return dict(self._quotes)
+            return {t: self._quotes[t] for t in (t.upper() for t in tickers) if t in self._quotes}
+
+    def refresh_now(self):
+        """Asks the background thread to refresh every active ticker immediately."""
+        with self._lock:
+            self._fetched_at.clear()
+        self._wake.set()
+
+    def _active_tickers(self):
+        now = time.monotonic()
+        with self._lock:
+            self._sessions = {
+                sid: (tickers, seen) for sid, (tickers, seen) in self._sessions.items()
+                if now - seen < self.session_ttl
+            }
+            return set().union(*(tickers for tickers, _ in self._sessions.values()))
+
+    def _due_tickers(self, tickers):
+        now = time.monotonic()
+        open_exchanges = {ex for ex in MARKET_HOURS if is_market_open(ex)}
+        due = []
+        for ticker in sorted(tickers):
+            interval = self.open_interval if exchange_for(ticker) in open_exchanges else self.closed_interval
+            if now - self._fetched_at.get(ticker, float("-inf")) >= interval:
+                due.append(ticker)
+        return due
+
+    def _run(self):
+        while True:
+            tickers = self._active_tickers()
+            due = self._due_tickers(tickers)
+            for i in range(0, len(due), self.batch_size):
+                batch = due[i:i + self.batch_size]
+                quotes = fetch_batch_quotes(batch)
+                fetched_at = time.monotonic()
+                with self._lock:
+                    self._quotes.update(quotes)
+                    # Failed tickers are retried on the next cycle, not immediately
+                    self._fetched_at.update({t: fetched_at for t in batch})
+            # Re-check on the short interval; closed-market tickers are simply not due yet
+            self._wake.wait(timeout=self.open_interval)
+            self._wake.clear()
+
+
+@st.cache_resource
+def get_quote_hub():
+    """The single QuoteHub shared by every session in this process."""
+    return QuoteHub()
+
+
+def get_session_id():
+    """Stable id for the current browser session, used to track its tickers."""
+    if "quote_hub_session_id" not in st.session_state:
+        st.session_state["quote_hub_session_id"] = uuid.uuid4().hex
+    return st.session_state["quote_hub_session_id"]
+
+
+def watch(page, tickers):
+    """
+    Subscribes this session's tickers for one page and returns the current
+    snapshot for them. Each page keeps its own subscription so that visiting
+    one page does not drop another page's tickers.
+    """
+    hub = get_quote_hub()
+    hub.subscribe(f"{get_session_id()}:{page}", tickers)
+    return hub.snapshot(tickers)
@@ -0,0 +1,108 @@
+# quote_service.py
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import pandas as pd
+import yfinance as yf
+
+# --- Quote service ---
+# All tickers are first requested in a single batched yf.download call.
+# Tickers the batch misses are retried individually on a bounded thread pool,
+# each with its own timeout, and quotes are yielded as soon as they arrive.
+MAX_WORKERS = 8
+PER_TICKER_TIMEOUT = 10  # seconds
+
+
+def _make_quote(price, prev_close):
+    price = float(price)
+    prev_close = float(prev_close) if prev_close and not pd.isna(prev_close) else price
+    change = price - prev_close
+    change_percent = (change / prev_close) * 100 if prev_close else 0.0
+    return {
+        "price": price,
+        "previous_close": prev_close,
+        "change": change,
+        "change_percent": change_percent,
+    }
+
+
+def fetch_batch_quotes(tickers):
+    """
+    Fetches the last two daily closes for all tickers in one request.
+    Returns {ticker: quote} for the tickers that came back with data.
+    """
+    if not tickers:
+        return {}
+    try:
+        data = yf.download(list(tickers), period="5d", interval="1d", progress=False, group_by="column")
+    except Exception:
+        return {}
+    if data is None or data.empty or "Close" not in data.columns.get_level_values(0):
+        return {}
+
+    closes = data["Close"]
+    if isinstance(closes, pd.Series):
+        closes = closes.to_frame(name=tickers[0])
+
+    quotes = {}
+    for ticker in tickers:
+        if ticker not in closes.columns:
+            continue
+        series = closes[ticker].dropna()
+        if series.empty:
+            continue
+        prev_close = series.iloc[-2] if len(series) > 1 else None
+        quotes[ticker] = _make_quote(series.iloc[-1], prev_close)
+    return quotes
+
+
+def fetch_single_quote(ticker):
+    """Fetches one quote through the lightweight fast_info endpoint."""
+    info = yf.Ticker(ticker).fast_info
+    price = info["last_price"]
+    if price is None or pd.isna(price):
+        return None
+    return _make_quote(price, info["previous_close"])
+
+
+def iter_quotes(tickers, timeout=PER_TICKER_TIMEOUT, max_workers=MAX_WORKERS):
+    """
+    Yields (ticker, quote) pairs as they become available.
+    quote is None when the ticker failed or timed out.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    batch = fetch_batch_quotes(tickers)
+    for ticker in tickers:
+        if ticker in batch:
+            yield ticker, batch[ticker]
+
+    missing = [t for t in tickers if t not in batch]
+    if not missing:
+        return
+
+    workers = min(max_workers, len(missing))
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        deadlines = {}
+        pending = {}
+        started = time.monotonic()
+        for i, ticker in enumerate(missing):
+            future = executor.submit(fetch_single_quote, ticker)
+            pending[future] = ticker
+            # Queued tickers get their timeout counted from when a worker could start them
+            deadlines[future] = started + timeout * (1 + i // workers)
+
+        while pending:
+            next_deadline = min(deadlines[f] for f in pending)
+            done, _ = wait(pending, timeout=max(0.0, next_deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            for future in done:
+                ticker = pending.pop(future)
+                try:
+                    yield ticker, future.result()
+                except Exception:
+                    yield ticker, None
+            now = time.monotonic()
+            for future in [f for f in pending if deadlines[f] <= now]:
+                yield pending.pop(future), None
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
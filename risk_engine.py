@@ -0,0 +1,138 @@
+# risk_engine.py
+import os
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+# --- Portfolio risk engine ---
+# VaR/CVaR are reported as positive loss fractions of portfolio value over
+# the horizon. Historical and parametric (normal) estimates come straight
+# from the daily return matrix; the Monte Carlo estimate draws correlated
+# normal returns through the Cholesky factor of the return covariance.
+DEFAULT_PATHS = 100_000
+CHUNK_PATHS = 25_000  # paths simulated per matrix product, bounds peak memory
+CONFIDENCE_LEVELS = (0.95, 0.99)
+
+
+def daily_returns(prices):
+    """Simple daily returns for each column, dropping days with any gap."""
+    return prices.ffill().pct_change().iloc[1:].dropna()
+
+
+def panel_version(prices):
+    """Cheap fingerprint of a price panel; changes whenever a new bar arrives."""
+    if prices.empty:
+        return "empty"
+    tail = pd.util.hash_pandas_object(prices.tail(1), index=True).sum()
+    return f"{prices.shape}:{prices.index[0]}:{prices.index[-1]}:{tail}"
+
+
+def _var_cvar(pnl, confidence):
+    """VaR and CVaR (as positive losses) of a sample of portfolio returns."""
+    cutoff = np.quantile(pnl, 1 - confidence)
+    tail = pnl[pnl <= cutoff]
+    return -cutoff, -(tail.mean() if tail.size else cutoff)
+
+
+def historical_var(portfolio_returns, confidence=0.95):
+    return _var_cvar(np.asarray(portfolio_returns, dtype=float), confidence)
+
+
+def parametric_var(portfolio_returns, confidence=0.95):
+    """Normal VaR/CVaR from the mean and standard deviation of returns."""
+    r = np.asarray(portfolio_returns, dtype=float)
+    mu, sigma = r.mean(), r.std(ddof=1)
+    dist = NormalDist()
+    z = dist.inv_cdf(1 - confidence)
+    var = -(mu + z * sigma)
+    cvar = -(mu - sigma * dist.pdf(z) / (1 - confidence))
+    return var, cvar
+
+
+def _cholesky(cov):
+    """Cholesky factor, nudging the diagonal if the covariance is not positive definite."""
+    jitter = 0.0
+    scale = np.mean(np.diag(cov)) or 1.0
+    for _ in range(6):
+        try:
+            return np.linalg.cholesky(cov + jitter * np.eye(len(cov)))
+        except np.linalg.LinAlgError:
+            jitter = scale * 1e-10 if jitter == 0 else jitter * 100
+    # Fall back to the symmetric square root of the clipped spectrum
+    eigvals, eigvecs = np.linalg.eigh(cov)
+    return eigvecs * np.sqrt(np.clip(eigvals, 0, None))
+
+
+def _simulate_shard(args):
+    """Simulates n_paths portfolio returns; top-level so it can run in a worker process."""
+    mu, chol, weights, n_paths, seed = args
+    rng = np.random.default_rng(seed)
+    out = np.empty(n_paths)
+    # Project the factor onto the weights once: each path is then one dot product
+    weighted_chol = chol.T @ weights
+    drift = mu @ weights
+    for start in range(0, n_paths, CHUNK_PATHS):
+        stop = min(start + CHUNK_PATHS, n_paths)
+        z = rng.standard_normal((stop - start, len(weights)))
+        out[start:stop] = drift + z @ weighted_chol
+    return out
+
+
+def monte_carlo_returns(returns, weights, n_paths=DEFAULT_PATHS, horizon_days=1, seed=None, processes=None):
+    """
+    Simulated portfolio returns over horizon_days from correlated normal draws.
+    With processes > 1 the paths are split into shards run on a process pool.
+    """
+    weights = np.asarray(weights, dtype=float)
+    mu = returns.mean().to_numpy() * horizon_days
+    chol = _cholesky(returns.cov().to_numpy() * horizon_days)
+
+    seeds = np.random.SeedSequence(seed)
+    if not processes or processes <= 1:
+        return _simulate_shard((mu, chol, weights, n_paths, seeds))
+
+    shard_sizes = [len(part) for part in np.array_split(np.arange(n_paths), processes)]
+    shards = [(mu, chol, weights, size, child) for size, child in zip(shard_sizes, seeds.spawn(processes))]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return np.concatenate(list(pool.map(_simulate_shard, shards)))
+
+
+def risk_report(prices, weights, n_paths=DEFAULT_PATHS, horizon_days=1, seed=None, processes=None,
+                confidence_levels=CONFIDENCE_LEVELS):
+    """
+    Historical, parametric and Monte Carlo VaR/CVaR for a portfolio.
+    weights are portfolio weights aligned with the columns of prices.
+    Returns a DataFrame with one row per (method, confidence).
+    """
+    returns = daily_returns(prices)
+    weights = np.asarray(weights, dtype=float)
+    if returns.empty or weights.sum() == 0:
+        return pd.DataFrame(columns=["Method", "Confidence", "VaR", "CVaR"])
+    weights = weights / weights.sum()
+
+    portfolio_returns = returns.to_numpy() @ weights
+    if horizon_days > 1:
+        # Overlapping multi-day returns for the historical estimate
+        portfolio_returns = (
+            pd.Series(np.log1p(portfolio_returns)).rolling(horizon_days).sum().dropna().pipe(np.expm1).to_numpy()
+        )
+    simulated = monte_carlo_returns(returns, weights, n_paths, horizon_days, seed, processes)
+
+    rows = []
+    for confidence in confidence_levels:
+        for method, (var, cvar) in (
+            ("Historical", historical_var(portfolio_returns, confidence)),
+            ("Parametric", parametric_var(portfolio_returns, confidence)),
+            ("Monte Carlo", _var_cvar(simulated, confidence)),
+        ):
+            rows.append({"Method": method, "Confidence": confidence, "VaR": var, "CVaR": cvar})
+    return pd.DataFrame(rows)
+
+
+def default_processes(n_assets, n_paths):
+    """Uses a process pool only when the simulation is large enough to pay for it."""
+    if n_assets * n_paths < 50 * 1_000_000:
+        return None
+    return min(os.cpu_count() or 1, 8)
@@ -0,0 +1,120 @@
+# search_index.py
+import re
+from bisect import bisect_left
+
+import numpy as np
+
+# --- In-memory text index ---
+# Names are split into lowercase alphanumeric tokens. Each token has a
+# posting array of document ids (exact and prefix matches), and every token
+# of the vocabulary is indexed by its character trigrams so misspelled query
+# tokens can still be matched (fuzzy matches). Scores are accumulated in a
+# NumPy array over all documents, so a query costs a handful of array ops.
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+EXACT_WEIGHT = 1.0
+PREFIX_WEIGHT = 0.8
+FUZZY_WEIGHT = 0.6
+MIN_FUZZY_SIMILARITY = 0.4
+MAX_PREFIX_EXPANSIONS = 200
+MAX_FUZZY_EXPANSIONS = 20
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(str(text).lower())
+
+
+def trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TextIndex:
+    """Token inverted index plus trigram fuzzy matching over a list of names."""
+
+    def __init__(self, names):
+        self.size = len(names)
+        postings = {}
+        lengths = np.empty(self.size, dtype=np.int32)
+        for doc_id, name in enumerate(names):
+            tokens = tokenize(name)
+            lengths[doc_id] = len(tokens)
+            for token in set(tokens):
+                postings.setdefault(token, []).append(doc_id)
+
+        self.vocab = sorted(postings)
+        self.token_ids = {token: i for i, token in enumerate(self.vocab)}
+        self.postings = [np.asarray(postings[token], dtype=np.int32) for token in self.vocab]
+        # Rare tokens count more than tokens shared by thousands of names
+        doc_freq = np.array([len(p) for p in self.postings], dtype=np.float32)
+        self.idf = np.log1p(self.size / np.maximum(doc_freq, 1)).astype(np.float32)
+        # Shorter names win ties, e.g. the plain scheme over its long variants
+        self.length_penalty = (lengths * 1e-3).astype(np.float32)
+
+        grams = {}
+        for token_id, token in enumerate(self.vocab):
+            for gram in trigrams(token):
+                grams.setdefault(gram, []).append(token_id)
+        self.trigram_postings = {gram: np.asarray(ids, dtype=np.int32) for gram, ids in grams.items()}
+        self.trigram_counts = np.array([len(trigrams(token)) for token in self.vocab], dtype=np.int32)
+
+    def _prefix_matches(self, token):
+        lo = bisect_left(self.vocab, token)
+        hi = bisect_left(self.vocab, token + "\uffff")
+        return range(lo, min(hi, lo + MAX_PREFIX_EXPANSIONS))
+
+    def _fuzzy_matches(self, token):
+        query_grams = trigrams(token)
+        hits = [self.trigram_postings[g] for g in query_grams if g in self.trigram_postings]
+        if not hits:
+            return []
+        shared = np.bincount(np.concatenate(hits), minlength=len(self.vocab))
+        candidates = np.flatnonzero(shared)
+        similarity = shared[candidates] / (len(query_grams) + self.trigram_counts[candidates] - shared[candidates])
+        keep = similarity >= MIN_FUZZY_SIMILARITY
+        candidates, similarity = candidates[keep], similarity[keep]
+        if len(candidates) > MAX_FUZZY_EXPANSIONS:
+            top = np.argpartition(-similarity, MAX_FUZZY_EXPANSIONS - 1)[:MAX_FUZZY_EXPANSIONS]
+            candidates, similarity = candidates[top], similarity[top]
+        return list(zip(candidates.tolist(), similarity.tolist()))
+
+    def _term_scores(self, token):
+        """Best match weight per document for one query token."""
+        weights = {}
+        exact = self.token_ids.get(token)
+        if exact is not None:
+            weights[exact] = EXACT_WEIGHT
+        for token_id in self._prefix_matches(token):
+            weights.setdefault(token_id, PREFIX_WEIGHT)
+        if exact is None and len(token) >= 3:
+            for token_id, similarity in self._fuzzy_matches(token):
+                weights.setdefault(token_id, FUZZY_WEIGHT * similarity)
+
+        scores = np.zeros(self.size, dtype=np.float32)
+        for token_id, weight in weights.items():
+            docs = self.postings[token_id]
+            scores[docs] = np.maximum(scores[docs], weight * self.idf[token_id])
+        return scores
+
+    def search(self, query, limit=20):
+        """Returns the ids of the best-matching documents, best first."""
+        tokens = tokenize(query)
+        if not tokens or self.size == 0:
+            return []
+
+        scores = np.zeros(self.size, dtype=np.float32)
+        matched_terms = np.zeros(self.size, dtype=np.int32)
+        for token in dict.fromkeys(tokens):
+            term = self._term_scores(token)
+            scores += term
+            matched_terms += term > 0
+
+        candidates = np.flatnonzero(matched_terms)
+        if candidates.size == 0:
+            return []
+        # Documents matching more query tokens always rank first
+        rank = matched_terms[candidates] * 1000.0 + scores[candidates] - self.length_penalty[candidates]
+        if candidates.size > limit:
+            top = np.argpartition(-rank, limit - 1)[:limit]
+            candidates, rank = candidates[top], rank[top]
+        return candidates[np.argsort(-rank, kind="stable")].tolist()
@@ -0,0 +1,191 @@
+# sec_resolver.py
+import json
+import os
+import threading
+import time
+
+import requests
+import streamlit as st
+
+from edgar_client import edgar_client
+from search_index import TextIndex, tokenize
+
+# --- SEC company resolver ---
+# SEC publishes every registrant with a ticker in two JSON files:
+#   company_tickers.json           {"0": {"cik_str", "ticker", "title"}, ...}
+#   company_tickers_exchange.json  {"fields": [...], "data": [[cik, name, ticker, exchange], ...]}
+# Both are cached on disk, merged into one record per CIK and indexed by
+# CIK, ticker and normalized name, with TextIndex fuzzy matching for
+# everything else. A background thread reloads the files once a day.
+SEC_TICKERS_URL = "https://www.sec.gov/files/company_tickers.json"
+SEC_TICKERS_EXCHANGE_URL = "https://www.sec.gov/files/company_tickers_exchange.json"
+TICKERS_PATH = os.path.join("data", "sec_company_tickers.json")
+TICKERS_EXCHANGE_PATH = os.path.join("data", "sec_company_tickers_exchange.json")
+REFRESH_SECONDS = 24 * 60 * 60
+
+# Legal-form words that users routinely add or leave out ("Apple" vs "Apple Inc.")
+NAME_SUFFIXES = {
+    "inc", "incorporated", "corp", "corporation", "co", "company", "ltd", "limited",
+    "plc", "llc", "lp", "l", "p", "sa", "nv", "ag", "se", "the", "de", "com",
+}
+
+
+def normalize_name(name):
+    tokens = tokenize(name)
+    core = [t for t in tokens if t not in NAME_SUFFIXES]
+    return " ".join(core or tokens)
+
+
+def format_cik(cik):
+    """10-digit, zero-padded CIK as used in EDGAR URLs."""
+    return str(int(cik)).zfill(10)
+
+
+def _load_json(url, path, max_age=REFRESH_SECONDS):
+    """
+    Returns the parsed file at path, downloading it first if it is missing or
+    older than max_age. A stale copy is used if the download fails.
+    """
+    fresh = os.path.exists(path) and time.time() - os.path.getmtime(path) < max_age
+    if not fresh:
+        try:
+            response = edgar_client().get(url, timeout=60)
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(response.content)
+            os.replace(tmp_path, path)
+        except (requests.exceptions.RequestException, OSError):
+            pass  # Fall back to whatever copy is on disk
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def parse_records(tickers_json, exchange_json=None):
+    """
+    Merges both SEC files into one record per CIK:
+    {"cik": int, "name": str, "tickers": [str, ...], "exchange": str or None}.
+    SEC lists the primary ticker of each company first.
+    """
+    records = {}
+
+    def add(cik, name, ticker, exchange=None):
+        record = records.setdefault(int(cik), {"cik": int(cik), "name": name, "tickers": [], "exchange": None})
+        if ticker and ticker.upper() not in record["tickers"]:
+            record["tickers"].append(ticker.upper())
+        if exchange and not record["exchange"]:
+            record["exchange"] = exchange
+
+    if exchange_json:
+        fields = exchange_json.get("fields", [])
+        position = {field: fields.index(field) for field in ("cik", "name", "ticker", "exchange") if field in fields}
+        for row in exchange_json.get("data", []):
+            add(row[position["cik"]], row[position["name"]], row[position["ticker"]],
+                row[position["exchange"]] if "exchange" in position else None)
+    for row in (tickers_json or {}).values():
+        add(row["cik_str"], row["title"], row["ticker"])
+    return list(records.values())
+
+
+class CompanyIndex:
+    """Exact and fuzzy lookup of SEC registrants by CIK, ticker or name."""
+
+    def __init__(self, records):
+        self.records = records
+        self.by_cik = {r["cik"]: r for r in records}
+        self.by_ticker = {}
+        self.by_name = {}
+        for r in records:
+            for ticker in r["tickers"]:
+                self.by_ticker.setdefault(ticker, r)
+            self.by_name.setdefault(normalize_name(r["name"]), r)
+        # Tickers are indexed with the name so "google" still finds GOOGL
+        self.text = TextIndex([" ".join([r["name"], *r["tickers"]]) for r in records])
+
+    def __len__(self):
+        return len(self.records)
+
+    def lookup(self, query):
+        """Exact match on CIK, ticker or normalized name, else None."""
+        query = str(query).strip()
+        if query.isdigit():
+            return self.by_cik.get(int(query))
+        return self.by_ticker.get(query.upper().replace(".", "-")) or self.by_name.get(normalize_name(query))
+
+    def search(self, query, limit=10):
+        """Ranked matches: the exact match (if any) first, then fuzzy name matches."""
+        exact = self.lookup(query)
+        results = [exact] if exact else []
+        for i in self.text.search(query, limit):
+            if self.records[i] is not exact:
+                results.append(self.records[i])
+        return results[:limit]
+
+
+class SecResolver:
+    """Holds the current CompanyIndex and rebuilds it in the background every day."""
+
+    def __init__(self, tickers_path=TICKERS_PATH, exchange_path=TICKERS_EXCHANGE_PATH,
+                 refresh_seconds=REFRESH_SECONDS):
+        self.tickers_path = tickers_path
+        self.exchange_path = exchange_path
+        self.refresh_seconds = refresh_seconds
+        self.index = self._build()
+        self._thread = threading.Thread(target=self._run, name="sec-resolver", daemon=True)
+        self._thread.start()
+
+    def _build(self, max_age=None):
+        max_age = self.refresh_seconds if max_age is None else max_age
+        tickers = _load_json(SEC_TICKERS_URL, self.tickers_path, max_age)
+        exchanges = _load_json(SEC_TICKERS_EXCHANGE_URL, self.exchange_path, max_age)
+        return CompanyIndex(parse_records(tickers, exchanges))
+
+    def refresh(self):
+        """Re-downloads both files and swaps in the new index atomically."""
+        index = self._build(max_age=0)
+        if len(index):
+            self.index = index
+
+    def _run(self):
+        while True:
+            time.sleep(self.refresh_seconds)
+            try:
+                self.refresh()
+            except Exception:
+                pass  # Keep serving the previous index; retry tomorrow
+
+    def search(self, query, limit=10):
+        return self.index.search(query, limit)
+
+    def resolve(self, query, fallback=None):
+        """
+        Best match for a CIK, ticker or company name as
+        {"cik": "0000320193", "name": ..., "ticker": ...}, or None.
+        fallback is an optional {UPPERCASE NAME: CIK} map for filers that have
+        no ticker (e.g. private fund managers); it is checked before fuzzy matching.
+        """
+        query = str(query).strip()
+        if not query:
+            return None
+        record = self.index.lookup(query)
+        if record is None and query.isdigit():
+            # Any numeric input is taken as a CIK, even if the filer has no ticker
+            return {"cik": format_cik(query), "name": query, "ticker": None}
+        if record is None and fallback and query.upper() in fallback:
+            return {"cik": format_cik(fallback[query.upper()]), "name": query, "ticker": None}
+        if record is None:
+            matches = self.index.search(query, 1)
+            record = matches[0] if matches else None
+        if record is None:
+            return None
+        return {"cik": format_cik(record["cik"]), "name": record["name"],
+                "ticker": record["tickers"][0] if record["tickers"] else None}
+
+
+@st.cache_resource
+def get_sec_resolver():
+    """The process-wide SEC resolver."""
+    return SecResolver()
@@ -0,0 +1,177 @@
+# statement_builder.py
+import numpy as np
+import pandas as pd
+
+# --- Financial statements from XBRL facts ---
+# Works on the long fact table (concept, unit, start, end, val, fy, fp, form,
+# frame, filed) from companyfacts_parser / facts_store. Every fact is tied
+# to the period it measures (start..end) rather than to the filing it came
+# in, so 10-K and 10-Q values and year-to-date and quarterly durations are
+# never mixed:
+#   - duration facts of ~3 months are quarters, of ~12 months are years;
+#   - 10-Qs often only report year-to-date cash flows, so missing quarters
+#     (including Q4) are the difference of consecutive cumulative values
+#     that share a fiscal-year start;
+#   - instant facts (balance sheet) are read at each period end.
+# When one period is reported several times, the preferred concept wins,
+# then the fact SEC assigned a frame to, then the latest filing.
+
+# Statement line -> XBRL concepts, most preferred first
+STATEMENT_LINES = {
+    "Revenue": ["Revenues", "RevenueFromContractWithCustomerExcludingAssessedTax", "SalesRevenueNet",
+                "RevenueFromContractWithCustomerIncludingAssessedTax"],
+    "Cost of Revenue": ["CostOfRevenue", "CostOfGoodsAndServicesSold"],
+    "Gross Profit": ["GrossProfit"],
+    "Operating Income": ["OperatingIncomeLoss"],
+    "Net Income": ["NetIncomeLoss", "ProfitLoss"],
+    "Operating Cash Flow": ["NetCashProvidedByUsedInOperatingActivities"],
+    "Capital Expenditure": ["PaymentsToAcquirePropertyPlantAndEquipment"],
+    "Investing Cash Flow": ["NetCashProvidedByUsedInInvestingActivities"],
+    "Financing Cash Flow": ["NetCashProvidedByUsedInFinancingActivities"],
+    "Total Assets": ["Assets"],
+    "Total Liabilities": ["Liabilities"],
+    "Total Equity": ["StockholdersEquity", "StockholdersEquityIncludingPortionAttributableToNoncontrollingInterest"],
+}
+STATEMENT_CONCEPTS = [concept for concepts in STATEMENT_LINES.values() for concept in concepts]
+
+INCOME_STATEMENT = ["Revenue", "Cost of Revenue", "Gross Profit", "Operating Income", "Net Income"]
+BALANCE_SHEET = ["Total Assets", "Total Liabilities", "Total Equity"]
+CASH_FLOW = ["Operating Cash Flow", "Capital Expenditure", "Investing Cash Flow", "Financing Cash Flow"]
+
+QUARTER_DAYS = (80, 100)
+YEAR_DAYS = (350, 380)
+
+
+def _select_periods(facts, keys=()):
+    """One value per (*keys, line, start, end): preferred concept, then framed, then latest filing."""
+    priority = {c: (line, i) for line, concepts in STATEMENT_LINES.items() for i, c in enumerate(concepts)}
+    facts = facts[facts["concept"].isin(priority) & facts["end"].notna() & facts["val"].notna()]
+    if "unit" in facts:
+        facts = facts[facts["unit"] == "USD"]
+    mapped = facts["concept"].astype(object).map(priority)
+    facts = facts.assign(
+        line=mapped.str[0],
+        priority=mapped.str[1],
+        framed=facts["frame"].notna() if "frame" in facts else False,
+        days=(facts["end"] - facts["start"]).dt.days,
+    )
+    facts = facts.sort_values(["priority", "framed", "filed"], ascending=[True, False, False], kind="stable")
+    return facts.drop_duplicates([*keys, "line", "start", "end"], keep="first")
+
+
+def _between(days, bounds):
+    return (days >= bounds[0]) & (days <= bounds[1])
+
+
+def _pivot(facts):
+    table = facts.pivot_table(index="end", columns="line", values="val", aggfunc="first")
+    table.index.name = "Period End"
+    table.columns.name = None
+    return table
+
+
+def _derived_quarters(durations, keys=()):
+    """Quarters as differences of consecutive year-to-date values sharing a fiscal-year start."""
+    keys = [*keys, "line", "start"]
+    cumulative = durations[durations["days"] >= QUARTER_DAYS[0]].sort_values([*keys, "end"])
+    group = cumulative.groupby(keys, sort=False)
+    step = cumulative["val"] - group["val"].shift()
+    gap = (cumulative["end"] - group["end"].shift()).dt.days
+    return cumulative.assign(val=step)[_between(gap, QUARTER_DAYS)]
+
+
+def build_statements(facts):
+    """
+    Quarterly and annual statements (one row per period end, one column per
+    statement line, newest first) from a long fact table.
+    Returns {"quarterly": DataFrame, "annual": DataFrame}.
+    """
+    facts = _select_periods(facts)
+    durations = facts[facts["start"].notna()]
+    instants = facts[facts["start"].isna()].drop_duplicates(["line", "end"])
+
+    quarterly = _pivot(durations[_between(durations["days"], QUARTER_DAYS)])
+    quarterly = quarterly.combine_first(_pivot(_derived_quarters(durations)))
+    annual = _pivot(durations[_between(durations["days"], YEAR_DAYS)])
+
+    balance = _pivot(instants)
+    statements = {}
+    for name, table in (("quarterly", quarterly), ("annual", annual)):
+        table = table.join(balance.reindex(table.index), how="left") if not balance.empty else table
+        lines = [line for line in STATEMENT_LINES if line in table.columns]
+        statements[name] = table[lines].sort_index(ascending=False)
+    return statements
+
+
+def trailing_twelve_months(quarterly):
+    """
+    TTM flows as the sum of four consecutive quarters (NaN where a quarter is
+    missing); balance-sheet lines keep the quarter-end value.
+    """
+    table = quarterly.sort_index()
+    flows = [line for line in table.columns if line not in BALANCE_SHEET]
+    ttm = table.copy()
+    span = (table.index.to_series() - table.index.to_series().shift(3)).dt.days
+    consecutive = _between(span, (3 * QUARTER_DAYS[0], 3 * QUARTER_DAYS[1])).to_numpy()
+    sums = table[flows].rolling(4, min_periods=4).sum()
+    ttm[flows] = sums.where(np.broadcast_to(consecutive[:, None], sums.shape))
+    return ttm.dropna(subset=flows, how="all").sort_index(ascending=False)
+
+
+def line_by_company(facts, line, basis="annual"):
+    """
+    Latest annual or TTM value of one statement line for every company in a
+    long fact table with a cik column, built from all of the line's concepts
+    the same way as build_statements. Balance-sheet lines take the latest
+    period end on either basis. Returns one (cik, end, val) row per company.
+    """
+    facts = _select_periods(facts[facts["concept"].isin(STATEMENT_LINES[line])], keys=("cik",))
+    if line in BALANCE_SHEET:
+        values = facts[facts["start"].isna()]
+    elif basis == "annual":
+        values = facts[_between(facts["days"], YEAR_DAYS)]
+    else:
+        durations = facts[facts["start"].notna()]
+        # Reported quarters win over derived ones for the same period end
+        quarters = pd.concat([durations[_between(durations["days"], QUARTER_DAYS)],
+                              _derived_quarters(durations, keys=("cik",))], ignore_index=True)
+        quarters = quarters.drop_duplicates(["cik", "end"], keep="first").sort_values(["cik", "end"], ignore_index=True)
+        group = quarters.groupby("cik", sort=False)
+        span = (quarters["end"] - group["end"].shift(3)).dt.days
+        sums = group["val"].rolling(4, min_periods=4).sum().reset_index(level=0, drop=True)
+        values = quarters.assign(val=sums)[_between(span, (3 * QUARTER_DAYS[0], 3 * QUARTER_DAYS[1]))]
+    values = values.sort_values(["cik", "end"]).drop_duplicates("cik", keep="last")
+    return values[["cik", "end", "val"]].reset_index(drop=True)
+
+
+def _line(table, name):
+    return table[name] if name in table.columns else pd.Series(np.nan, index=table.index)
+
+
+def compute_ratios(table, market_cap=None, periods_per_year=1):
+    """
+    Margins, ROE, leverage and free cash flow for each row of an annual or TTM
+    table. ROE uses average equity over the year (periods_per_year rows back).
+    FCF yield is only filled in for the latest row, against market_cap.
+    """
+    table = table.sort_index()
+    revenue = _line(table, "Revenue")
+    gross_profit = _line(table, "Gross Profit").fillna(revenue - _line(table, "Cost of Revenue"))
+    equity = _line(table, "Total Equity")
+    average_equity = (equity + equity.shift(periods_per_year)) / 2
+    free_cash_flow = _line(table, "Operating Cash Flow") - _line(table, "Capital Expenditure").fillna(0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratios = pd.DataFrame({
+            "Gross Margin": gross_profit / revenue,
+            "Operating Margin": _line(table, "Operating Income") / revenue,
+            "Net Margin": _line(table, "Net Income") / revenue,
+            "ROE": _line(table, "Net Income") / average_equity.fillna(equity),
+            "Debt to Equity": _line(table, "Total Liabilities") / equity,
+            "Assets to Equity": _line(table, "Total Assets") / equity,
+            "Free Cash Flow": free_cash_flow,
+        }, index=table.index)
+    ratios["FCF Yield"] = np.nan
+    if market_cap and not ratios.empty:
+        ratios.iloc[-1, ratios.columns.get_loc("FCF Yield")] = free_cash_flow.iloc[-1] / market_cap
+    return ratios.replace([np.inf, -np.inf], np.nan).sort_index(ascending=False)
@@ -0,0 +1,40 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from amfi_ingest import ingest_nav_file, iter_nav_lines, parse_nav_lines
+from fund_index import load_schemes, save_schemes
+from nav_store import NavStore, to_day
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "fixtures", "NAVAll_sample.txt")
+
+
+def test_parse_nav_lines_skips_headings_and_missing_navs():
+    rows = list(parse_nav_lines(iter_nav_lines(SAMPLE)))
+
+    assert [code for code, _, _, _ in rows] == [119551, 119552, 100032, 100034, 119552]
+    code, name, day, nav = rows[2]
+    assert name == "HDFC Large Cap Fund - Regular Plan - Growth"
+    assert day == to_day("2026-10-16")
+    assert nav == 1123.456
+    assert rows[3][2] == to_day("2026-10-15")
+
+
+def test_ingest_nav_file_appends_to_store_and_scheme_list(tmp_path):
+    store = NavStore(root=str(tmp_path / "nav"))
+    schemes_path = str(tmp_path / "schemes.json")
+    save_schemes([{"schemeCode": 119551, "schemeName": "Old name"}], schemes_path)
+
+    summary = ingest_nav_file(SAMPLE, store=store, schemes_path=schemes_path)
+
+    assert summary == {"rows": 5, "schemes": 4, "new_schemes": 3}
+    # The later row for the same scheme and day wins
+    series = store.load_series(119552)
+    assert list(series.index) == [pd.Timestamp("2026-10-16")]
+    assert np.isclose(series.iloc[0], 372.2)
+    assert np.isclose(store.load_series(100034).loc["2026-10-15"], 1245.01)
+    assert store.load_series(100033).empty
+    names = {int(s["schemeCode"]): s["schemeName"] for s in load_schemes(schemes_path, max_age=float("inf"))}
+    assert names[119551] == "Aditya Birla Sun Life Banking & PSU Debt Fund  - DIRECT - IDCW"
+    assert set(names) == {119551, 119552, 100032, 100034}
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from portfolio_performance import compute_performance, update_performance
+
+
+def _prices(dates):
+    rng = np.random.default_rng(7)
+    closes = 100 * np.cumprod(1 + rng.normal(0, 0.01, (len(dates), 2)), axis=0)
+    return pd.DataFrame(closes, index=pd.DatetimeIndex(dates, name="Date"), columns=["AAA.NS", "BBB.NS"])
+
+
+def test_incremental_update_matches_full_recompute():
+    dates = pd.bdate_range("2026-01-01", periods=40)
+    prices = _prices(dates)
+    # Popped from the price panel as on the performance page: NaN on the two
+    # portfolio trading days the index has no bar for (holiday, missing bar)
+    benchmark = pd.Series(np.linspace(20000, 21000, len(dates)), index=dates)
+    benchmark.iloc[[25, 33]] = np.nan
+    ledger = pd.DataFrame({
+        "trade_date": pd.to_datetime(["2026-01-01", "2026-01-20", "2026-02-05"]),
+        "ticker": ["AAA.NS", "BBB.NS", "AAA.NS"],
+        "shares": [10.0, 5.0, -4.0],
+        "price": [100.0, 101.0, 102.0],
+    })
+
+    # Cached while the last day was still trading, then updated with its final close and new days
+    intraday = prices.iloc[:20].copy()
+    intraday.iloc[-1] *= 0.98
+    cached = update_performance(None, ledger, intraday, benchmark[benchmark.index <= dates[19]])
+    updated = update_performance(cached, ledger, prices, benchmark)
+
+    full, _ = compute_performance(ledger, prices, benchmark)
+    pd.testing.assert_frame_equal(updated["perf"], full, check_freq=False)
+    assert updated["perf"]["benchmark_index"].notna().all()